@@ -0,0 +1,170 @@
+"""
+Primary/replica database router with lag-aware fallback.
+
+Reads go to one of the replicas listed in `DATABASE_REPLICAS`(see the working environment settings),
+and writes always go to the primary(`default`). Each request(or task) reads from a single replica -
+picked at random on its first read, among those that are reachable and whose replication lag is at
+most `DATABASE_REPLICA_MAX_LAG` seconds(checked at most once every `DATABASE_REPLICA_CHECK_INTERVAL`
+seconds per process), and kept for its later reads, so they never go back in time by hopping to a
+replica further behind. A new one is picked only if it turns unhealthy. With no healthy replica,
+reads fall back to the primary.
+
+Read-your-writes: once the current request(or task) has written to the primary, its later reads are
+pinned to the primary too. `DB_PrimaryPinningMiddleware` carries that pin over to the same client's
+next requests, for `DATABASE_READ_YOUR_WRITES_WINDOW` seconds.
+
+With no replicas configured, every query simply goes to the primary.
+"""
+
+import random
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DatabaseError, connections
+from utils.logger import logger
+
+log = logger()
+
+PRIMARY_DATABASE = "default"
+
+_pinned_to_primary = ContextVar("pinned_to_primary", default=False)
+_wrote_to_primary = ContextVar("wrote_to_primary", default=False)
+_read_replica = ContextVar("read_replica", default=None)
+
+_replica_health = {}  # alias -> (is_healthy, checked_at)
+_replica_health_lock = threading.Lock()
+
+
+def start_request_pinning(pinned):
+    """
+    Reset the read-your-writes state at the start of a request - `pinned` pins its reads to the
+    primary from the start, and the request picks its own replica. Returns tokens for
+    `end_request_pinning`.
+    """
+    return (
+        _pinned_to_primary.set(pinned),
+        _wrote_to_primary.set(False),
+        _read_replica.set(None),
+    )
+
+
+def end_request_pinning(tokens):
+    _pinned_to_primary.reset(tokens[0])
+    _wrote_to_primary.reset(tokens[1])
+    _read_replica.reset(tokens[2])
+
+
+def pin_to_primary():
+    """
+    Pin the current request's(or task's) remaining reads to the primary.
+    """
+    _pinned_to_primary.set(True)
+
+
+def record_primary_write():
+    """
+    Record a write to the primary that is deferred(e.g. batched by a write-behind queue) - so the
+    client is still pinned to the primary, as if the write had happened during the request.
+    """
+    _wrote_to_primary.set(True)
+
+
+def wrote_to_primary():
+    return _wrote_to_primary.get()
+
+
+def is_pinned_to_primary():
+    return _pinned_to_primary.get() or _wrote_to_primary.get()
+
+
+def _replication_lag(alias):
+    connection = connections[alias]
+
+    with connection.cursor() as cursor:
+        if connection.vendor != "postgresql":
+            # e.g. local SQLite "replicas" - no lag to measure, only check that it is reachable
+            cursor.execute("SELECT 1")
+            return 0.0
+
+        # P.S: on an idle primary, no transactions are replayed - so the lag reads high, and reads
+        # (safely) fall back to the primary until writes resume
+        cursor.execute(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "ELSE 0 END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def _is_replica_healthy(alias):
+    now = time.monotonic()
+    is_healthy, checked_at = _replica_health.get(alias, (True, None))
+
+    if checked_at is not None and now - checked_at < float(
+        settings.DATABASE_REPLICA_CHECK_INTERVAL
+    ):
+        return is_healthy
+
+    with _replica_health_lock:
+        # another thread may have refreshed it while we waited for the lock
+        is_healthy, checked_at = _replica_health.get(alias, (True, None))
+
+        if checked_at is not None and now - checked_at < float(
+            settings.DATABASE_REPLICA_CHECK_INTERVAL
+        ):
+            return is_healthy
+
+        try:
+            lag = _replication_lag(alias)
+            is_healthy = lag <= float(settings.DATABASE_REPLICA_MAX_LAG)
+
+            if not is_healthy:
+                log.warning("Replica lagging - reads fall back to primary", replica=alias, lag=lag)
+        except DatabaseError as e:
+            is_healthy = False
+            log.error(
+                "Replica unreachable - reads fall back to primary", replica=alias, error=str(e)
+            )
+
+        _replica_health[alias] = (is_healthy, now)
+
+        return is_healthy
+
+
+def healthy_replicas():
+    return [
+        alias for alias in getattr(settings, "DATABASE_REPLICAS", []) if _is_replica_healthy(alias)
+    ]
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if is_pinned_to_primary():
+            return PRIMARY_DATABASE
+
+        replica = _read_replica.get()
+
+        if replica is not None and _is_replica_healthy(replica):
+            return replica
+
+        replicas = healthy_replicas()
+
+        if not replicas:
+            return PRIMARY_DATABASE
+
+        replica = random.choice(replicas)
+        _read_replica.set(replica)
+
+        return replica
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas mirror the primary - so objects from any of them may relate
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,117 @@
+"""
+Summarize the request profiles collected in `PROFILING_DIR` - see `utils.request_profiling`.
+
+Profiles are grouped by method and route. Per group, the command prints the number of profiles, their
+mean and max duration, and the functions that took the most time across all of them.
+
+Usage:
+    python manage.py summarize_profiles
+    python manage.py summarize_profiles --route user --sort tottime --limit 30
+    python manage.py summarize_profiles --request-id 4f1c2a...
+"""
+
+import io
+import os
+import pstats
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from utils.metrics import UNMATCHED_ROUTE
+from utils.request_profiling import parse_profile_file_name
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+class Command(BaseCommand):
+    help = "Summarize collected request profiles - per route, with the slowest functions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            help="Directory of the profiles(default: PROFILING_DIR).",
+        )
+        parser.add_argument(
+            "--route",
+            help="Only summarize routes containing this text - e.g. 'user' or 'auth.log-in'.",
+        )
+        parser.add_argument(
+            "--request-id",
+            help="Only summarize the profile of this request id.",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=SORT_KEYS,
+            default="cumulative",
+            help="Order functions by cumulative time, own time, or call count(default: cumulative).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of functions listed per route(default: 20).",
+        )
+
+    def handle(self, *args, **options):
+        profiling_dir = options["dir"] or settings.PROFILING_DIR
+
+        if not os.path.isdir(profiling_dir):
+            raise CommandError(f"profiling directory '{profiling_dir}' does not exist")
+
+        groups = {}
+
+        for file_name in sorted(os.listdir(profiling_dir)):
+            parsed = parse_profile_file_name(file_name)
+
+            if parsed is None:
+                continue
+
+            _, method, route, request_id = parsed
+
+            if options["route"] and options["route"] not in route:
+                continue
+
+            if options["request_id"] and request_id != options["request_id"]:
+                continue
+
+            groups.setdefault((method, route), []).append(os.path.join(profiling_dir, file_name))
+
+        if not groups:
+            self.stdout.write("No profiles found")
+            return
+
+        for (method, route), paths in sorted(groups.items()):
+            self._summarize(method, route, paths, options["sort"], max(options["limit"], 1))
+
+    def _summarize(self, method, route, paths, sort, limit):
+        durations = []
+        stats = None
+        # pstats writes partial lines - `self.stdout` would end each with "\n"
+        output = io.StringIO()
+
+        for path in paths:
+            try:
+                profile_stats = pstats.Stats(path, stream=output)
+            except (OSError, EOFError, ValueError, TypeError) as e:
+                self.stderr.write(f"Skipping unreadable profile '{path}': {e}")
+                continue
+
+            durations.append(profile_stats.total_tt)
+
+            if stats is None:
+                stats = profile_stats
+            else:
+                stats.add(profile_stats)
+
+        if stats is None:
+            return
+
+        route = route if route == UNMATCHED_ROUTE else f"/{route.replace('.', '/')}"
+        title = f"{method} {route} - {len(durations)} profile(s)"
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        self.stdout.write(
+            f"mean {sum(durations) / len(durations) * 1000:.3f}ms, "
+            f"max {max(durations) * 1000:.3f}ms"
+        )
+
+        stats.files = []  # the per-file header lines - the profiles are counted in the title
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        self.stdout.write(output.getvalue(), ending="")
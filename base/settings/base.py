@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import copy
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / '.env')  # adjust as needed
@@ -32,6 +34,16 @@ SECRET_KEY = os.getenv('JWT_SECRET')
 JWT_ACCESS_EXPIRATION_TIME = os.getenv('JWT_ACCESS_EXPIRATION_TIME')
 JWT_SESSION_EXPIRATION_TIME = os.getenv('JWT_SESSION_EXPIRATION_TIME')
 JWT_ONE_TIME_PASSWORD_LIFETIME = os.getenv('JWT_ONE_TIME_PASSWORD_LIFETIME')
+# tokens are only re-issued(rotated) when the access token has less than this many minutes left
+JWT_ROTATION_THRESHOLD = os.getenv('JWT_ROTATION_THRESHOLD', '10')
+# max number of decoded(verified) JWTs kept in memory - entries never outlive the token's expiry
+JWT_DECODE_CACHE_SIZE = os.getenv('JWT_DECODE_CACHE_SIZE', '4096')
+
+# auth cookie - legacy(PBKDF2) cookies are accepted during the migration window to the HMAC(v2)
+# format. Disable once every live cookie has been re-issued(cookies are renewed on each request and
+# expire within 24 hours).
+AUTH_COOKIE_ACCEPT_LEGACY_FORMAT = os.getenv('AUTH_COOKIE_ACCEPT_LEGACY_FORMAT', 'True') == 'True'
+AUTH_COOKIE_VERIFICATION_CACHE_SIZE = os.getenv('AUTH_COOKIE_VERIFICATION_CACHE_SIZE', '4096')
 
 # SECURITY WARNING: don't run with debug turned on in production!
 
@@ -41,6 +53,8 @@ INSTALLED_APPS = [
     "domain__auth.apps.DomainAuthConfig",
     "domain__user.apps.DomainUserConfig",
     "domain__admin.apps.DomainAdminConfig",
+    # project-wide management commands - e.g. summarize_profiles
+    "base",
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,6 +64,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # first - request latency histograms cover the whole middleware chain
+    'middlewares.request_metrics_middleware.RequestMetricsMiddleware',
+    # per-phase time breakdown(Server-Timing header) - above RequestDataLoggingMiddleware, which logs it
+    'middlewares.request_timing_middleware.RequestTimingMiddleware',
+    # on-demand cProfile dumps of single requests - see `utils.request_profiling`
+    'middlewares.request_profiling_middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,10 +80,18 @@ MIDDLEWARE = [
 
     # ... custom middlewares ...
     'middlewares.request_data_logging_middleware.RequestDataLoggingMiddleware',
-    'middlewares.auth__access_middleware.Auth_AccessMiddleware',
-    'middlewares.auth__sessions_middleware.Auth_SessionsMiddleware',
+    # read-your-writes for the primary/replica router - keep it above any middleware that queries
+    'middlewares.db_primary_pinning_middleware.DB_PrimaryPinningMiddleware',
+    # session + access checks in a single pass - replaces the two-middleware chain below
+    'middlewares.auth__pipeline_middleware.Auth_PipelineMiddleware',
+    # 'middlewares.auth__access_middleware.Auth_AccessMiddleware',
+    # 'middlewares.auth__sessions_middleware.Auth_SessionsMiddleware',
 ]
 
+# serve the auth, user and admin endpoints with their async(True) or sync(False) views - the async
+# views use the async ORM, and run password hashing off the event loop. Handy for A/B comparisons.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'True') == 'True'
+
 ROOT_URLCONF = 'base.urls'
 
 TEMPLATES = [
@@ -88,6 +116,135 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'base.wsgi.application'
 
+# Database connections - psycopg 3 with connection pooling and server-side prepared statements, or
+# persistent connections(psycopg2)
+# https://docs.djangoproject.com/en/5.2/ref/databases/#connection-pool
+# https://docs.djangoproject.com/en/5.2/ref/databases/#server-side-parameters-binding
+# https://docs.djangoproject.com/en/5.2/ref/databases/#persistent-connections
+#
+# Each working environment sets its own defaults(see `database_connection_settings` in its settings
+# file), which can be overridden with the `POSTGRES_DB_*__<ENVIRONMENT>` environment variables.
+try:
+    import psycopg
+
+    PSYCOPG3_AVAILABLE = True
+except ImportError:
+    PSYCOPG3_AVAILABLE = False
+
+try:
+    import psycopg_pool
+
+    DATABASE_POOLING_AVAILABLE = PSYCOPG3_AVAILABLE
+except ImportError:
+    DATABASE_POOLING_AVAILABLE = False
+
+
+def database_connection_settings(
+    environment, pool_min_size, pool_max_size, pool_max_idle, pool_timeout, conn_max_age
+):
+    """
+    Connection settings for a working environment's `DATABASES` entry.
+
+    With psycopg 3(and psycopg-pool) installed, connections come from a pool of `pool_min_size` to
+    `pool_max_size` connections - idle connections above the minimum are closed after
+    `pool_max_idle` seconds, each connection is health-checked before it is handed out, and
+    acquiring a connection fails after waiting `pool_timeout` seconds. Otherwise, connections are
+    persistent - re-used for up to `conn_max_age` seconds, and health-checked before re-use.
+
+    With psycopg 3, query parameters are also bound server-side, so that queries run at least
+    `prepare_threshold` times on a connection(i.e. the hot ones - user lookups by email/id, token
+    updates) become server-side prepared statements - parsed and planned once per connection.
+    Disable this(`POSTGRES_DB_PREPARED_STATEMENTS__<ENVIRONMENT>=False`) behind a transaction-mode
+    PgBouncer, which does not support prepared statements.
+    """
+    options = {}
+
+    prepared_statements_enabled = (
+        os.getenv(f'POSTGRES_DB_PREPARED_STATEMENTS__{environment}', 'True') == 'True'
+    )
+
+    if PSYCOPG3_AVAILABLE and prepared_statements_enabled:
+        options['server_side_binding'] = True
+        options['prepare_threshold'] = int(
+            os.getenv(f'POSTGRES_DB_PREPARE_THRESHOLD__{environment}', '5')
+        )
+
+    pooling_enabled = (
+        DATABASE_POOLING_AVAILABLE and os.getenv(f'POSTGRES_DB_POOL__{environment}', 'True') == 'True'
+    )
+
+    if not pooling_enabled:
+        return {
+            'CONN_MAX_AGE': int(os.getenv(f'POSTGRES_DB_CONN_MAX_AGE__{environment}', conn_max_age)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': options,
+        }
+
+    options['pool'] = {
+        'min_size': int(os.getenv(f'POSTGRES_DB_POOL_MIN_SIZE__{environment}', pool_min_size)),
+        'max_size': int(os.getenv(f'POSTGRES_DB_POOL_MAX_SIZE__{environment}', pool_max_size)),
+        'max_idle': float(os.getenv(f'POSTGRES_DB_POOL_MAX_IDLE__{environment}', pool_max_idle)),
+        'timeout': float(os.getenv(f'POSTGRES_DB_POOL_TIMEOUT__{environment}', pool_timeout)),
+    }
+
+    return {
+        'CONN_MAX_AGE': 0,  # must be 0 with pooling - the pool manages connection lifetimes
+        # makes Django health-check each pooled connection before handing it out
+        # (`ConnectionPool.check_connection`)
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': options,
+    }
+
+
+def database_replicas(primary, environment, default=''):
+    """
+    Read-replica `DATABASES` entries for a working environment - `replica_1`, `replica_2`, ... - one
+    per entry of the comma-separated `POSTGRES_DB_REPLICAS__<ENVIRONMENT>` environment variable(or
+    of `default`, when it is not set).
+
+    Each replica re-uses the primary's settings(credentials, pooling, prepared statements), with
+    its own `host[:port]` - or its own database file, for SQLite(e.g. to try the replica set-up
+    locally). Replicas mirror the primary in tests.
+
+    Reads are routed to the replicas by `base.db_routers.PrimaryReplicaRouter`.
+    """
+    replicas = {}
+    entries = os.getenv(f'POSTGRES_DB_REPLICAS__{environment}', default)
+
+    for index, entry in enumerate(filter(None, map(str.strip, entries.split(','))), start=1):
+        replica = copy.deepcopy(primary)
+
+        if 'sqlite3' in replica['ENGINE']:
+            replica['NAME'] = entry
+        else:
+            host, _, port = entry.partition(':')
+            replica['HOST'] = host
+            replica['PORT'] = port or primary.get('PORT')
+
+        replica['TEST'] = {'MIRROR': 'default'}
+        replicas[f'replica_{index}'] = replica
+
+    return replicas
+
+
+# Primary/replica routing - see `base.db_routers`. Each working environment lists its replicas in
+# DATABASE_REPLICAS(see `database_replicas`) - with none, every query goes to the primary.
+DATABASE_ROUTERS = ['base.db_routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+
+# replicas lagging more than DATABASE_REPLICA_MAX_LAG seconds behind the primary(or unreachable) are
+# skipped for reads - checked every DATABASE_REPLICA_CHECK_INTERVAL seconds, per process
+DATABASE_REPLICA_MAX_LAG = os.getenv('DATABASE_REPLICA_MAX_LAG', '2')
+DATABASE_REPLICA_CHECK_INTERVAL = os.getenv('DATABASE_REPLICA_CHECK_INTERVAL', '5')
+
+# after a client writes to the primary, its reads stay on the primary for this many seconds - so it
+# always reads its own writes(see `middlewares.db_primary_pinning_middleware`)
+DATABASE_READ_YOUR_WRITES_WINDOW = os.getenv('DATABASE_READ_YOUR_WRITES_WINDOW', '5')
+# the pin cookie is HTTPS-only - browsers drop it over plain HTTP, so the dev settings turn this off
+# (DATABASE_PIN_COOKIE_SECURE__DEV)
+DATABASE_PIN_COOKIE_SECURE = True
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -107,6 +264,81 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing pool - see `utils.password_hashing_executor`. Log-in/register hash passwords on a
+# dedicated pool of processes(0 = hash inline). Once the pool and its queue are full, new requests
+# fail fast with a 503, asking the client to retry after PASSWORD_HASHING_RETRY_AFTER seconds.
+PASSWORD_HASHING_POOL_SIZE = os.getenv('PASSWORD_HASHING_POOL_SIZE', '2')
+PASSWORD_HASHING_QUEUE_LIMIT = os.getenv('PASSWORD_HASHING_QUEUE_LIMIT', '16')
+PASSWORD_HASHING_RETRY_AFTER = os.getenv('PASSWORD_HASHING_RETRY_AFTER', '1')
+
+
+# Background tasks - see `utils.background_tasks`. Number of threads(per process) for work done off
+# the response path, e.g. password rehashing on log-in.
+BACKGROUND_TASKS_WORKERS = os.getenv('BACKGROUND_TASKS_WORKERS', '2')
+
+
+# Token write-behind - see `domain__auth.token_write_behind`. When enabled, tokens issued on log-in/
+# register are queued(one pending pair per user) and inserted in batches - once
+# TOKEN_WRITE_BEHIND_BATCH_SIZE users are pending, or every TOKEN_WRITE_BEHIND_FLUSH_INTERVAL seconds.
+# Beyond TOKEN_WRITE_BEHIND_MAX_PENDING pending users, tokens are written synchronously again. A user's
+# failed write is re-queued up to TOKEN_WRITE_BEHIND_MAX_RETRIES times, with an exponential backoff.
+# Only effective with a shared user cache(USER_CACHE_ALIAS) - tokens are written synchronously otherwise.
+TOKEN_WRITE_BEHIND = os.getenv('TOKEN_WRITE_BEHIND', 'False') == 'True'
+TOKEN_WRITE_BEHIND_BATCH_SIZE = os.getenv('TOKEN_WRITE_BEHIND_BATCH_SIZE', '100')
+TOKEN_WRITE_BEHIND_FLUSH_INTERVAL = os.getenv('TOKEN_WRITE_BEHIND_FLUSH_INTERVAL', '0.1')
+TOKEN_WRITE_BEHIND_MAX_PENDING = os.getenv('TOKEN_WRITE_BEHIND_MAX_PENDING', '10000')
+TOKEN_WRITE_BEHIND_MAX_RETRIES = os.getenv('TOKEN_WRITE_BEHIND_MAX_RETRIES', '5')
+
+
+# Logging - see `utils.logger`. Events below LOG_LEVEL are dropped. With LOG_BACKGROUND_WRITER, log
+# lines are queued(up to LOG_QUEUE_SIZE lines) and written to stdout by a background thread - when
+# the queue is full, new lines are dropped and counted(LOG_QUEUE_OVERFLOW='drop'), or the logging
+# thread waits for room(LOG_QUEUE_OVERFLOW='block').
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_BACKGROUND_WRITER = os.getenv('LOG_BACKGROUND_WRITER', 'True') == 'True'
+LOG_QUEUE_SIZE = os.getenv('LOG_QUEUE_SIZE', '10000')
+LOG_QUEUE_OVERFLOW = os.getenv('LOG_QUEUE_OVERFLOW', 'drop')
+
+# Log sampling/rate limiting - see `utils.log_sampling`. LOG_SAMPLE_RATES: "event=rate" pairs.
+# LOG_RATE_LIMITS: "event=field:limit/seconds" entries - at most `limit` events per value of `field`
+# per window. A request's sampled events share one draw - so they are kept or dropped together.
+# Warnings and errors are never suppressed, and requests slower than LOG_SLOW_REQUEST_SECONDS are
+# logged as warnings. Suppressed events are counted, and reported at most every
+# LOG_SUPPRESSED_REPORT_INTERVAL seconds(also after bursts - by a background reporter).
+LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'Request started=0.01,Request finished=0.01')
+LOG_RATE_LIMITS = os.getenv('LOG_RATE_LIMITS', 'session_status=email:1/60')
+LOG_SLOW_REQUEST_SECONDS = os.getenv('LOG_SLOW_REQUEST_SECONDS', '1')
+LOG_SUPPRESSED_REPORT_INTERVAL = os.getenv('LOG_SUPPRESSED_REPORT_INTERVAL', '60')
+
+
+# Request metrics - see `utils.metrics`. Served in the Prometheus format at /metrics, which requires
+# `Authorization: Bearer <METRICS_AUTH_TOKEN>` - and is disabled while METRICS_AUTH_TOKEN is not set.
+# Internal component stats are refreshed every METRICS_STATS_INTERVAL seconds, per worker. Set the
+# PROMETHEUS_MULTIPROC_DIR environment variable to aggregate the metrics of all server workers.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+METRICS_AUTH_TOKEN = os.getenv('METRICS_AUTH_TOKEN', '')
+METRICS_STATS_INTERVAL = os.getenv('METRICS_STATS_INTERVAL', '15')
+
+
+# Server-Timing header(and `timings` log field) - see `middlewares.request_timing_middleware`. Off by
+# default - each environment's settings toggle it(SERVER_TIMING__DEV/STAGING/PRODUCTION).
+SERVER_TIMING = False
+
+
+# Request profiling - see `utils.request_profiling`. Requests are profiled when they carry a
+# `X-Profile-Request: <PROFILING_AUTH_TOKEN>` header(disabled when empty), or at random
+# (PROFILING_SAMPLE_RATE, 0-1). Profiles are written to PROFILING_DIR(relative to the working
+# directory, unless absolute) - at most PROFILING_MAX_FILES of them.
+PROFILING_AUTH_TOKEN = os.getenv('PROFILING_AUTH_TOKEN', '')
+PROFILING_SAMPLE_RATE = os.getenv('PROFILING_SAMPLE_RATE', '0')
+PROFILING_DIR = os.getenv('PROFILING_DIR', 'profiles')
+PROFILING_MAX_FILES = os.getenv('PROFILING_MAX_FILES', '1000')
+
+
+# Max number of users a single bulk admin request may update - see `domain__admin.bulk_user_status`
+ADMIN_BULK_UPDATE_MAX_USERS = os.getenv('ADMIN_BULK_UPDATE_MAX_USERS', '50000')
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -129,6 +361,58 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# The "users" cache backs the read-through `User` cache(see `domain__user.user_cache`). LocMem is
+# per-process - saves/deletes only invalidate the current process' entries, and other processes
+# catch up after USER_CACHE_TIMEOUT. Each working environment picks its backend(see
+# `user_cache_settings`) - staging and production run several workers, and require Redis.
+USER_CACHE_ALIAS = 'users'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    USER_CACHE_ALIAS: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'users',
+        'TIMEOUT': int(os.getenv('USER_CACHE_TIMEOUT', '300')),  # seconds
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('USER_CACHE_MAX_ENTRIES', '10000')),
+        },
+    },
+}
+
+
+def user_cache_settings(environment, shared=False):
+    """
+    The user cache(`USER_CACHE_ALIAS`) entry of a working environment's `CACHES` - Redis, shared by
+    all server workers, when `USER_CACHE_REDIS_URL__<ENVIRONMENT>` is set, and the per-process LocMem
+    entry above otherwise.
+
+    Set `shared` for environments running several workers - the Redis URL is then required, since
+    with LocMem a user's invalidation(e.g. deactivated, or no longer an admin) only reaches the other
+    workers once their entries expire.
+    """
+    location = os.getenv(f'USER_CACHE_REDIS_URL__{environment}', '')
+
+    if not location:
+        if shared:
+            raise ImproperlyConfigured(
+                f"USER_CACHE_REDIS_URL__{environment} must be set - the user cache must be shared "
+                "by all server workers"
+            )
+
+        return copy.deepcopy(CACHES[USER_CACHE_ALIAS])
+
+    return {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': location,
+        'TIMEOUT': CACHES[USER_CACHE_ALIAS]['TIMEOUT'],
+    }
+
+
 # django email configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_BACKEND='django.core.mail.backends.console.EmailBackend'
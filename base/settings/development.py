@@ -21,9 +21,32 @@ DATABASES = {
         'PASSWORD': os.getenv("POSTGRES_DB_PASSWORD__DEV"),
         'HOST': os.getenv("POSTGRES_DB_HOST__DEV"),
         'PORT': os.getenv("POSTGRES_DB_PORT__DEV"),
+        # dev connection pool/persistent connections - see `database_connection_settings`
+        **database_connection_settings(
+            'DEV',
+            pool_min_size=1,
+            pool_max_size=4,
+            pool_max_idle=300,
+            pool_timeout=10,
+            conn_max_age=60,
+        ),
     }
 }
 
+# dev read replicas(POSTGRES_DB_REPLICAS__DEV) - see `database_replicas`
+DATABASES.update(database_replicas(DATABASES['default'], 'DEV'))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+
+# dev read-your-writes pin cookie over plain HTTP(DATABASE_PIN_COOKIE_SECURE__DEV) - see
+# `middlewares.db_primary_pinning_middleware`
+DATABASE_PIN_COOKIE_SECURE = os.getenv('DATABASE_PIN_COOKIE_SECURE__DEV', 'False') == 'True'
+
+# dev Server-Timing header(SERVER_TIMING__DEV) - see `RequestTimingMiddleware`
+SERVER_TIMING = os.getenv('SERVER_TIMING__DEV', 'True') == 'True'
+
+# dev user cache(USER_CACHE_REDIS_URL__DEV) - see `user_cache_settings`
+CACHES = {**CACHES, USER_CACHE_ALIAS: user_cache_settings('DEV')}
+
 # dev AWS S3 setup
 AWS_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME__DEV")
 AWS_BUCKET_REGION = os.getenv("AWS_BUCKET_REGION__DEV")
@@ -0,0 +1,27 @@
+"""
+Local settings - the development settings, on SQLite. A primary database file, and a replica
+database file(`replica_1`), so the primary/replica routing(see `base.db_routers`) can be tried
+without any Postgres server - and the test suite runs anywhere:
+
+    DJANGO_SETTINGS_MODULE=base.settings.local python manage.py test
+
+P.S: nothing replicates the primary file into the replica file - the replica serves the data as of
+its last copy(`cp base/db.sqlite3 base/db.replica.sqlite3`, or `migrate --database replica_1` for
+an empty one), which makes stale reads easy to reproduce. In tests, the replica mirrors the primary.
+"""
+
+from .development import *
+
+# local SQLite setup
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+# local read replicas(POSTGRES_DB_REPLICAS__LOCAL - SQLite file paths) - see `database_replicas`
+DATABASES.update(
+    database_replicas(DATABASES['default'], 'LOCAL', default=str(BASE_DIR / 'db.replica.sqlite3'))
+)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
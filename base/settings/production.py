@@ -13,9 +13,28 @@ DATABASES = {
         'PASSWORD': os.getenv("POSTGRES_DB_PASSWORD__PRODUCTION"),
         'HOST': os.getenv("POSTGRES_DB_HOST__PRODUCTION"),
         'PORT': os.getenv("POSTGRES_DB_PORT__PRODUCTION"),
+        # production connection pool/persistent connections - see `database_connection_settings`
+        **database_connection_settings(
+            'PRODUCTION',
+            pool_min_size=4,
+            pool_max_size=20,
+            pool_max_idle=600,
+            pool_timeout=5,
+            conn_max_age=600,
+        ),
     }
 }
 
+# production read replicas(POSTGRES_DB_REPLICAS__PRODUCTION) - see `database_replicas`
+DATABASES.update(database_replicas(DATABASES['default'], 'PRODUCTION'))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+
+# production Server-Timing header(SERVER_TIMING__PRODUCTION) - see `RequestTimingMiddleware`
+SERVER_TIMING = os.getenv('SERVER_TIMING__PRODUCTION', 'False') == 'True'
+
+# production user cache(USER_CACHE_REDIS_URL__PRODUCTION) - see `user_cache_settings`
+CACHES = {**CACHES, USER_CACHE_ALIAS: user_cache_settings('PRODUCTION', shared=True)}
+
 # production AWS S3 setup
 AWS_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME__PRODUCTION")
 AWS_BUCKET_REGION = os.getenv("AWS_BUCKET_REGION__PRODUCTION")
@@ -12,9 +12,28 @@ DATABASES = {
         'PASSWORD': os.getenv("POSTGRES_DB_PASSWORD__STAGING"),
         'HOST': os.getenv("POSTGRES_DB_HOST__STAGING"),
         'PORT': os.getenv("POSTGRES_DB_PORT__STAGING"),
+        # staging connection pool/persistent connections - see `database_connection_settings`
+        **database_connection_settings(
+            'STAGING',
+            pool_min_size=2,
+            pool_max_size=10,
+            pool_max_idle=600,
+            pool_timeout=5,
+            conn_max_age=300,
+        ),
     }
 }
 
+# staging read replicas(POSTGRES_DB_REPLICAS__STAGING) - see `database_replicas`
+DATABASES.update(database_replicas(DATABASES['default'], 'STAGING'))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+
+# staging Server-Timing header(SERVER_TIMING__STAGING) - see `RequestTimingMiddleware`
+SERVER_TIMING = os.getenv('SERVER_TIMING__STAGING', 'True') == 'True'
+
+# staging user cache(USER_CACHE_REDIS_URL__STAGING) - see `user_cache_settings`
+CACHES = {**CACHES, USER_CACHE_ALIAS: user_cache_settings('STAGING', shared=True)}
+
 # staging AWS S3 setup
 AWS_BUCKET_NAME = os.getenv("AWS_BUCKET_NAME__STAGING")
 AWS_BUCKET_REGION = os.getenv("AWS_BUCKET_REGION__STAGING")
@@ -0,0 +1,250 @@
+"""
+Tests for the primary/replica router(`base.db_routers`), the read-your-writes middleware, the
+per-environment user cache settings, and the `/metrics` endpoint.
+
+The replica reads test needs a replica database - e.g. the two SQLite databases of the local
+settings:
+
+    DJANGO_SETTINGS_MODULE=base.settings.local python manage.py test base
+"""
+
+import os
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from base import db_routers
+from base.db_routers import (
+    PRIMARY_DATABASE,
+    PrimaryReplicaRouter,
+    end_request_pinning,
+    is_pinned_to_primary,
+    start_request_pinning,
+)
+from base.settings.base import user_cache_settings
+from domain__user.models import User
+from middlewares.db_primary_pinning_middleware import (
+    PRIMARY_PIN_COOKIE,
+    DB_PrimaryPinningMiddleware,
+)
+
+REPLICAS = ["replica_1", "replica_2"]
+
+
+def _in_new_request(fn, pinned=False):
+    tokens = start_request_pinning(pinned)
+
+    try:
+        return fn()
+    finally:
+        end_request_pinning(tokens)
+
+
+@override_settings(
+    DATABASE_REPLICAS=REPLICAS, DATABASE_REPLICA_MAX_LAG="2", DATABASE_REPLICA_CHECK_INTERVAL="5"
+)
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.lags = {"replica_1": 0.0, "replica_2": 0.0}
+
+        lag_patcher = mock.patch.object(db_routers, "_replication_lag", side_effect=self._lag)
+        self.replication_lag = lag_patcher.start()
+        self.addCleanup(lag_patcher.stop)
+
+        db_routers._replica_health.clear()
+        self.addCleanup(db_routers._replica_health.clear)
+
+        tokens = start_request_pinning(False)
+        self.addCleanup(end_request_pinning, tokens)
+
+    def _lag(self, alias):
+        if isinstance(self.lags[alias], Exception):
+            raise self.lags[alias]
+
+        return self.lags[alias]
+
+    def _read_from(self):
+        return self.router.db_for_read(User)
+
+    def test_reads_go_to_a_replica_and_writes_to_the_primary(self):
+        self.assertIn(self._read_from(), REPLICAS)
+        self.assertEqual(self.router.db_for_write(User), PRIMARY_DATABASE)
+
+    def test_a_request_reads_from_a_single_replica(self):
+        self.assertEqual(len({self._read_from() for _ in range(50)}), 1)
+
+    def test_each_request_picks_its_own_replica(self):
+        picked = {_in_new_request(self._read_from) for _ in range(100)}
+
+        self.assertEqual(picked, set(REPLICAS))
+
+    def test_lagging_replicas_are_skipped(self):
+        self.lags["replica_1"] = 10.0
+
+        picked = {_in_new_request(self._read_from) for _ in range(20)}
+
+        self.assertEqual(picked, {"replica_2"})
+
+    def test_reads_fall_back_to_the_primary_without_a_healthy_replica(self):
+        self.lags["replica_1"] = 10.0
+        self.lags["replica_2"] = DatabaseError("replica unreachable")
+
+        self.assertEqual(self._read_from(), PRIMARY_DATABASE)
+
+    def test_a_request_moves_off_its_replica_once_it_lags(self):
+        with mock.patch.object(
+            db_routers.random, "choice", side_effect=lambda replicas: replicas[0]
+        ):
+            self.assertEqual(self._read_from(), "replica_1")
+
+        self.lags["replica_1"] = 10.0
+        db_routers._replica_health.clear()  # i.e. the check interval has passed
+
+        self.assertEqual(self._read_from(), "replica_2")
+
+    def test_replica_health_is_checked_once_per_interval(self):
+        for _ in range(20):
+            _in_new_request(self._read_from)
+
+        self.assertEqual(self.replication_lag.call_count, len(REPLICAS))
+
+    def test_reads_after_a_write_go_to_the_primary(self):
+        self.assertIn(self._read_from(), REPLICAS)
+
+        self.router.db_for_write(User)
+
+        self.assertEqual(self._read_from(), PRIMARY_DATABASE)
+
+    def test_pinned_requests_read_from_the_primary(self):
+        self.assertEqual(_in_new_request(self._read_from, pinned=True), PRIMARY_DATABASE)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class DB_PrimaryPinningMiddlewareTests(SimpleTestCase):
+    def _get(self, view, cookies=None):
+        request = RequestFactory().get("/")
+        request.COOKIES.update(cookies or {})
+
+        return DB_PrimaryPinningMiddleware(view)(request)
+
+    def test_writes_set_the_pin_cookie(self):
+        def view(request):
+            PrimaryReplicaRouter().db_for_write(User)
+            return HttpResponse()
+
+        cookie = self._get(view).cookies[PRIMARY_PIN_COOKIE]
+
+        self.assertEqual(cookie["max-age"], int(settings.DATABASE_READ_YOUR_WRITES_WINDOW))
+        self.assertTrue(cookie["httponly"])
+
+    def test_the_pin_cookie_can_be_sent_over_plain_http(self):
+        def view(request):
+            PrimaryReplicaRouter().db_for_write(User)
+            return HttpResponse()
+
+        with self.settings(DATABASE_PIN_COOKIE_SECURE=True):
+            self.assertTrue(self._get(view).cookies[PRIMARY_PIN_COOKIE]["secure"])
+
+        with self.settings(DATABASE_PIN_COOKIE_SECURE=False):
+            self.assertFalse(self._get(view).cookies[PRIMARY_PIN_COOKIE]["secure"])
+
+    def test_reads_do_not_set_the_pin_cookie(self):
+        def view(request):
+            PrimaryReplicaRouter().db_for_read(User)
+            return HttpResponse()
+
+        self.assertNotIn(PRIMARY_PIN_COOKIE, self._get(view).cookies)
+
+    def test_the_pin_cookie_pins_reads_to_the_primary(self):
+        pinned = []
+
+        def view(request):
+            pinned.append(is_pinned_to_primary())
+            return HttpResponse()
+
+        self._get(view, {PRIMARY_PIN_COOKIE: "1"})
+        self._get(view)
+
+        self.assertEqual(pinned, [True, False])
+
+
+@skipUnless(
+    "replica_1" in settings.DATABASES, "needs a replica database - see base/settings/local.py"
+)
+@override_settings(DATABASE_REPLICAS=["replica_1"])
+class ReplicaReadsTests(TransactionTestCase):
+    databases = {"default", "replica_1"}
+
+    def setUp(self):
+        db_routers._replica_health.clear()
+        self.addCleanup(db_routers._replica_health.clear)
+
+    def test_reads_are_served_by_the_replica(self):
+        _in_new_request(
+            lambda: User.objects.create(name="Ann", email="ann@example.com", password="!")
+        )
+
+        def read():
+            users = User.objects.filter(email="ann@example.com")
+            return users.db, [user.name for user in users]
+
+        self.assertEqual(_in_new_request(read), ("replica_1", ["Ann"]))
+
+    def test_reads_after_a_write_are_served_by_the_primary(self):
+        def write_then_read():
+            User.objects.create(name="Ann", email="ann@example.com", password="!")
+            return User.objects.filter(email="ann@example.com").db
+
+        self.assertEqual(_in_new_request(write_then_read), PRIMARY_DATABASE)
+
+
+class UserCacheSettingsTests(SimpleTestCase):
+    def test_the_redis_url_selects_a_shared_cache(self):
+        with mock.patch.dict(os.environ, {"USER_CACHE_REDIS_URL__STAGING": "redis://cache:6379/0"}):
+            cache = user_cache_settings("STAGING", shared=True)
+
+        self.assertEqual(cache["BACKEND"], "django.core.cache.backends.redis.RedisCache")
+        self.assertEqual(cache["LOCATION"], "redis://cache:6379/0")
+
+    def test_shared_environments_require_the_redis_url(self):
+        with mock.patch.dict(os.environ, {"USER_CACHE_REDIS_URL__STAGING": ""}):
+            with self.assertRaises(ImproperlyConfigured):
+                user_cache_settings("STAGING", shared=True)
+
+            cache = user_cache_settings("STAGING")
+
+        self.assertEqual(cache["BACKEND"], "django.core.cache.backends.locmem.LocMemCache")
+
+
+@override_settings(DATABASE_REPLICAS=[], METRICS_ENABLED=True, METRICS_AUTH_TOKEN="scrape-token")
+class MetricsEndpointTests(TestCase):
+    @override_settings(METRICS_AUTH_TOKEN="")
+    def test_disabled_without_a_token(self):
+        response = self.client.get("/metrics", headers={"authorization": "Bearer "})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_the_bearer_token(self):
+        for headers in ({}, {"authorization": "Bearer wrong"}, {"authorization": "scrape-token"}):
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get("/metrics", headers=headers).status_code, 401)
+
+    def test_serves_request_metrics(self):
+        self.client.get("/")
+
+        response = self.client.get("/metrics", headers={"authorization": "Bearer scrape-token"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        content = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="/",status="200"}', content)
+        self.assertIn('app_component_stats{component="log_writer"', content)
@@ -7,8 +7,9 @@ from . import views
 from domain__auth.views import auth_router
 from domain__user.views import user_router
 from domain__admin.views import admin_router
+from utils.json_response import ORJSONRenderer
 
-api = NinjaAPI()
+api = NinjaAPI(renderer=ORJSONRenderer())
 
 api.add_router("/v1/auth", auth_router)
 api.add_router("/v1/user", user_router)
@@ -16,6 +17,7 @@ api.add_router("/v1/admin", admin_router)
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("metrics", views.metrics, name="metrics"),
     path('api/', api.urls),  # do not include the ".py" extension
     # path('admin/', admin.site.urls),
 ]
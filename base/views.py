@@ -1,5 +1,27 @@
+import hmac
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from utils.metrics import render_metrics
 
 
 def index(request):
     return render(request, "index.html")
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint - requires `Authorization: Bearer <METRICS_AUTH_TOKEN>`, and is
+    disabled(404) while METRICS_AUTH_TOKEN is not set.
+    """
+    if not settings.METRICS_ENABLED or not settings.METRICS_AUTH_TOKEN:
+        raise Http404
+
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_AUTH_TOKEN}"
+    ):
+        return HttpResponse(status=401)
+
+    content, content_type = render_metrics()
+
+    return HttpResponse(content, content_type=content_type)
@@ -0,0 +1,99 @@
+"""
+Shared helpers for the benchmark scripts in this folder.
+
+Every benchmark runs against throw-away test databases created from the selected settings
+profile(DJANGO_SETTINGS_MODULE - defaults to "base.settings.development"), so the configured
+database server must be reachable. Read replicas mirror the primary's test database, as in tests.
+Nothing is written to the real databases.
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'base.settings.development')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    # a test database per alias - as the test runner does, so read replicas mirror the primary
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(fn, iterations=1000, warmup=50):
+    """
+    Call `fn` `iterations` times(after `warmup` untimed calls), and return timing stats.
+    """
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    started_at = time.perf_counter()
+
+    for _ in range(iterations):
+        call_started_at = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - call_started_at)
+
+    return _timing_stats(timings, time.perf_counter() - started_at)
+
+
+def _timing_stats(timings, elapsed):
+    timings = sorted(timings)
+
+    return {
+        "ops_per_sec": round(len(timings) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 3),
+        "p50_ms": round(timings[int(len(timings) * 0.50)] * 1000, 3),
+        "p99_ms": round(timings[min(int(len(timings) * 0.99), len(timings) - 1)] * 1000, 3),
+    }
+
+
+async def measure_concurrent(make_request, total=1000, concurrency=20):
+    """
+    Await `make_request()` `total` times, with `concurrency` requests in flight at any time, and
+    return timing stats(requests/sec and per-request latency).
+    """
+    timings = []
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            call_started_at = time.perf_counter()
+            await make_request()
+            timings.append(time.perf_counter() - call_started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return _timing_stats(timings, time.perf_counter() - started_at)
+
+
+def print_report(title, rows):
+    print(f"\n{title}")
+    print("-" * len(title))
+
+    for name, stats in rows:
+        details = "  ".join(f"{key}={value}" for key, value in stats.items())
+        print(f"{name:<40} {details}")
@@ -0,0 +1,102 @@
+"""
+Benchmark: async vs. sync domain views under ASGI, at a fixed concurrency.
+
+Each variant runs in its own process(the views are picked at import time - see `ASYNC_VIEWS` in
+"settings => base.py"), and drives the ASGI handler in-process with `concurrency` requests in flight
+at any time, reporting requests/sec and latency percentiles for:
+1. `POST /api/v1/auth/log-in` - password check(PBKDF2) + token update
+2. `GET /api/v1/user/{user_id}` - authenticated profile read
+
+Usage:
+    python -m benchmarks.async_views [requests] [concurrency]
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks._bench import measure_concurrent, print_report, setup_django, test_database
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+async def _run_variant(total, concurrency):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    response = await client.post(
+        "/api/v1/auth/register",
+        json.dumps({"name": "Bench", "email": EMAIL, "password": PASSWORD}),
+        content_type="application/json",
+    )
+    body = response.json()["response"]
+    user_id = body["user_profile"]["id"]
+    headers = {"email": EMAIL, "authorization": f"Bearer {body['access_token']}"}
+
+    async def log_in():
+        await client.post(
+            "/api/v1/auth/log-in",
+            json.dumps({"email": EMAIL, "password": PASSWORD}),
+            content_type="application/json",
+        )
+
+    async def get_user_profile():
+        await client.get(f"/api/v1/user/{user_id}", headers=headers)
+
+    # the profile reads run first, so log-ins do not rotate the tokens they use
+    return {
+        "profile": await measure_concurrent(get_user_profile, total, concurrency),
+        "log-in": await measure_concurrent(log_in, max(total // 10, concurrency), concurrency),
+    }
+
+
+def run_variant(total, concurrency, results_path):
+    setup_django()
+
+    with test_database():
+        results = asyncio.run(_run_variant(total, concurrency))
+
+    # to a file - the variant's stdout is shared with the(background) log writer
+    with open(results_path, "w") as results_file:
+        json.dump(results, results_file)
+
+
+def run(total, concurrency):
+    rows = []
+
+    for async_views in ("True", "False"):
+        with tempfile.NamedTemporaryFile("r", suffix=".json") as results_file:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.async_views",
+                    "--variant",
+                    str(total),
+                    str(concurrency),
+                    results_file.name,
+                ],
+                env={**os.environ, "ASYNC_VIEWS": async_views},
+                capture_output=True,
+                check=True,
+            )
+            variant_stats = json.load(results_file)
+
+        label = "async views" if async_views == "True" else "sync views"
+
+        for endpoint, stats in variant_stats.items():
+            rows.append((f"{label} - {endpoint}", stats))
+
+    print_report(f"async vs. sync views - {total} requests, concurrency {concurrency}", rows)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--variant"]:
+        run_variant(int(sys.argv[2]), int(sys.argv[3]), sys.argv[4])
+    else:
+        arguments = [int(argument) for argument in sys.argv[1:3]]
+        run(*(arguments + [1000, 20][len(arguments) :]))
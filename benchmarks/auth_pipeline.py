@@ -0,0 +1,118 @@
+"""
+Benchmark: combined auth pipeline vs. the two-middleware auth chain.
+
+Compares, for an authenticated `GET /api/v1/user/{user_id}`:
+1. `Auth_PipelineMiddleware` - both auth stages in one pass
+2. `Auth_AccessMiddleware` + `Auth_SessionsMiddleware` - sharing one request context
+3. The same chain with the shared context dropped between the two middlewares - i.e. the previous
+   behaviour, where each middleware parsed the request and loaded the user on its own
+
+Fails if an auth stage fetches the `users.password` column(see `utils.query_assertions`).
+
+Usage:
+    python -m benchmarks.auth_pipeline [iterations]
+"""
+
+import json
+import sys
+
+from benchmarks._bench import measure, print_report, setup_django, test_database
+
+setup_django()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from utils.query_assertions import assert_columns_not_fetched
+
+AUTH_MIDDLEWARES = (
+    'middlewares.auth__pipeline_middleware.Auth_PipelineMiddleware',
+    'middlewares.auth__access_middleware.Auth_AccessMiddleware',
+    'middlewares.auth__sessions_middleware.Auth_SessionsMiddleware',
+)
+
+
+class _DropAuthContextMiddleware:
+    """
+    Emulates the pre-pipeline chain - forces the next auth middleware to re-parse the request and
+    re-load the user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.auth_context = None
+        return self.get_response(request)
+
+
+def _middleware_with(auth_middlewares):
+    base_middlewares = [name for name in settings.MIDDLEWARE if name not in AUTH_MIDDLEWARES]
+    return base_middlewares + list(auth_middlewares)
+
+
+VARIANTS = (
+    ("pipeline(single stage)", (AUTH_MIDDLEWARES[0],)),
+    ("two-middleware chain(shared context)", AUTH_MIDDLEWARES[1:]),
+    (
+        "two-middleware chain(unshared)",
+        (
+            AUTH_MIDDLEWARES[1],
+            'benchmarks.auth_pipeline._DropAuthContextMiddleware',
+            AUTH_MIDDLEWARES[2],
+        ),
+    ),
+)
+
+
+def run(iterations):
+    client = Client()
+    response = client.post(
+        "/api/v1/auth/register",
+        json.dumps({"name": "Bench", "email": "bench@example.com", "password": "bench-password"}),
+        content_type="application/json",
+    )
+    body = response.json()["response"]
+    user_id = body["user_profile"]["id"]
+    headers = {
+        "HTTP_EMAIL": "bench@example.com",
+        "HTTP_AUTHORIZATION": f"Bearer {body['access_token']}",
+    }
+
+    auth_cookie = client.cookies["Fast_Django_Backend_Template"].value
+
+    executed_queries = []
+
+    def count_queries(execute, sql, params, many, context):
+        executed_queries.append(sql)
+        return execute(sql, params, many, context)
+
+    rows = []
+
+    for name, auth_middlewares in VARIANTS:
+        with override_settings(MIDDLEWARE=_middleware_with(auth_middlewares)):
+            # a fresh client, so that the handler's middleware chain is re-built
+            variant_client = Client()
+            variant_client.cookies["Fast_Django_Backend_Template"] = auth_cookie
+
+            def request_profile():
+                return variant_client.get(f"/api/v1/user/{user_id}", **headers)
+
+            executed_queries.clear()
+
+            # the auth hot path never needs the password hash
+            with connection.execute_wrapper(count_queries), assert_columns_not_fetched(
+                "users", ["password"]
+            ):
+                assert request_profile().status_code == 200
+
+            stats = measure(request_profile, iterations=iterations)
+            stats["queries_per_request"] = len(executed_queries)
+            rows.append((name, stats))
+
+    print_report(f"auth pipeline - GET /api/v1/user/{{user_id}} x {iterations}", rows)
+
+
+if __name__ == "__main__":
+    with test_database():
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,66 @@
+"""
+Benchmark: stdlib JSON(`JsonResponse` with `DjangoJSONEncoder`, ninja's default `JSONRenderer`) vs.
+orjson(`ORJSONResponse`, `ORJSONRenderer`), on the `get_user_profile` response payload.
+
+Serialization only - no request handling and no database, so any settings profile works.
+
+Usage:
+    python -m benchmarks.json_rendering [iterations]
+"""
+
+import sys
+from datetime import datetime, timezone
+
+from benchmarks._bench import measure, print_report, setup_django
+
+setup_django()
+
+from django.http import JsonResponse
+from ninja.renderers import JSONRenderer
+from utils.json_response import ORJSONRenderer, ORJSONResponse
+
+NOW = datetime.now(timezone.utc)
+
+# same shape as `domain__user.views._user_profile_response` - with rotated tokens
+USER_PROFILE_PAYLOAD = {
+    "response_message": "User profile retrieved successfully",
+    "response": {
+        "user_profile": {
+            "id": 12345,
+            "name": "Bench User",
+            "email": "bench@example.com",
+            "is_admin": False,
+            "is_active": True,
+            "created_at": NOW,
+            "updated_at": NOW,
+        },
+        "access_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "a" * 160 + ".signature",
+        "refresh_token": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9." + "r" * 160 + ".signature",
+    },
+}
+
+
+def run(iterations):
+    json_renderer = JSONRenderer()
+    orjson_renderer = ORJSONRenderer()
+
+    variants = (
+        ("JsonResponse(stdlib)", lambda: JsonResponse(USER_PROFILE_PAYLOAD)),
+        ("ORJSONResponse(orjson)", lambda: ORJSONResponse(USER_PROFILE_PAYLOAD)),
+        (
+            "ninja JSONRenderer(stdlib)",
+            lambda: json_renderer.render(None, USER_PROFILE_PAYLOAD, response_status=200),
+        ),
+        (
+            "ninja ORJSONRenderer(orjson)",
+            lambda: orjson_renderer.render(None, USER_PROFILE_PAYLOAD, response_status=200),
+        ),
+    )
+
+    rows = [(name, measure(fn, iterations=iterations)) for name, fn in variants]
+
+    print_report(f"JSON rendering - user_profile payload x {iterations}", rows)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,104 @@
+"""
+Benchmark: cost of one log event, as seen by the request thread.
+
+Compares, for a request log event(like `RequestDataLoggingMiddleware`'s):
+1. The previous setup - stdlib JSON, printed synchronously, by an uncached logger
+2. `utils.logger` - orjson, written synchronously(`LOG_BACKGROUND_WRITER=False`)
+3. `utils.logger` - orjson, queued for the background writer(`LOG_BACKGROUND_WRITER=True`)
+4. `utils.logger` - an event below `LOG_LEVEL`
+5. `utils.logger` - an event sampled out(`LOG_SAMPLE_RATES`, with a 0% rate)
+
+Log lines go to /dev/null. No database, so any settings profile works.
+
+Usage:
+    python -m benchmarks.log_writing [iterations]
+"""
+
+import os
+import sys
+
+from benchmarks._bench import measure, print_report, setup_django
+
+setup_django()
+
+import structlog
+from utils.log_sampling import log_sampler
+from utils.log_writer import background_log_writer
+from utils.logger import _LineLogger, logger
+
+
+def _event(log, event="Request logged"):
+    log.info(
+        event,
+        method="GET",
+        path="/api/v1/user/12345",
+        duration=0.004,
+        status_code=200,
+        db_pool={"vendor": "postgresql", "pool_size": 20, "pool_available": 19},
+    )
+
+
+def run(iterations):
+    logger()  # configures structlog
+    config = structlog.get_config()
+    log_sampler().sample_rates["Request sampled out"] = 0.0
+
+    def configured_logger(background):
+        return structlog.wrap_logger(
+            _LineLogger(background),
+            processors=config["processors"],
+            wrapper_class=config["wrapper_class"],
+        )
+
+    sync_logger = configured_logger(background=False)
+    background_logger = configured_logger(background=True)
+
+    stdout = sys.stdout
+
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+
+        # P.S: `PrintLogger` binds its file on creation - like the old proxy, re-bound per event
+        previous_logger = structlog.wrap_logger(
+            structlog.PrintLogger(devnull),
+            processors=[structlog.processors.JSONRenderer()],
+            wrapper_class=structlog.BoundLogger,
+        )
+
+        try:
+            rows = [
+                (
+                    "previous(stdlib JSON, sync)",
+                    measure(lambda: _event(previous_logger.bind()), iterations),
+                ),
+                ("orjson, sync writer", measure(lambda: _event(sync_logger), iterations)),
+                (
+                    "orjson, background writer",
+                    measure(lambda: _event(background_logger), iterations),
+                ),
+                (
+                    "filtered(below LOG_LEVEL)",
+                    measure(lambda: sync_logger.debug("debug"), iterations),
+                ),
+                (
+                    "sampled out(LOG_SAMPLE_RATES)",
+                    measure(lambda: _event(sync_logger, "Request sampled out"), iterations),
+                ),
+            ]
+            background_log_writer.flush()
+        finally:
+            sys.stdout = stdout
+
+    rows[2][1].update(
+        {
+            key: value
+            for key, value in background_log_writer.stats().items()
+            if key in ("queue_size", "dropped")
+        }
+    )
+
+    print_report(f"log writing - one event x {iterations}", rows)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,116 @@
+"""
+Benchmark: psycopg2 vs. psycopg 3(client-side binding) vs. psycopg 3(server-side binding with
+prepared statements), for the project's hot queries.
+
+The exact SQL the ORM generates is captured first - for the email lookup(auth pipeline), the id
+lookup(`get_user_profile`), and the session expiry lookup(session stage) - and is then replayed on a raw connection
+of each driver, so only the driver and the binding mode differ between runs.
+
+Requires a PostgreSQL settings profile, and psycopg2 - the baseline(`pip install -r
+benchmarks/requirements.txt`).
+
+Usage:
+    python -m benchmarks.postgres_drivers [iterations]
+"""
+
+import sys
+
+from benchmarks._bench import measure, print_report, setup_django, test_database
+
+setup_django()
+
+from django.db import connection
+from django.db.models import Max
+from domain__auth.models import AuthToken
+from domain__user.models import User
+
+
+def _capture_hot_queries():
+    user = User.objects.create(name="Bench", email="bench@example.com", password="!")
+    captured = []
+
+    def capture(execute, sql, params, many, context):
+        captured.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        User.objects.filter(email=user.email).first()
+        User.objects.filter(id=user.id).first()
+
+        AuthToken.objects.filter(user_id=user.id, token_type=AuthToken.REFRESH).aggregate(
+            expires_at=Max("expires_at")
+        )
+
+    names = ("user by email", "user by id", "session expiry(session stage)")
+
+    return list(zip(names, captured))
+
+
+def _driver_connections():
+    settings_dict = connection.settings_dict
+    connect_kwargs = {
+        "dbname": settings_dict["NAME"],
+        "user": settings_dict["USER"],
+        "password": settings_dict["PASSWORD"],
+        "host": settings_dict["HOST"],
+        "port": settings_dict["PORT"],
+    }
+    connect_kwargs = {key: value for key, value in connect_kwargs.items() if value}
+    driver_connections = []
+
+    try:
+        import psycopg2
+    except ImportError:
+        raise SystemExit(
+            "psycopg2(the baseline) is not installed - pip install -r benchmarks/requirements.txt"
+        )
+
+    import psycopg
+
+    psycopg2_connection = psycopg2.connect(**connect_kwargs)
+    psycopg2_connection.autocommit = True
+    driver_connections.append(("psycopg2", psycopg2_connection))
+
+    driver_connections.append(
+        (
+            "psycopg 3(client-side binding)",
+            psycopg.connect(**connect_kwargs, autocommit=True, cursor_factory=psycopg.ClientCursor),
+        )
+    )
+    driver_connections.append(
+        (
+            "psycopg 3(server-side binding + prepared)",
+            psycopg.connect(**connect_kwargs, autocommit=True, prepare_threshold=0),
+        )
+    )
+
+    return driver_connections
+
+
+def run(iterations):
+    if connection.vendor != "postgresql":
+        raise SystemExit("this benchmark needs a PostgreSQL settings profile")
+
+    hot_queries = _capture_hot_queries()
+    rows = []
+
+    for driver_name, driver_connection in _driver_connections():
+        with driver_connection:
+            cursor = driver_connection.cursor()
+
+            for query_name, (sql, params) in hot_queries:
+
+                def execute_query():
+                    cursor.execute(sql, params)
+
+                    if cursor.description:
+                        cursor.fetchall()
+
+                rows.append((f"{driver_name} - {query_name}", measure(execute_query, iterations)))
+
+    print_report(f"postgres drivers - hot queries x {iterations}", rows)
+
+
+if __name__ == "__main__":
+    with test_database():
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,105 @@
+"""
+Set-based activation/de-activation of many users at once.
+
+Users are processed in chunks of `BULK_UPDATE_CHUNK_SIZE` ids. Per chunk, one SELECT reads(and locks)
+the current states - to report an outcome for every id - and one
+`UPDATE users SET is_active = ... WHERE id IN (...) AND is_active = ...` applies the change. So the
+number of queries grows with the number of chunks, never with the number of users.
+
+Since `QuerySet.update()` sends no `post_save` signals, the updated users' cache entries are dropped
+explicitly(see `domain__user.user_cache.invalidate_users`).
+
+Both the filter and the locking SELECTs run on the primary - a lagging replica would miss recently
+created users(or report stale states), and rows can only be locked on the primary.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from base.db_routers import PRIMARY_DATABASE
+from domain__user.models import User
+from domain__user.user_cache import invalidate_users
+
+BULK_UPDATE_CHUNK_SIZE = 5000
+
+UPDATED = "updated"
+UNCHANGED = "unchanged"  # already in the requested state
+NOT_FOUND = "not_found"
+SKIPPED_SELF = "skipped_self"  # admins never change their own status
+
+
+def filtered_user_ids(
+    is_admin=None, email_domain=None, created_after=None, created_before=None, limit=None
+):
+    """
+    Ids of the users matching a filter - every given condition must match. At most `limit` ids are
+    returned(in id order), when given.
+    """
+    users = User.objects.using(PRIMARY_DATABASE)
+
+    if is_admin is not None:
+        users = users.filter(is_admin=is_admin)
+
+    if email_domain:
+        users = users.filter(email__iendswith=f"@{email_domain.lstrip('@')}")
+
+    if created_after:
+        users = users.filter(created_at__gte=created_after)
+
+    if created_before:
+        users = users.filter(created_at__lt=created_before)
+
+    user_ids = users.order_by("id").values_list("id", flat=True)
+
+    return list(user_ids[:limit] if limit is not None else user_ids)
+
+
+def _set_chunk_active(user_ids, is_active):
+    with transaction.atomic():
+        current_states = dict(
+            User.objects.using(PRIMARY_DATABASE)
+            .select_for_update()
+            .filter(id__in=user_ids)
+            .values_list("id", "is_active")
+        )
+        User.objects.filter(id__in=user_ids, is_active=not is_active).update(
+            is_active=is_active, updated_at=timezone.now()
+        )
+
+    return current_states
+
+
+def set_users_active(user_ids, is_active, acting_admin_id):
+    """
+    Set `is_active` on many users - in chunks of set-based updates.
+
+    Returns:
+        dict: The outcome per user id - "updated", "unchanged", "not_found" or "skipped_self"
+    """
+    # de-duplicated, in the caller's order
+    user_ids = list(dict.fromkeys(user_ids))
+    outcomes = {}
+
+    for start in range(0, len(user_ids), BULK_UPDATE_CHUNK_SIZE):
+        chunk = [
+            user_id
+            for user_id in user_ids[start : start + BULK_UPDATE_CHUNK_SIZE]
+            if user_id != acting_admin_id
+        ]
+        current_states = _set_chunk_active(chunk, is_active) if chunk else {}
+        updated_ids = []
+
+        for user_id in chunk:
+            if user_id not in current_states:
+                outcomes[user_id] = NOT_FOUND
+            elif current_states[user_id] == is_active:
+                outcomes[user_id] = UNCHANGED
+            else:
+                outcomes[user_id] = UPDATED
+                updated_ids.append(user_id)
+
+        invalidate_users(updated_ids)
+
+    if acting_admin_id in user_ids:
+        outcomes[acting_admin_id] = SKIPPED_SELF
+
+    return outcomes
@@ -1,3 +1,221 @@
-from django.test import TestCase
+from inspect import iscoroutinefunction
+import orjson
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import signing
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from domain__user.models import User
+from domain__user.tests import sign_in
+from utils.query_assertions import assert_columns_not_fetched
+from .bulk_user_status import (
+    BULK_UPDATE_CHUNK_SIZE,
+    NOT_FOUND,
+    SKIPPED_SELF,
+    UNCHANGED,
+    UPDATED,
+    set_users_active,
+)
+from .user_export import EXPORTABLE_FIELDS, export_users
+from .user_listing import CURSOR_SALT, list_users
+from .views import export_users_view, export_users_view__async
 
-# Create your tests here.
+
+# reads from the primary - replica routing is covered in "base => tests.py"
+@override_settings(DATABASE_REPLICAS=[])
+class AdminUsersTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(
+            name="Admin", email="admin@example.com", password=make_password(None), is_admin=True
+        )
+        self.users = [
+            User.objects.create(
+                name=f"User {index}", email=f"user{index}@example.com", password=make_password(None)
+            )
+            for index in range(3)
+        ]
+        self.headers = sign_in(self.client, self.admin)
+        caches[settings.USER_CACHE_ALIAS].clear()
+
+    def test_deactivate_user_never_fetches_the_password(self):
+        user = self.users[0]
+
+        with assert_columns_not_fetched("users", ["password"]):
+            response = self.client.patch(
+                f"/api/v1/admin/deactivate-user/{user.id}", headers=self.headers
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(User.objects.get(id=user.id).is_active)
+
+    def test_listing_never_fetches_the_password(self):
+        with assert_columns_not_fetched("users", ["password"]):
+            response = self.client.get("/api/v1/admin/users", {"limit": 2}, headers=self.headers)
+            users, next_cursor = list_users(limit=2)
+            next_users, _ = list_users(cursor=next_cursor, limit=2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(users + next_users), 4)
+        self.assertTrue(all("password" not in user for user in users + next_users))
+
+    def test_export_never_fetches_the_password(self):
+        with assert_columns_not_fetched("users", ["password"]):
+            ndjson = "".join(export_users(EXPORTABLE_FIELDS, "ndjson"))
+            csv = "".join(export_users(EXPORTABLE_FIELDS, "csv"))
+
+        rows = [orjson.loads(line) for line in ndjson.splitlines()]
+
+        self.assertEqual([row["id"] for row in rows], [self.admin.id] + [u.id for u in self.users])
+        self.assertEqual(set(rows[0]), set(EXPORTABLE_FIELDS))
+        self.assertTrue(rows[0]["created_at"].endswith("Z"))
+        self.assertEqual(len(csv.splitlines()), len(rows) + 1)
+
+    def test_non_admins_are_rejected(self):
+        headers = sign_in(self.client, self.users[0])
+
+        with assert_columns_not_fetched("users", ["password"]):
+            response = self.client.get("/api/v1/admin/users", headers=headers)
+
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class BulkUserStatusTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(
+            name="Admin", email="admin@example.com", password="!", is_admin=True
+        )
+        self.active, self.inactive = (
+            User.objects.create(
+                name=f"User {index}",
+                email=f"user{index}@example.com",
+                password="!",
+                is_active=is_active,
+            )
+            for index, is_active in enumerate((True, False))
+        )
+        self.headers = sign_in(self.client, self.admin)
+        self.missing_id = self.inactive.id + 1000
+
+    def _bulk_update(self, payload):
+        return self.client.patch(
+            "/api/v1/admin/bulk-update-user-status",
+            payload,
+            content_type="application/json",
+            headers=self.headers,
+        )
+
+    def test_every_id_gets_an_outcome(self):
+        user_ids = [self.active.id, self.inactive.id, self.missing_id, self.admin.id]
+
+        response = self._bulk_update({"is_active": False, "user_ids": user_ids})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["response"]["outcomes"],
+            {
+                str(self.active.id): UPDATED,
+                str(self.inactive.id): UNCHANGED,
+                str(self.missing_id): NOT_FOUND,
+                str(self.admin.id): SKIPPED_SELF,
+            },
+        )
+        self.assertFalse(User.objects.get(id=self.active.id).is_active)
+        self.assertTrue(User.objects.get(id=self.admin.id).is_active)
+
+    def test_updates_by_filter(self):
+        response = self._bulk_update({"is_active": True, "filter": {"is_admin": False}})
+
+        self.assertEqual(response.json()["response"]["summary"], {UNCHANGED: 1, UPDATED: 1})
+        self.assertTrue(User.objects.get(id=self.inactive.id).is_active)
+
+    def test_users_past_the_chunk_boundary_are_updated(self):
+        # the first chunk is all missing ids - the active user is the first id of the second one
+        user_ids = [self.missing_id + index for index in range(BULK_UPDATE_CHUNK_SIZE)]
+        user_ids.append(self.active.id)
+
+        outcomes = set_users_active(user_ids, False, self.admin.id)
+
+        self.assertEqual(len(outcomes), BULK_UPDATE_CHUNK_SIZE + 1)
+        self.assertEqual(outcomes[self.active.id], UPDATED)
+        self.assertFalse(User.objects.get(id=self.active.id).is_active)
+
+    def test_queries_grow_with_chunks_not_users(self):
+        one_chunk = [self.missing_id + index for index in range(BULK_UPDATE_CHUNK_SIZE)]
+        two_chunks = one_chunk + [self.active.id]
+
+        # per chunk - SAVEPOINT, the locking SELECT, the UPDATE, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            set_users_active(one_chunk, False, self.admin.id)
+
+        with self.assertNumQueries(8):
+            set_users_active(two_chunks, False, self.admin.id)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class UserListingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(
+            name="Admin", email="admin@example.com", password="!", is_admin=True
+        )
+        for index in range(6):
+            User.objects.create(
+                name=f"User {index}", email=f"user{index}@example.com", password="!"
+            )
+
+        self.headers = sign_in(self.client, self.admin)
+
+    def _list(self, **params):
+        return self.client.get("/api/v1/admin/users", params, headers=self.headers)
+
+    def test_pages_do_not_overlap_when_created_at_ties(self):
+        User.objects.update(created_at=self.admin.created_at)
+
+        pages, cursor = [], None
+
+        while True:
+            users, cursor = list_users(cursor=cursor, limit=2)
+            pages.append([user["id"] for user in users])
+
+            if cursor is None:
+                break
+
+        listed_ids = [user_id for page in pages for user_id in page]
+
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(
+            listed_ids, sorted(User.objects.values_list("id", flat=True), reverse=True)
+        )
+
+    def test_invalid_cursors_are_rejected(self):
+        next_cursor = self._list(limit=2).json()["response"]["next_cursor"]
+
+        for cursor in (
+            next_cursor[:-1] + ("A" if next_cursor[-1] != "A" else "B"),  # tampered
+            signing.dumps([self.admin.created_at.isoformat(), 1], salt="another.salt"),  # foreign
+            signing.dumps([1, 1], salt=CURSOR_SALT),
+            signing.dumps(["2026-13-45T00:00:00", 1], salt=CURSOR_SALT),
+            signing.dumps("not-a-pair", salt=CURSOR_SALT),
+            "garbage",
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self._list(cursor=cursor).status_code, 400)
+
+
+class ExportStreamingTests(TestCase):
+    def _export(self, view, request_factory):
+        request = request_factory.get("/api/v1/admin/users/export")
+        request.user = User(id=1, is_admin=True)
+
+        if iscoroutinefunction(view):
+            view = async_to_sync(view)
+
+        return view(request, export_format="csv", fields="id", is_active=None, is_admin=None)
+
+    def test_exports_are_streamed_by_both_handlers(self):
+        for view in (export_users_view, export_users_view__async):
+            with self.subTest(view=view.__name__):
+                # async iterators under ASGI, sync ones under WSGI - neither is read in full first
+                self.assertTrue(self._export(view, AsyncRequestFactory()).is_async)
+                self.assertFalse(self._export(view, RequestFactory()).is_async)
@@ -0,0 +1,91 @@
+"""
+Keyset(cursor) pagination of user listings - newest first, ordered by (created_at, id).
+
+Each page continues right after the last user of the previous page - `WHERE (created_at, id) < (...)`,
+on the `users__created_at_id__idx` index - rather than skipping rows with OFFSET, so the 1000th page
+costs the same as the first one.
+
+Cursors are opaque(signed) strings - clients pass `next_cursor` back as-is, to get the next page.
+"""
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from domain__user.models import User
+from domain__user.user_queries import PROFILE_FIELDS
+
+CURSOR_SALT = "domain__admin.user_listing"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+LISTED_FIELDS = PROFILE_FIELDS
+
+
+class InvalidCursor(Exception):
+    """
+    Raised for cursors that were not issued by `encode_cursor`, or were tampered with.
+    """
+
+
+def encode_cursor(user):
+    return signing.dumps([user["created_at"].isoformat(), user["id"]], salt=CURSOR_SALT)
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, user_id = signing.loads(cursor, salt=CURSOR_SALT)
+        created_at = parse_datetime(created_at)
+    except (signing.BadSignature, TypeError, ValueError) as e:
+        raise InvalidCursor("invalid cursor") from e
+
+    if created_at is None or not isinstance(user_id, int):
+        raise InvalidCursor("invalid cursor")
+
+    return created_at, user_id
+
+
+def _users_page_query(cursor, limit, is_active, is_admin):
+    users = User.objects.order_by("-created_at", "-id")
+
+    if is_active is not None:
+        users = users.filter(is_active=is_active)
+
+    if is_admin is not None:
+        users = users.filter(is_admin=is_admin)
+
+    if cursor:
+        created_at, user_id = decode_cursor(cursor)
+        # (created_at, id) < (cursor's created_at, cursor's id) - with a plain range on created_at
+        users = users.filter(
+            Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=user_id))
+        )
+
+    # one extra row, to know whether there is a next page
+    return users.values(*LISTED_FIELDS)[: limit + 1]
+
+
+def _page(rows, limit):
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+    return rows[:limit], next_cursor
+
+
+def list_users(cursor=None, limit=DEFAULT_PAGE_SIZE, is_active=None, is_admin=None):
+    """
+    A page of users(as dicts of `LISTED_FIELDS`), and the cursor of the next page - None on the last
+    page.
+
+    Raises:
+        InvalidCursor: If `cursor` is not a valid cursor
+    """
+    return _page(list(_users_page_query(cursor, limit, is_active, is_admin)), limit)
+
+
+async def alist_users(cursor=None, limit=DEFAULT_PAGE_SIZE, is_active=None, is_admin=None):
+    """
+    Async version of `list_users`.
+    """
+    rows = [row async for row in _users_page_query(cursor, limit, is_active, is_admin)]
+
+    return _page(rows, limit)
@@ -1,8 +1,20 @@
 from django.shortcuts import render
-from ninja import Router, Schema
-from typing import Optional
+from asgiref.sync import sync_to_async
+from ninja import Query, Router, Schema
+from typing import List, Optional
 from datetime import datetime
+from django.conf import settings
 from domain__user.models import User
+from domain__user.user_queries import users_for_profile
+from .bulk_user_status import UPDATED, filtered_user_ids, set_users_active
+from .user_export import (
+    EXPORT_FORMATS,
+    InvalidExportFields,
+    aexport_users,
+    export_users,
+    parse_export_fields,
+)
+from .user_listing import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, alist_users, list_users
 from utils.coded_error_handlers import (
     error_handler_403,
     error_handler_404,
@@ -14,10 +26,14 @@ from utils.logger import logger
 # from middlewares.auth__access_and_session_middleware import AuthBearer
 from utils.generate_tokens import generate_tokens
 from utils.cookie_deploy_handler import deploy_auth_cookie
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from utils.json_response import ORJSONResponse
 
 log = logger()
 admin_router = Router()
+
+
 class ResponseSpecs(Schema):
     response_message: str
     response: dict
@@ -28,14 +44,47 @@ class ResponseSpecs(Schema):
         exclude_none = True
 
 
+class InSpecs__UserFilter(Schema):
+    is_admin: Optional[bool] = None
+    email_domain: Optional[str] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+
+class InSpecs__BulkUserStatus(Schema):
+    is_active: bool
+    user_ids: Optional[List[int]] = None
+    filter: Optional[InSpecs__UserFilter] = None
+
+
 @admin_router.get("/", response=ResponseSpecs)
 def admin_base(request):
-    return JsonResponse(
+    return ORJSONResponse(
         {"response_message": "Admin domain is live!!!", "response": {"message": "OK!!!"}}
     )
 
 
-@admin_router.patch("/deactivate-user/{user_id}", response=ResponseSpecs)
+def _deactivated_user_response(request, user):
+    return ORJSONResponse(
+        {
+            "response_message": "User deactivated successfully.",
+            "response": {
+                "user_profile": {
+                    "id": user.id,
+                    "name": user.name or "",
+                    "email": user.email,
+                    "is_admin": user.is_admin,
+                    "is_active": user.is_active,
+                    "created_at": user.created_at,
+                    "updated_at": user.updated_at,
+                },
+                "access_token": getattr(request, "new_access_token", None),
+                "refresh_token": getattr(request, "new_refresh_token", None),
+            },
+        }
+    )
+
+
 def deactivate_user(request, user_id: int):
     """
     Deactivate a user by ID (admin only)
@@ -52,7 +101,7 @@ def deactivate_user(request, user_id: int):
             return error_handler_403("You are not allowed to perform this action")
 
         # Find user to deactivate
-        user_to_deactivate = User.objects.filter(id=user_id).first()
+        user_to_deactivate = users_for_profile().filter(id=user_id).first()
 
         if not user_to_deactivate:
             return error_handler_404(f"user with id: '{user_id}' not found or does not exist")
@@ -62,30 +111,342 @@ def deactivate_user(request, user_id: int):
 
         # Deactivate user
         user_to_deactivate.is_active = False
-        user_to_deactivate.save()
-
-        response_data = JsonResponse(
-            {
-                "response_message": "User deactivated successfully.",
-                "response": {
-                    "user_profile": {
-                        "id": user_to_deactivate.id,
-                        "name": user_to_deactivate.name or "",
-                        "email": user_to_deactivate.email,
-                        "is_admin": user_to_deactivate.is_admin,
-                        "is_active": user_to_deactivate.is_active,
-                        "created_at": user_to_deactivate.created_at,
-                        "updated_at": user_to_deactivate.updated_at,
-                    },
-                    "access_token": getattr(request, "new_access_token", None),
-                    "refresh_token": getattr(request, "new_refresh_token", None),
-                },
-            }
-        )
+        user_to_deactivate.save(update_fields=['is_active', 'updated_at'])
+
+        return _deactivated_user_response(request, user_to_deactivate)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error during login", error=str(e))
+        return error_handler_500(e)
+
+
+async def deactivate_user__async(request, user_id: int):
+    """
+    Deactivate a user by ID (admin only) - async version of `deactivate_user`
+    """
+    try:
+        # Get admin user from request (set by middleware)
+        admin_user = request.user
+
+        if not admin_user.is_admin:
+            log.error(
+                "Non-admin user attempted to deactivate user",
+                action_attempted_by=f"user with id: {admin_user.id}",
+            )
+            return error_handler_403("You are not allowed to perform this action")
+
+        # Find user to deactivate
+        user_to_deactivate = await users_for_profile().filter(id=user_id).afirst()
+
+        if not user_to_deactivate:
+            return error_handler_404(f"user with id: '{user_id}' not found or does not exist")
+
+        if user_to_deactivate.is_active == False:
+            return error_handler_400(f"user with id: '{user_id}' has already been de-activated")
 
-        return response_data
+        # Deactivate user
+        user_to_deactivate.is_active = False
+        await user_to_deactivate.asave(update_fields=['is_active', 'updated_at'])
+
+        return _deactivated_user_response(request, user_to_deactivate)
 
     except (ValueError, TypeError, AttributeError) as e:
         log.error("Error during login", error=str(e))
         return error_handler_500(e)
 
+
+def _validate_bulk_user_status(request, payload):
+    if not request.user.is_admin:
+        log.error(
+            "Non-admin user attempted to bulk update user status",
+            action_attempted_by=f"user with id: {request.user.id}",
+        )
+        return error_handler_403("You are not allowed to perform this action")
+
+    if (payload.user_ids is None) == (payload.filter is None):
+        return error_handler_400("Exactly one of 'user_ids' or 'filter' must be provided")
+
+    return None
+
+
+def _resolve_bulk_user_ids(payload, max_users):
+    if payload.user_ids is not None:
+        return payload.user_ids
+
+    # one id past the limit is enough to reject the request - never load every matching id
+    return filtered_user_ids(**payload.filter.dict(), limit=max_users + 1)
+
+
+def _apply_bulk_user_status(request, payload):
+    """
+    Resolve the target users, and apply the change - or return an error response.
+    """
+    max_users = int(settings.ADMIN_BULK_UPDATE_MAX_USERS)
+    user_ids = _resolve_bulk_user_ids(payload, max_users)
+
+    if len(user_ids) > max_users:
+        return None, error_handler_400(
+            f"Too many users - at most {max_users} users can be updated per request"
+        )
+
+    return set_users_active(user_ids, payload.is_active, request.user.id), None
+
+
+def _bulk_user_status_response(request, payload, outcomes):
+    summary = {}
+
+    for outcome in outcomes.values():
+        summary[outcome] = summary.get(outcome, 0) + 1
+
+    log.info(
+        "Bulk user status update",
+        is_active=payload.is_active,
+        action_performed_by=f"user with id: {request.user.id}",
+        **summary,
+    )
+
+    return ORJSONResponse(
+        {
+            "response_message": (
+                f"{summary.get(UPDATED, 0)} user(s) "
+                f"{'re-activated' if payload.is_active else 'deactivated'} successfully."
+            ),
+            "response": {
+                "summary": summary,
+                "outcomes": {str(user_id): outcome for user_id, outcome in outcomes.items()},
+                "access_token": getattr(request, "new_access_token", None),
+                "refresh_token": getattr(request, "new_refresh_token", None),
+            },
+        }
+    )
+
+
+def bulk_update_user_status(request, payload: InSpecs__BulkUserStatus):
+    """
+    Deactivate or re-activate many users at once - by id list or by filter (admin only)
+    """
+    try:
+        error_response = _validate_bulk_user_status(request, payload)
+
+        if error_response:
+            return error_response
+
+        outcomes, error_response = _apply_bulk_user_status(request, payload)
+
+        if error_response:
+            return error_response
+
+        return _bulk_user_status_response(request, payload, outcomes)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error during bulk user status update", error=str(e))
+        return error_handler_500(e)
+
+
+async def bulk_update_user_status__async(request, payload: InSpecs__BulkUserStatus):
+    """
+    Deactivate or re-activate many users at once (admin only) - async version of
+    `bulk_update_user_status`
+    """
+    try:
+        error_response = _validate_bulk_user_status(request, payload)
+
+        if error_response:
+            return error_response
+
+        # transactions are not supported by the async ORM - run the chunked updates in a thread
+        outcomes, error_response = await sync_to_async(_apply_bulk_user_status)(request, payload)
+
+        if error_response:
+            return error_response
+
+        return _bulk_user_status_response(request, payload, outcomes)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error during bulk user status update", error=str(e))
+        return error_handler_500(e)
+
+
+def _validate_list_users(request, limit):
+    if not request.user.is_admin:
+        log.error(
+            "Non-admin user attempted to list users",
+            action_attempted_by=f"user with id: {request.user.id}",
+        )
+        return error_handler_403("You are not allowed to perform this action")
+
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return error_handler_400(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+
+    return None
+
+
+def _users_list_response(request, users, next_cursor):
+    return ORJSONResponse(
+        {
+            "response_message": "Users retrieved successfully.",
+            "response": {
+                "users": users,
+                "next_cursor": next_cursor,
+                "access_token": getattr(request, "new_access_token", None),
+                "refresh_token": getattr(request, "new_refresh_token", None),
+            },
+        }
+    )
+
+
+def get_users(
+    request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+):
+    """
+    List users - newest first, one page per request (admin only). Pass a page's `next_cursor` back
+    as `cursor` to get the next page.
+    """
+    try:
+        error_response = _validate_list_users(request, limit)
+
+        if error_response:
+            return error_response
+
+        users, next_cursor = list_users(cursor, limit, is_active, is_admin)
+
+        return _users_list_response(request, users, next_cursor)
+
+    except InvalidCursor:
+        return error_handler_400("Invalid cursor - pass a 'next_cursor' value as-is")
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error listing users", error=str(e))
+        return error_handler_500(e)
+
+
+async def get_users__async(
+    request,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+):
+    """
+    List users (admin only) - async version of `get_users`
+    """
+    try:
+        error_response = _validate_list_users(request, limit)
+
+        if error_response:
+            return error_response
+
+        users, next_cursor = await alist_users(cursor, limit, is_active, is_admin)
+
+        return _users_list_response(request, users, next_cursor)
+
+    except InvalidCursor:
+        return error_handler_400("Invalid cursor - pass a 'next_cursor' value as-is")
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error listing users", error=str(e))
+        return error_handler_500(e)
+
+
+def _validate_export_users(request, export_format, fields):
+    """
+    Return the parsed export fields - or an error response.
+    """
+    if not request.user.is_admin:
+        log.error(
+            "Non-admin user attempted to export users",
+            action_attempted_by=f"user with id: {request.user.id}",
+        )
+        return None, error_handler_403("You are not allowed to perform this action")
+
+    if export_format not in EXPORT_FORMATS:
+        return None, error_handler_400(f"'format' must be one of: {', '.join(EXPORT_FORMATS)}")
+
+    try:
+        return parse_export_fields(fields), None
+    except InvalidExportFields as e:
+        return None, error_handler_400(str(e))
+
+
+def _export_rows(request, export_fields, export_format, is_active, is_admin):
+    # the kind of iterator the server streams - Django reads the other kind in full, into memory,
+    # before sending it(sync iterators under ASGI, async ones under WSGI)
+    if isinstance(request, ASGIRequest):
+        return aexport_users(export_fields, export_format, is_active, is_admin)
+
+    return export_users(export_fields, export_format, is_active, is_admin)
+
+
+def _export_users_response(request, export_format, fields, rows):
+    log.info(
+        "Users export started",
+        format=export_format,
+        fields=fields,
+        action_performed_by=f"user with id: {request.user.id}",
+    )
+
+    response = StreamingHttpResponse(rows, content_type=EXPORT_FORMATS[export_format])
+    response["Content-Disposition"] = f'attachment; filename="users.{export_format}"'
+
+    return response
+
+
+def export_users_view(
+    request,
+    export_format: str = Query("ndjson", alias="format"),
+    fields: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+):
+    """
+    Stream the users table as NDJSON or CSV (admin only) - `fields` is a comma-separated list of
+    columns(default: all exportable columns). Served under ASGI, the rows are read with the async
+    ORM(`aexport_users`), so they are still streamed.
+    """
+    export_fields, error_response = _validate_export_users(request, export_format, fields)
+
+    if error_response:
+        return error_response
+
+    rows = _export_rows(request, export_fields, export_format, is_active, is_admin)
+
+    return _export_users_response(request, export_format, export_fields, rows)
+
+
+async def export_users_view__async(
+    request,
+    export_format: str = Query("ndjson", alias="format"),
+    fields: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+):
+    """
+    Stream the users table as NDJSON or CSV (admin only) - async version of `export_users_view`
+    """
+    export_fields, error_response = _validate_export_users(request, export_format, fields)
+
+    if error_response:
+        return error_response
+
+    rows = _export_rows(request, export_fields, export_format, is_active, is_admin)
+
+    return _export_users_response(request, export_format, export_fields, rows)
+
+
+# sync or async views - see `ASYNC_VIEWS` in "settings => base.py"
+admin_router.patch("/deactivate-user/{user_id}", response=ResponseSpecs)(
+    deactivate_user__async if settings.ASYNC_VIEWS else deactivate_user
+)
+admin_router.patch("/bulk-update-user-status", response=ResponseSpecs)(
+    bulk_update_user_status__async if settings.ASYNC_VIEWS else bulk_update_user_status
+)
+admin_router.get("/users", response=ResponseSpecs)(
+    get_users__async if settings.ASYNC_VIEWS else get_users
+)
+admin_router.get("/users/export")(
+    export_users_view__async if settings.ASYNC_VIEWS else export_users_view
+)
@@ -0,0 +1,136 @@
+"""
+Benchmark the configured password hashers on this machine, and recommend cost parameters that
+match a target latency per hash.
+
+Usage:
+    python manage.py calibrate_password_hashers --target-ms 250 --samples 5
+
+Apply a recommendation by sub-classing the hasher with the recommended parameters, and listing the
+sub-class first in `PASSWORD_HASHERS`. Existing hashes are upgraded to the new parameters on each
+user's next log-in(see `domain__auth.password_rehash`).
+"""
+
+import math
+import statistics
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+# tunable cost parameter per hasher algorithm, and how the cost scales with it
+LINEAR = "linear"
+LOG2 = "log2"
+
+COST_PARAMETERS = {
+    "pbkdf2_sha256": ("iterations", LINEAR),
+    "pbkdf2_sha1": ("iterations", LINEAR),
+    "argon2": ("time_cost", LINEAR),
+    "bcrypt_sha256": ("rounds", LOG2),
+    "bcrypt": ("rounds", LOG2),
+    "scrypt": ("work_factor", LOG2),
+}
+
+
+def _time_hasher(hasher, password, samples):
+    salt = hasher.salt()
+    timings = []
+
+    for _ in range(samples):
+        started_at = time.perf_counter()
+        hasher.encode(password, salt)
+        timings.append(time.perf_counter() - started_at)
+
+    return statistics.median(timings) * 1000
+
+
+def _recommend(value, scaling, ratio):
+    if scaling == LINEAR:
+        recommended = max(int(value * ratio), 1)
+
+        # round iteration counts to a readable number
+        if recommended >= 10000:
+            recommended = int(round(recommended, -3))
+
+        return recommended
+
+    # log2 parameters - `rounds` is the exponent itself, `work_factor` is a power of two
+    steps = round(math.log2(ratio))
+
+    if isinstance(value, int) and value > 64:
+        return max(int(value * 2**steps), 2)
+
+    return min(max(value + steps, 4), 31)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the configured PASSWORD_HASHERS on this machine, and recommend cost "
+        "parameters for a target number of milliseconds per hash."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250.0,
+            help="Target latency per hash, in milliseconds(default: 250).",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=5,
+            help="Number of hashes timed per measurement - the median is used(default: 5).",
+        )
+        parser.add_argument(
+            "--password",
+            default="calibration-password-1234",
+            help="Password used for the measurements.",
+        )
+
+    def handle(self, *args, **options):
+        target_ms = options["target_ms"]
+        samples = max(options["samples"], 1)
+        password = options["password"]
+
+        self.stdout.write(f"Target: {target_ms:.1f} ms per hash(median of {samples} samples)\n")
+
+        for index, hasher in enumerate(get_hashers()):
+            hasher_path = f"{type(hasher).__module__}.{type(hasher).__qualname__}"
+            default_label = " - default" if index == 0 else ""
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{hasher.algorithm}{default_label}"))
+            self.stdout.write(f"  hasher: {hasher_path}")
+
+            try:
+                current_ms = _time_hasher(hasher, password, samples)
+            except ValueError as e:
+                # e.g. the hasher's library(argon2-cffi, bcrypt) is not installed
+                self.stdout.write(self.style.WARNING(f"  skipped: {e}\n"))
+                continue
+
+            cost_parameter = COST_PARAMETERS.get(hasher.algorithm)
+
+            if not cost_parameter:
+                self.stdout.write(f"  current: {current_ms:.1f} ms/hash")
+                self.stdout.write("  no tunable cost parameter\n")
+                continue
+
+            parameter, scaling = cost_parameter
+            current_value = getattr(hasher, parameter)
+            recommended_value = _recommend(current_value, scaling, target_ms / current_ms)
+
+            # measure the recommendation, rather than trusting the extrapolation
+            setattr(hasher, parameter, recommended_value)
+            recommended_ms = _time_hasher(hasher, password, samples)
+            setattr(hasher, parameter, current_value)
+
+            self.stdout.write(f"  current: {parameter}={current_value} -> {current_ms:.1f} ms/hash")
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"  recommended: {parameter}={recommended_value} -> {recommended_ms:.1f} ms/hash"
+                )
+            )
+            self.stdout.write(
+                f"  apply with:\n"
+                f"    class Calibrated{type(hasher).__name__}({type(hasher).__name__}):\n"
+                f"        {parameter} = {recommended_value}\n"
+            )
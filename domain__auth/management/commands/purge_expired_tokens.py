@@ -0,0 +1,26 @@
+"""
+Delete expired auth tokens from the `auth_tokens` table - e.g. from a daily cron job.
+
+Usage:
+    python manage.py purge_expired_tokens --batch-size 1000
+"""
+
+from django.core.management.base import BaseCommand
+from domain__auth.token_store import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired auth tokens, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows deleted per statement(default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_tokens(batch_size=max(options["batch_size"], 1))
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired token(s)"))
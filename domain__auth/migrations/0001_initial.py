@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('domain__user', '0004_alter_user_refresh_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name='ID'
+                    ),
+                ),
+                (
+                    'token_type',
+                    models.CharField(
+                        choices=[('access', 'access'), ('refresh', 'refresh')],
+                        max_length=7,
+                        verbose_name='token type',
+                    ),
+                ),
+                ('token_digest', models.CharField(max_length=64, verbose_name='token digest')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='expires at')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                (
+                    'user',
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='auth_tokens',
+                        to='domain__user.user',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'auth token',
+                'verbose_name_plural': 'auth tokens',
+                'db_table': 'auth_tokens',
+                'constraints': [
+                    models.UniqueConstraint(
+                        fields=('user', 'token_digest'),
+                        name='auth_tokens__user_token_digest__unique',
+                    )
+                ],
+            },
+        ),
+    ]
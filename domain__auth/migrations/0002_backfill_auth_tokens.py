@@ -0,0 +1,68 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:52
+
+import hashlib
+from datetime import datetime, timezone
+
+import jwt
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def _token_row(AuthToken, user_id, token_type, token):
+    try:
+        # signature and expiry are not verified - only the expiry claim is needed here
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.InvalidTokenError:
+        return None
+
+    if "exp" not in claims:
+        return None
+
+    return AuthToken(
+        user_id=user_id,
+        token_type=token_type,
+        token_digest=hashlib.sha256(token.encode()).hexdigest(),
+        expires_at=datetime.fromtimestamp(claims["exp"], tz=timezone.utc),
+    )
+
+
+def backfill_auth_tokens(apps, schema_editor):
+    User = apps.get_model('domain__user', 'User')
+    AuthToken = apps.get_model('domain__auth', 'AuthToken')
+    db_alias = schema_editor.connection.alias
+
+    users = (
+        User.objects.using(db_alias)
+        .exclude(access_token__isnull=True, refresh_token__isnull=True)
+        .values_list('id', 'access_token', 'refresh_token')
+        .order_by('id')
+    )
+    rows = []
+
+    for user_id, access_token, refresh_token in users.iterator(chunk_size=BATCH_SIZE):
+        for token_type, token in (('access', access_token), ('refresh', refresh_token)):
+            row = _token_row(AuthToken, user_id, token_type, token) if token else None
+
+            if row:
+                rows.append(row)
+
+        if len(rows) >= BATCH_SIZE:
+            AuthToken.objects.using(db_alias).bulk_create(rows, ignore_conflicts=True)
+            rows = []
+
+    if rows:
+        AuthToken.objects.using(db_alias).bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain__auth', '0001_initial'),
+        ('domain__user', '0004_alter_user_refresh_token'),
+    ]
+
+    operations = [
+        # not reversible - only token digests are stored, so the tokens cannot be restored
+        migrations.RunPython(backfill_auth_tokens, migrations.RunPython.noop),
+    ]
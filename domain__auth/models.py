@@ -1,3 +1,45 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
+from domain__user.models import User
 
-# Create your models here.
+
+class AuthToken(models.Model):
+    """
+    Issued auth tokens - one narrow row per token, keyed by user and token digest.
+
+    Only the token's SHA-256 digest is stored, never the token itself. Log-ins and registrations
+    insert rows here, instead of re-saving the whole `users` row, and the session stage only reads
+    the user's latest refresh token expiry(see `domain__auth.token_store`). Expired rows are
+    cleaned up by `python manage.py purge_expired_tokens`, through the `expires_at` index.
+    """
+
+    ACCESS = 'access'
+    REFRESH = 'refresh'
+    TOKEN_TYPES = [
+        (ACCESS, _('access')),
+        (REFRESH, _('refresh')),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='auth_tokens',
+        db_index=False,  # covered by the (user, token_digest) unique constraint below
+    )
+    token_type = models.CharField(_('token type'), max_length=7, choices=TOKEN_TYPES)
+    token_digest = models.CharField(_('token digest'), max_length=64)  # hex SHA-256
+    expires_at = models.DateTimeField(_('expires at'), db_index=True)
+    created_at = models.DateTimeField(_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('auth token')
+        verbose_name_plural = _('auth tokens')
+        db_table = 'auth_tokens'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'token_digest'], name='auth_tokens__user_token_digest__unique'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.token_type} token for user {self.user_id}"
@@ -0,0 +1,40 @@
+"""
+Transparent password rehashing on log-in.
+
+When a user logs in with a password whose stored hash was made with a different hasher, or with
+different parameters(e.g. fewer iterations), than the current default in `PASSWORD_HASHERS`, the
+password is re-hashed with the current parameters and saved - in the background, so the log-in
+response never waits for it.
+"""
+
+from domain__user.models import User
+from domain__user.user_cache import invalidate_user
+from utils.background_tasks import run_in_background
+from utils.logger import logger
+from utils.password_hashing_executor import PasswordHashingPoolSaturated, hash_password
+
+log = logger()
+
+
+def _rehash_password(user_id, password, old_encoded):
+    try:
+        new_encoded = hash_password(password)
+    except PasswordHashingPoolSaturated:
+        # not urgent - the upgrade is retried on the user's next log-in
+        log.info("Password rehash skipped - hashing pool saturated", user_id=user_id)
+        return
+
+    # only replace the exact hash that was verified - never a password changed in the meantime
+    updated = User.objects.filter(id=user_id, password=old_encoded).update(password=new_encoded)
+
+    if updated:
+        invalidate_user(user_id)
+        log.info("Password rehashed with current hasher parameters", user_id=user_id)
+
+
+def schedule_password_rehash(user_id, password, old_encoded):
+    """
+    Re-hash and save a user's(verified) password with the current hasher parameters, off the
+    response path.
+    """
+    run_in_background(_rehash_password, user_id, password, old_encoded)
@@ -1,3 +1,493 @@
-from django.test import TestCase
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+import jwt
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from middlewares import auth__pipeline
+from middlewares.auth__pipeline import run_access_stage
+from domain__user.models import User
+from domain__user.tests import sign_in
+from utils.generate_tokens import (
+    AUTH_COOKIE_PREFIX,
+    AUTH_COOKIE_SEPARATOR,
+    auth_cookie_needs_renewal,
+    auth_cookie_verification_cache,
+    averify_auth_cookie,
+    decode_token,
+    decoded_token_cache,
+    generate_auth_cookie,
+    generate_tokens,
+    sign_auth_cookie,
+    token_cache_stats,
+    verify_auth_cookie,
+)
+from utils.password_hashing_executor import password_hashing_executor
+from utils.query_assertions import assert_columns_not_fetched
+from . import token_store, token_write_behind
+from .models import AuthToken
+from .token_store import (
+    _token_rows,
+    get_session_expiry,
+    purge_expired_tokens,
+    store_tokens,
+    token_digest,
+)
+from .token_write_behind import _TokenWriteBehindQueue
 
-# Create your tests here.
+
+# reads from the primary - replica routing is covered in "base => tests.py"
+@override_settings(DATABASE_REPLICAS=[])
+class AuthPipelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            name="Ann", email="ann@example.com", password=make_password(None)
+        )
+        self.headers = sign_in(self.client, self.user)
+        self.path = f"/api/v1/user/{self.user.id}"
+
+        # every check below starts cold - user, session expiry and cookie verification
+        caches[settings.USER_CACHE_ALIAS].clear()
+        auth_cookie_verification_cache.clear()
+
+    def test_authenticated_requests_never_fetch_the_password(self):
+        with assert_columns_not_fetched("users", ["password"]):
+            response = self.client.get(self.path, headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejected_requests_never_fetch_the_password(self):
+        cookies = self.client.cookies
+
+        with assert_columns_not_fetched("users", ["password"]):
+            cookies["Fast_Django_Backend_Template"] = generate_auth_cookie("bob@example.com")
+            wrong_cookie = self.client.get(self.path, headers=self.headers)
+
+            cookies["Fast_Django_Backend_Template"] = generate_auth_cookie("nobody@example.com")
+            unknown_user = self.client.get(
+                self.path, headers={**self.headers, "email": "nobody@example.com"}
+            )
+
+        self.assertEqual(wrong_cookie.status_code, 401)
+        self.assertEqual(unknown_user.status_code, 404)
+
+    def test_requests_without_credentials_are_rejected(self):
+        self.assertEqual(self.client.get(self.path).status_code, 400)
+
+        self.client.cookies.clear()
+
+        self.assertEqual(self.client.get(self.path, headers=self.headers).status_code, 401)
+
+
+def _issue_tokens(user):
+    return generate_tokens({"user_id": user.id, "email": user.email, "token_type": "auth"})
+
+
+# flushed on the test thread - the flusher thread is never started
+@mock.patch.object(token_write_behind, "close_old_connections", mock.Mock())
+@mock.patch.object(_TokenWriteBehindQueue, "_ensure_flusher", mock.Mock())
+@override_settings(TOKEN_WRITE_BEHIND=True, TOKEN_WRITE_BEHIND_MAX_RETRIES="1")
+class TokenWriteBehindTests(TestCase):
+    def setUp(self):
+        self.queue = _TokenWriteBehindQueue()
+        self.users = [
+            User.objects.create(
+                name=f"User {index}", email=f"user{index}@example.com", password="!"
+            )
+            for index in range(2)
+        ]
+
+    def _enqueue(self, user):
+        return self.queue.enqueue(user.id, _token_rows(user.id, _issue_tokens(user)))
+
+    def test_a_flush_writes_all_pending_users_at_once(self):
+        for user in self.users:
+            self.assertTrue(self._enqueue(user))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.queue.flush(), 0)
+
+        self.assertEqual(AuthToken.objects.count(), 4)
+        self.assertEqual(self.queue.stats()["flushed_users"], 2)
+        self.assertEqual(self.queue.stats()["pending_users"], 0)
+
+    def test_failed_rows_are_retried_then_dropped(self):
+        self._enqueue(self.users[0])
+
+        with mock.patch.object(
+            AuthToken.objects, "bulk_create", side_effect=DatabaseError("database is down")
+        ):
+            self.assertEqual(self.queue.flush(), 1)  # re-queued
+            self.assertEqual(self.queue.stats()["pending_users"], 1)
+
+            self.assertEqual(self.queue.flush(), 1)  # out of retries
+
+        stats = self.queue.stats()
+
+        self.assertEqual((stats["retried_users"], stats["dropped_users"]), (1, 1))
+        self.assertEqual(stats["pending_users"], 0)
+        self.assertFalse(AuthToken.objects.exists())
+
+    def test_retried_rows_are_written_once_the_database_recovers(self):
+        self._enqueue(self.users[0])
+
+        with mock.patch.object(
+            AuthToken.objects, "bulk_create", side_effect=DatabaseError("database is down")
+        ):
+            self.queue.flush()
+
+        self.assertEqual(self.queue.flush(), 0)
+        self.assertEqual(AuthToken.objects.filter(user=self.users[0]).count(), 2)
+
+    def test_shutdown_flushes_and_falls_back_to_synchronous_writes(self):
+        self._enqueue(self.users[0])
+
+        self.queue.shutdown()
+
+        self.assertEqual(AuthToken.objects.count(), 2)
+        self.assertFalse(self._enqueue(self.users[1]))
+        self.assertEqual(self.queue.stats()["sync_fallbacks"], 1)
+
+
+@override_settings(TOKEN_WRITE_BEHIND=True)
+class StoreTokensWriteBehindTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Ann", email="ann@example.com", password="!")
+        caches[settings.USER_CACHE_ALIAS].clear()
+
+    def test_tokens_are_written_synchronously_with_a_process_local_cache(self):
+        with mock.patch.object(token_store, "queue_tokens") as queue_tokens:
+            store_tokens(self.user.id, _issue_tokens(self.user))
+
+        queue_tokens.assert_not_called()
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 2)
+
+    def test_queued_sessions_are_shared_through_the_user_cache(self):
+        shared_cache = {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tempfile.mkdtemp(),
+        }
+
+        with self.settings(CACHES={**settings.CACHES, settings.USER_CACHE_ALIAS: shared_cache}):
+            with mock.patch.object(token_store, "queue_tokens", return_value=True):
+                store_tokens(self.user.id, _issue_tokens(self.user))
+
+            self.assertFalse(AuthToken.objects.exists())  # e.g. killed before the flush
+
+            with self.assertNumQueries(0):
+                self.assertIsNotNone(get_session_expiry(self.user.id))
+
+
+def _legacy_auth_cookie(email):
+    # the pre-v2 format - a PBKDF2 hash of the email, plus the raw secret
+    return AUTH_COOKIE_SEPARATOR.join(
+        [AUTH_COOKIE_PREFIX, make_password(email, hasher="pbkdf2_sha256"), settings.SECRET_KEY]
+    )
+
+
+class AuthCookieTests(SimpleTestCase):
+    email = "ann@example.com"
+
+    def setUp(self):
+        auth_cookie_verification_cache.clear()
+
+    def test_a_signed_cookie_verifies(self):
+        auth_cookie = generate_auth_cookie(self.email)
+
+        self.assertTrue(verify_auth_cookie(auth_cookie, self.email))
+        self.assertTrue(async_to_sync(averify_auth_cookie)(auth_cookie, self.email))
+
+    def test_a_tampered_cookie_fails(self):
+        auth_cookie = generate_auth_cookie(self.email)
+        last_character = "0" if auth_cookie[-1] != "0" else "1"
+        later_expiry = str(int(time.time()) + 10**6)
+
+        for tampered in (
+            auth_cookie[:-1] + last_character,
+            auth_cookie.replace(auth_cookie.split(AUTH_COOKIE_SEPARATOR)[2], later_expiry),
+            auth_cookie.replace("v2", "v3"),
+        ):
+            with self.subTest(tampered=tampered):
+                self.assertFalse(verify_auth_cookie(tampered, self.email))
+
+    def test_an_expired_cookie_fails(self):
+        self.assertFalse(
+            verify_auth_cookie(sign_auth_cookie(self.email, int(time.time()) - 1), self.email)
+        )
+
+    def test_a_cookie_is_bound_to_its_email(self):
+        auth_cookie = generate_auth_cookie(self.email)
+
+        self.assertTrue(verify_auth_cookie(auth_cookie, self.email))  # now cached
+        self.assertFalse(verify_auth_cookie(auth_cookie, "bob@example.com"))
+
+    def test_a_legacy_cookie_still_verifies(self):
+        auth_cookie = _legacy_auth_cookie(self.email)
+
+        self.assertTrue(verify_auth_cookie(auth_cookie, self.email))
+        self.assertFalse(verify_auth_cookie(auth_cookie, "bob@example.com"))
+
+        with self.settings(AUTH_COOKIE_ACCEPT_LEGACY_FORMAT=False):
+            auth_cookie_verification_cache.clear()
+
+            self.assertFalse(verify_auth_cookie(auth_cookie, self.email))
+
+    def test_legacy_and_expiring_cookies_need_renewal(self):
+        threshold = 600
+
+        self.assertFalse(auth_cookie_needs_renewal(generate_auth_cookie(self.email), threshold))
+        self.assertTrue(
+            auth_cookie_needs_renewal(
+                sign_auth_cookie(self.email, int(time.time()) + threshold - 60), threshold
+            )
+        )
+        self.assertTrue(auth_cookie_needs_renewal(_legacy_auth_cookie(self.email), threshold))
+
+
+@override_settings(DATABASE_REPLICAS=[], JWT_ROTATION_THRESHOLD="10")
+class AccessTokenRotationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Ann", email="ann@example.com", password="!")
+        caches[settings.USER_CACHE_ALIAS].clear()
+
+    def _access_stage(self, expires_in):
+        access_token = jwt.encode(
+            {
+                "user_id": self.user.id,
+                "email": self.user.email,
+                "exp": int(time.time()) + expires_in,
+            },
+            settings.SECRET_KEY,
+            algorithm="HS256",
+        )
+        request = RequestFactory().get(
+            f"/api/v1/user/{self.user.id}",
+            headers={"email": self.user.email, "authorization": f"Bearer {access_token}"},
+        )
+        request.COOKIES["Fast_Django_Backend_Template"] = generate_auth_cookie(self.user.email)
+
+        with mock.patch.object(
+            auth__pipeline, "generate_tokens", wraps=generate_tokens
+        ) as minted_tokens:
+            self.assertIsNone(run_access_stage(request))
+
+        return request, minted_tokens.called
+
+    def test_fresh_tokens_pass_through_untouched(self):
+        request, minted_tokens = self._access_stage(expires_in=30 * 60)
+
+        self.assertFalse(minted_tokens)
+        self.assertFalse(hasattr(request, "new_access_token"))
+        self.assertFalse(hasattr(request, "auth_cookie"))
+        self.assertEqual(request.user.id, self.user.id)
+
+    def test_tokens_within_the_rotation_threshold_rotate(self):
+        request, minted_tokens = self._access_stage(expires_in=5 * 60)
+
+        self.assertTrue(minted_tokens)
+        self.assertTrue(request.new_access_token)
+        self.assertTrue(request.new_refresh_token)
+        self.assertTrue(request.auth_cookie)
+
+    def test_expired_tokens_rotate(self):
+        request, minted_tokens = self._access_stage(expires_in=-60)
+
+        self.assertTrue(minted_tokens)
+        self.assertTrue(request.new_access_token)
+        self.assertTrue(request.auth_cookie)
+
+
+class DecodeTokenCacheTests(SimpleTestCase):
+    def setUp(self):
+        decoded_token_cache.clear()
+
+    def _token(self, expires_in):
+        return jwt.encode(
+            {"user_id": 1, "exp": int(time.time()) + expires_in}, settings.SECRET_KEY, "HS256"
+        )
+
+    def test_hits_and_misses_are_counted(self):
+        token = self._token(60)
+
+        self.assertEqual(decode_token(token), decode_token(token))
+
+        stats = token_cache_stats()["jwt_decode"]
+
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+    def test_entries_never_outlive_the_token(self):
+        token = self._token(1)
+        claims = decode_token(token)
+
+        # cached until the token's exp - then dropped, and the token decoded(and rejected) again
+        self.assertEqual(
+            [expires_at for _, expires_at in decoded_token_cache._entries.values()], [claims["exp"]]
+        )
+
+        time.sleep(max(claims["exp"] - time.time(), 0) + 0.05)
+
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            decode_token(token)
+
+        self.assertEqual(token_cache_stats()["jwt_decode"]["expirations"], 1)
+        self.assertEqual(len(decoded_token_cache), 0)
+
+    def test_expired_and_invalid_tokens_are_never_cached(self):
+        with self.assertRaises(jwt.ExpiredSignatureError):
+            decode_token(self._token(-60))
+
+        with self.assertRaises(jwt.InvalidTokenError):
+            decode_token(self._token(60)[:-2])
+
+        self.assertEqual(len(decoded_token_cache), 0)
+
+
+@override_settings(
+    DATABASE_REPLICAS=[],
+    PASSWORD_HASHING_POOL_SIZE="2",
+    PASSWORD_HASHING_QUEUE_LIMIT="3",
+    PASSWORD_HASHING_RETRY_AFTER="7",
+)
+class PasswordHashingSaturationTests(TestCase):
+    def setUp(self):
+        User.objects.create(
+            name="Ann", email="ann@example.com", password=make_password("pw-12345678")
+        )
+
+        # every pool process busy, and the queue full - no pool is ever started
+        in_flight = mock.patch.object(password_hashing_executor, "in_flight", 2 + 3)
+        in_flight.start()
+        self.addCleanup(in_flight.stop)
+
+    def _post(self, path, payload):
+        return self.client.post(path, payload, content_type="application/json")
+
+    def test_saturated_pool_rejects_with_retry_after(self):
+        rejected = password_hashing_executor.rejected
+        credentials = {"email": "ann@example.com", "password": "pw-12345678"}
+
+        for path, payload in (
+            ("/api/v1/auth/register", {**credentials, "name": "Bob", "email": "bob@example.com"}),
+            ("/api/v1/auth/log-in", credentials),
+        ):
+            with self.subTest(path=path):
+                response = self._post(path, payload)
+
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(response["Retry-After"], "7")
+
+        self.assertEqual(password_hashing_executor.rejected, rejected + 2)
+        self.assertFalse(User.objects.filter(email="bob@example.com").exists())
+
+
+class TokenStoreTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(name="Ann", email="ann@example.com", password="!")
+        caches[settings.USER_CACHE_ALIAS].clear()
+
+    def _token_row(self, token_type, expires_in):
+        return AuthToken.objects.create(
+            user=self.user,
+            token_type=token_type,
+            token_digest=token_digest(f"{token_type}:{expires_in}"),
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=expires_in),
+        )
+
+    def test_stored_tokens_are_digests_with_their_expiry(self):
+        tokens = _issue_tokens(self.user)
+
+        store_tokens(self.user.id, tokens)
+
+        refresh_token = AuthToken.objects.get(token_type=AuthToken.REFRESH)
+        access_token = AuthToken.objects.get(token_type=AuthToken.ACCESS)
+
+        self.assertEqual(refresh_token.token_digest, token_digest(tokens["refresh_token"]))
+        self.assertEqual(access_token.token_digest, token_digest(tokens["access_token"]))
+        self.assertGreater(refresh_token.expires_at, access_token.expires_at)
+
+        with self.assertNumQueries(0):  # cached on store
+            self.assertEqual(get_session_expiry(self.user.id), refresh_token.expires_at.timestamp())
+
+    def test_the_session_expiry_is_the_latest_refresh_token_expiry(self):
+        self._token_row(AuthToken.REFRESH, 60)
+        latest = self._token_row(AuthToken.REFRESH, 3600)
+        self._token_row(AuthToken.ACCESS, 7200)
+
+        self.assertEqual(get_session_expiry(self.user.id), latest.expires_at.timestamp())
+
+    def test_a_past_cached_expiry_is_read_again(self):
+        caches[settings.USER_CACHE_ALIAS].set(f"user:session:{self.user.id}", time.time() - 1)
+        latest = self._token_row(AuthToken.REFRESH, 3600)  # e.g. stored by another process
+
+        self.assertEqual(get_session_expiry(self.user.id), latest.expires_at.timestamp())
+
+    def test_users_without_tokens_have_no_session(self):
+        self.assertIsNone(get_session_expiry(self.user.id))
+
+    def test_only_expired_tokens_are_purged(self):
+        for expires_in in (-60, -120, -180):
+            self._token_row(AuthToken.ACCESS, expires_in)
+
+        live = self._token_row(AuthToken.REFRESH, 3600)
+
+        self.assertEqual(purge_expired_tokens(batch_size=2), 3)
+        self.assertEqual(list(AuthToken.objects.all()), [live])
+
+
+class BackfillAuthTokensMigrationTests(TransactionTestCase):
+    migrate_from = [
+        ("domain__user", "0004_alter_user_refresh_token"),
+        ("domain__auth", "0001_initial"),
+    ]
+    migrate_to = [("domain__user", "0005_remove_user_tokens")]
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()  # the applied migrations changed since the last run
+        executor.migrate(targets)
+
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self._migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_legacy_token_columns_are_copied_before_they_are_dropped(self):
+        apps = self._migrate(self.migrate_from)
+        LegacyUser = apps.get_model("domain__user", "User")
+
+        tokens = _issue_tokens(User(id=1, email="ann@example.com"))
+        LegacyUser.objects.create(
+            id=1,
+            name="Ann",
+            email="ann@example.com",
+            password="!",
+            access_token=tokens["access_token"],
+            refresh_token=tokens["refresh_token"],
+        )
+        LegacyUser.objects.create(
+            id=2, name="Bob", email="bob@example.com", password="!", refresh_token="not-a-jwt"
+        )
+
+        self._migrate(self.migrate_to)
+        caches[settings.USER_CACHE_ALIAS].clear()
+
+        self.assertEqual(
+            set(AuthToken.objects.values_list("user_id", "token_type", "token_digest")),
+            {
+                (1, AuthToken.ACCESS, token_digest(tokens["access_token"])),
+                (1, AuthToken.REFRESH, token_digest(tokens["refresh_token"])),
+            },
+        )
+        self.assertEqual(get_session_expiry(1), decode_token(tokens["refresh_token"])["exp"])
@@ -0,0 +1,178 @@
+"""
+Token store - persistence of issued auth tokens, in the narrow `auth_tokens` table(see `AuthToken`).
+
+Issuing tokens inserts one row per token(its digest and expiry) - the `users` row is never touched.
+The session stage only needs the user's latest refresh token expiry, which is cached in the user cache
+(see `USER_CACHE_ALIAS`) - and re-read from the DB whenever the cached value is missing or in the
+past, since a newer session may have been stored by another process since.
+
+With `TOKEN_WRITE_BEHIND` enabled, and a shared user cache backend(see `USER_CACHE_ALIAS`), the rows
+are queued and inserted in batches instead - see `domain__auth.token_write_behind`. The session expiry
+of queued tokens is then cached until the session expires, so other processes see the session before
+the rows are flushed(or if they never are).
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Max
+from base.db_routers import record_primary_write
+from utils.generate_tokens import decode_token
+from .models import AuthToken
+from .token_write_behind import queue_tokens
+
+
+def _user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def _session_key(user_id):
+    return f"user:session:{user_id}"
+
+
+def _session_cache_is_shared():
+    # whether other processes see the cached session expiry - i.e. may skip the DB rows
+    return not isinstance(_user_cache(), (LocMemCache, DummyCache))
+
+
+def _queue_tokens(user_id, rows):
+    # other processes must see the session before its rows land - or if they never do(process killed)
+    return _session_cache_is_shared() and queue_tokens(user_id, rows)
+
+
+def _session_cache_timeout(rows):
+    # queued tokens - the cached expiry is the session's only record until the flush
+    return max(int(_session_expiry(rows) - time.time()), 1)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _token_rows(user_id, tokens):
+    rows = []
+
+    for token_type, token in (
+        (AuthToken.ACCESS, tokens.get('access_token')),
+        (AuthToken.REFRESH, tokens.get('refresh_token')),
+    ):
+        expires_at = datetime.fromtimestamp(decode_token(token)["exp"], tz=timezone.utc)
+        rows.append(
+            AuthToken(
+                user_id=user_id,
+                token_type=token_type,
+                token_digest=token_digest(token),
+                expires_at=expires_at,
+            )
+        )
+
+    return rows
+
+
+def _session_expiry(rows):
+    return max(row.expires_at for row in rows if row.token_type == AuthToken.REFRESH).timestamp()
+
+
+def store_tokens(user_id, tokens):
+    """
+    Persist a freshly issued pair of tokens(`generate_tokens` output) for a user - a single INSERT,
+    or queued for a batched one(see `TOKEN_WRITE_BEHIND`).
+    """
+    rows = _token_rows(user_id, tokens)
+
+    if _queue_tokens(user_id, rows):
+        record_primary_write()
+        _user_cache().set(
+            _session_key(user_id), _session_expiry(rows), timeout=_session_cache_timeout(rows)
+        )
+        return
+
+    # the same token may be issued twice within a second - it is already stored then
+    AuthToken.objects.bulk_create(rows, ignore_conflicts=True)
+    _user_cache().set(_session_key(user_id), _session_expiry(rows))
+
+
+async def astore_tokens(user_id, tokens):
+    """
+    Async version of `store_tokens`.
+    """
+    rows = _token_rows(user_id, tokens)
+
+    if _queue_tokens(user_id, rows):
+        record_primary_write()
+        await _user_cache().aset(
+            _session_key(user_id), _session_expiry(rows), timeout=_session_cache_timeout(rows)
+        )
+        return
+
+    await AuthToken.objects.abulk_create(rows, ignore_conflicts=True)
+    await _user_cache().aset(_session_key(user_id), _session_expiry(rows))
+
+
+def _refresh_tokens(user_id):
+    return AuthToken.objects.filter(user_id=user_id, token_type=AuthToken.REFRESH)
+
+
+def _to_timestamp(result):
+    return result["expires_at"].timestamp() if result["expires_at"] else None
+
+
+def get_session_expiry(user_id):
+    """
+    Expiry(unix timestamp) of the user's latest refresh token - None if the user has no tokens.
+    """
+    user_cache = _user_cache()
+    expires_at = user_cache.get(_session_key(user_id))
+
+    if expires_at is not None and expires_at > time.time():
+        return expires_at
+
+    expires_at = _to_timestamp(_refresh_tokens(user_id).aggregate(expires_at=Max("expires_at")))
+
+    if expires_at is not None:
+        user_cache.set(_session_key(user_id), expires_at)
+
+    return expires_at
+
+
+async def aget_session_expiry(user_id):
+    """
+    Async version of `get_session_expiry`.
+    """
+    user_cache = _user_cache()
+    expires_at = await user_cache.aget(_session_key(user_id))
+
+    if expires_at is not None and expires_at > time.time():
+        return expires_at
+
+    expires_at = _to_timestamp(
+        await _refresh_tokens(user_id).aaggregate(expires_at=Max("expires_at"))
+    )
+
+    if expires_at is not None:
+        await user_cache.aset(_session_key(user_id), expires_at)
+
+    return expires_at
+
+
+def purge_expired_tokens(batch_size=1000):
+    """
+    Delete expired tokens in batches of `batch_size` rows - through the `expires_at` index, and
+    without holding long locks. Returns the number of deleted rows.
+    """
+    now = datetime.now(timezone.utc)
+    deleted = 0
+
+    while True:
+        ids = list(
+            AuthToken.objects.filter(expires_at__lte=now).values_list("id", flat=True)[:batch_size]
+        )
+
+        if not ids:
+            return deleted
+
+        deleted += AuthToken.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,265 @@
+"""
+Optional write-behind queue for issued auth tokens(`TOKEN_WRITE_BEHIND`).
+
+During log-in storms, inserting each user's tokens before responding is the dominant DB write load.
+With write-behind enabled, `store_tokens` queues the rows instead, and a flusher thread inserts all
+pending rows with a single INSERT - once `TOKEN_WRITE_BEHIND_BATCH_SIZE` users are pending, or every
+`TOKEN_WRITE_BEHIND_FLUSH_INTERVAL` seconds. Pending tokens are coalesced per user - a user logging in
+again before the flush only has their latest tokens written.
+
+Falls back to synchronous writes(the caller writes its own rows) when:
+1. More than `TOKEN_WRITE_BEHIND_MAX_PENDING` users are pending
+2. The process is shutting down
+
+A failed batch is retried user by user. Rows that still fail are re-queued(unless the user has logged
+in again meanwhile - their newer tokens supersede them), up to `TOKEN_WRITE_BEHIND_MAX_RETRIES` times
+per user, while the flusher backs off exponentially - so a brief DB outage loses no tokens. Rows that
+fail every retry are logged and dropped - the user then has to log in again. Pending tokens are
+flushed on interpreter exit.
+
+Tokens are only queued when `USER_CACHE_ALIAS` is a shared cache backend(e.g. Redis) - see
+`domain__auth.token_store`. The session expiry is cached there until the session expires, so every
+process sees the new session right away, and it stays valid even if the process is killed(SIGKILL,
+OOM) before its pending rows are flushed - the rows are then lost, and the user has to log in again
+only if the cache entry is evicted. With a process-local cache(LocMem), tokens are always written
+synchronously - other processes would reject the session until the flush.
+
+Flush latency, batch sizes, retries and drops are available via `token_write_behind_stats()` - and
+exported with the metrics(see `utils.metrics`).
+"""
+
+import atexit
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections
+from utils.logger import logger
+from .models import AuthToken
+
+log = logger()
+
+
+class _TokenWriteBehindQueue:
+    def __init__(self):
+        self._pending = {}  # user_id -> AuthToken rows
+        self._attempts = {}  # user_id -> failed writes of its pending(re-queued) rows
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time - e.g. the flusher vs. shutdown
+        self._flusher = None
+        self._stopping = False
+        self.flushes = 0
+        self.flushed_users = 0
+        self.flushed_rows = 0
+        self.max_batch_size = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.failed_flushes = 0
+        self.retried_users = 0
+        self.dropped_users = 0
+        self.sync_fallbacks = 0
+
+    @property
+    def batch_size(self):
+        return int(settings.TOKEN_WRITE_BEHIND_BATCH_SIZE)
+
+    @property
+    def flush_interval(self):
+        return float(settings.TOKEN_WRITE_BEHIND_FLUSH_INTERVAL)
+
+    @property
+    def max_pending(self):
+        return int(settings.TOKEN_WRITE_BEHIND_MAX_PENDING)
+
+    @property
+    def max_retries(self):
+        return int(settings.TOKEN_WRITE_BEHIND_MAX_RETRIES)
+
+    def _ensure_flusher(self):
+        # started lazily - i.e. once per(forked) server worker process
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(
+                target=self._run, name="token-write-behind", daemon=True
+            )
+            self._flusher.start()
+
+    def enqueue(self, user_id, rows):
+        """
+        Queue a user's token rows. Returns False if the caller must write them synchronously.
+        """
+        with self._condition:
+            if self._stopping or (
+                user_id not in self._pending and len(self._pending) >= self.max_pending
+            ):
+                self.sync_fallbacks += 1
+                return False
+
+            self._ensure_flusher()
+            self._pending[user_id] = rows
+            self._attempts.pop(user_id, None)
+
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+        return True
+
+    def _take_batch(self):
+        with self._condition:
+            batch, self._pending = self._pending, {}
+
+        return batch
+
+    def _run(self):
+        failed_flushes_in_a_row = 0
+
+        while True:
+            with self._condition:
+                if len(self._pending) < self.batch_size:
+                    self._condition.wait(timeout=self.flush_interval)
+
+            try:
+                failed = self.flush()
+            except Exception as e:
+                # the flusher must outlive any error - or every later log-in's tokens are lost
+                log.error("Token write-behind flush crashed", error=str(e))
+                failed = True
+
+            failed_flushes_in_a_row = failed_flushes_in_a_row + 1 if failed else 0
+
+            if failed_flushes_in_a_row:
+                # back off while the DB is failing - re-queued rows are retried on the next flush
+                time.sleep(min(self.flush_interval * 2**failed_flushes_in_a_row, 10.0))
+
+    def flush(self):
+        """
+        Write all pending rows. Returns the number of users whose rows failed(and were re-queued or
+        dropped).
+        """
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        batch = self._take_batch()
+
+        if not batch:
+            return 0
+
+        rows = [row for user_rows in batch.values() for row in user_rows]
+        started_at = time.perf_counter()
+
+        try:
+            close_old_connections()
+            AuthToken.objects.bulk_create(rows, ignore_conflicts=True)
+            failed = {}
+        except Exception as e:
+            with self._condition:
+                self.failed_flushes += 1
+
+            log.error("Token write-behind batch failed - retrying per user", error=str(e))
+            failed = self._flush_per_user(batch)
+        finally:
+            close_old_connections()
+
+        self._settle(batch, failed)
+
+        flush_time = time.perf_counter() - started_at
+
+        with self._condition:
+            self.flushes += 1
+            self.flushed_users += len(batch) - len(failed)
+            self.flushed_rows += len(rows) - sum(map(len, failed.values()))
+            self.max_batch_size = max(self.max_batch_size, len(batch))
+            self.total_flush_time += flush_time
+            self.max_flush_time = max(self.max_flush_time, flush_time)
+
+        return len(failed)
+
+    def _flush_per_user(self, batch):
+        failed = {}
+
+        for user_id, rows in batch.items():
+            try:
+                AuthToken.objects.bulk_create(rows, ignore_conflicts=True)
+            except Exception as e:
+                log.warning("Token write-behind write failed", user_id=user_id, error=str(e))
+                failed[user_id] = rows
+
+        return failed
+
+    def _settle(self, batch, failed):
+        # re-queue the failed rows - unless superseded by newer tokens, or out of retries
+        dropped = []
+
+        with self._condition:
+            for user_id in batch:
+                if user_id in self._pending:
+                    continue  # the user logged in again - their newer tokens are pending
+
+                attempts = self._attempts.pop(user_id, 0) + 1
+
+                if user_id not in failed:
+                    continue
+
+                if attempts > self.max_retries or self._stopping:
+                    self.dropped_users += 1
+                    dropped.append((user_id, attempts))
+                    continue
+
+                self._pending[user_id] = failed[user_id]
+                self._attempts[user_id] = attempts
+                self.retried_users += 1
+
+        for user_id, attempts in dropped:
+            log.error("Token write-behind write dropped", user_id=user_id, attempts=attempts)
+
+    def shutdown(self):
+        with self._condition:
+            self._stopping = True
+
+        self.flush()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "enabled": settings.TOKEN_WRITE_BEHIND,
+                "pending_users": len(self._pending),
+                "flushes": self.flushes,
+                "flushed_users": self.flushed_users,
+                "flushed_rows": self.flushed_rows,
+                "avg_batch_size": (
+                    round(self.flushed_users / self.flushes, 3) if self.flushes else 0.0
+                ),
+                "max_batch_size": self.max_batch_size,
+                "avg_flush_ms": (
+                    round(self.total_flush_time / self.flushes * 1000, 3) if self.flushes else 0.0
+                ),
+                "max_flush_ms": round(self.max_flush_time * 1000, 3),
+                "failed_flushes": self.failed_flushes,
+                "retried_users": self.retried_users,
+                "dropped_users": self.dropped_users,
+                "sync_fallbacks": self.sync_fallbacks,
+            }
+
+
+token_write_behind_queue = _TokenWriteBehindQueue()
+atexit.register(token_write_behind_queue.shutdown)
+
+
+def queue_tokens(user_id, rows):
+    """
+    Queue a user's token rows for a batched insert - if `TOKEN_WRITE_BEHIND` is enabled.
+
+    Returns:
+        bool: True if queued, False if the caller must write the rows synchronously
+    """
+    if not settings.TOKEN_WRITE_BEHIND:
+        return False
+
+    return token_write_behind_queue.enqueue(user_id, rows)
+
+
+def token_write_behind_stats():
+    """
+    Current state of the token write-behind queue - pending users, batch sizes(in users) and flush
+    latencies, failed batches, re-queued and dropped users, and synchronous fallbacks.
+    """
+    return token_write_behind_queue.stats()
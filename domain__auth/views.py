@@ -4,12 +4,29 @@ from django.shortcuts import render
 from ninja import Router, Schema
 from typing import Optional
 from datetime import datetime
-from django.contrib.auth.hashers import check_password, make_password
+from django.conf import settings
 from domain__user.models import User
-from utils.coded_error_handlers import error_handler_400, error_handler_403, error_handler_404, error_handler_500
+from domain__user.user_queries import auser_exists, user_exists, users_for_login
+from utils.coded_error_handlers import (
+    error_handler_400,
+    error_handler_403,
+    error_handler_404,
+    error_handler_500,
+    error_handler_503,
+)
+from .password_rehash import schedule_password_rehash
+from .token_store import astore_tokens, store_tokens
+from utils.password_hashing_executor import (
+    PasswordHashingPoolSaturated,
+    ahash_password,
+    averify_password,
+    hash_password,
+    password_hashing_stats,
+    verify_password,
+)
 from utils.generate_tokens import generate_tokens
 from utils.cookie_deploy_handler import deploy_auth_cookie
-from django.http import JsonResponse
+from utils.json_response import ORJSONResponse
 from utils.logger import logger
 
 log = logger()
@@ -35,28 +52,58 @@ class ResponseSpecs(Schema):
 
 @auth_router.get("/", response=ResponseSpecs)
 def auth_base(request):
-    return JsonResponse({
+    return ORJSONResponse({
         "response_message": "Auth domain is live!!!",
         "response": {
             "message": "OK!!!"
         }
     })
 
-@auth_router.post("/register", response=ResponseSpecs)
+def _auth_response(response_message, user, tokens):
+    response_data = ORJSONResponse({
+        "response_message": response_message,
+        "response": {
+            "user_profile": {
+                "id": user.id,
+                "name": user.name or "",
+                "email": user.email,
+                "is_admin": user.is_admin,
+                "is_active": user.is_active,
+                "created_at": user.created_at,
+                "updated_at": user.updated_at,
+            },
+            "access_token": tokens.get('access_token'),
+            "refresh_token": tokens.get('refresh_token')
+        }
+    })
+
+    # Deploy auth cookie
+    deploy_auth_cookie({
+        "response": response_data,
+        "auth_cookie": tokens.get('auth_cookie')
+    })
+
+    return response_data
+
+def _password_hashing_unavailable(email):
+    log.error("Password hashing pool saturated", email=email, **password_hashing_stats())
+    return error_handler_503(
+        "Server is busy - please retry shortly",
+        retry_after=int(settings.PASSWORD_HASHING_RETRY_AFTER)
+    )
+
 def register(request, payload: InSpecs__Register):
     """
     Register a new user
     """
     try:
         # Check if user already exists
-        existing_user = User.objects.filter(email=payload.email).first()
-
-        if existing_user:
+        if user_exists(payload.email):
             log.error("User already exists", email=payload.email)
             return error_handler_400(f"User with email: '{payload.email}' already exists")
 
-        # Hash password
-        hashed_password = make_password(payload.password)
+        # Hash password - on the password hashing pool
+        hashed_password = hash_password(payload.password)
 
         # Create new user
         new_user = User.objects.create(
@@ -79,56 +126,128 @@ def register(request, payload: InSpecs__Register):
         if not tokens:
             return error_handler_500("Failed to generate authentication tokens")
 
-        # Update user with tokens
-        new_user.access_token = tokens.get('access_token')
-        new_user.refresh_token = tokens.get('refresh_token')
-        new_user.save()
-
-        response_data = JsonResponse({
-            "response_message": "User registered successfully",
-            "response": {
-                "user_profile": {
-                    "id": new_user.id,
-                    "name": new_user.name,
-                    "email": new_user.email,
-                    "is_admin": new_user.is_admin,
-                    "is_active": new_user.is_active,
-                    "created_at": new_user.created_at,
-                    "updated_at": new_user.updated_at,
-                },
-                "access_token": tokens.get('access_token'),
-                "refresh_token": tokens.get('refresh_token')
-            }
-        })
+        # Store the tokens - in the token store, the user row is not re-saved
+        store_tokens(new_user.id, tokens)
 
-        # Deploy auth cookie
-        deploy_auth_cookie({
-            "response": response_data,
-            "auth_cookie": tokens.get('auth_cookie')
+        return _auth_response("User registered successfully", new_user, tokens)
+
+    except PasswordHashingPoolSaturated:
+        return _password_hashing_unavailable(payload.email)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error during registration", error=str(e), email=payload.email)
+        return error_handler_500(e)
+
+async def register__async(request, payload: InSpecs__Register):
+    """
+    Register a new user - async version of `register`
+    """
+    try:
+        # Check if user already exists
+        if await auser_exists(payload.email):
+            log.error("User already exists", email=payload.email)
+            return error_handler_400(f"User with email: '{payload.email}' already exists")
+
+        # Hash password - on the password hashing pool, off the event loop
+        hashed_password = await ahash_password(payload.password)
+
+        # Create new user
+        new_user = await User.objects.acreate(
+            name=payload.name,
+            email=payload.email,
+            password=hashed_password,
+            is_admin=False,  # Always set to False for security
+            is_active=True
+        )
+
+        # Generate auth tokens
+        tokens = generate_tokens({
+            "user_id": new_user.id,
+            "email": new_user.email,
+            "token_type": "auth"
         })
-        
-        return response_data
+
+        if not tokens:
+            return error_handler_500("Failed to generate authentication tokens")
+
+        # Store the tokens - in the token store, the user row is not re-saved
+        await astore_tokens(new_user.id, tokens)
+
+        return _auth_response("User registered successfully", new_user, tokens)
+
+    except PasswordHashingPoolSaturated:
+        return _password_hashing_unavailable(payload.email)
 
     except (ValueError, TypeError, AttributeError) as e:
         log.error("Error during registration", error=str(e), email=payload.email)
         return error_handler_500(e)
 
-@auth_router.post("/log-in", response=ResponseSpecs)
 def login(request, payload: InSpecs__LogIn):
     """
     Log in a new user
     """
     try:
-        existing_user = User.objects.filter(email=payload.email).first()
+        existing_user = users_for_login().filter(email=payload.email).first()
+
+        if not existing_user:
+            log.error("User not found", email=payload.email)
+            return error_handler_404(f"user with email: '{payload.email}' not found or does not exist")
+
+        # Check password - on the password hashing pool
+        is_correct_password, must_update = verify_password(payload.password, existing_user.password)
+
+        if not is_correct_password:
+            log.error("Incorrect password", email=payload.email)
+            return error_handler_403("incorrect password: login unsuccessful")
+
+        # Upgrade the stored hash to the current hasher parameters - off the response path
+        if must_update:
+            schedule_password_rehash(existing_user.id, payload.password, existing_user.password)
+
+        # Generate auth tokens
+        tokens = generate_tokens({
+            "user_id": existing_user.id,
+            "email": existing_user.email,
+            "token_type": "auth"
+        })
+
+        if tokens:
+            # Store the new tokens - in the token store, the user row is not re-saved
+            store_tokens(existing_user.id, tokens)
+
+            return _auth_response("User logged in successfully", existing_user, tokens)
+
+    except PasswordHashingPoolSaturated:
+        return _password_hashing_unavailable(payload.email)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error during login", error=str(e), email=payload.email)
+        return error_handler_500(e)
+
+async def login__async(request, payload: InSpecs__LogIn):
+    """
+    Log in a new user - async version of `login`
+    """
+    try:
+        existing_user = await users_for_login().filter(email=payload.email).afirst()
 
         if not existing_user:
             log.error("User not found", email=payload.email)
             return error_handler_404(f"user with email: '{payload.email}' not found or does not exist")
 
-        if not check_password(payload.password, existing_user.password):
+        # Check password - on the password hashing pool, off the event loop
+        is_correct_password, must_update = await averify_password(
+            payload.password, existing_user.password
+        )
+
+        if not is_correct_password:
             log.error("Incorrect password", email=payload.email)
             return error_handler_403("incorrect password: login unsuccessful")
 
+        # Upgrade the stored hash to the current hasher parameters - off the response path
+        if must_update:
+            schedule_password_rehash(existing_user.id, payload.password, existing_user.password)
+
         # Generate auth tokens
         tokens = generate_tokens({
             "user_id": existing_user.id,
@@ -137,36 +256,22 @@ def login(request, payload: InSpecs__LogIn):
         })
 
         if tokens:
-            # Update user with new tokens
-            existing_user.access_token = tokens.get('access_token')
-            existing_user.refresh_token = tokens.get('refresh_token')
-            existing_user.save()           
-
-            response_data = JsonResponse({
-                "response_message": "User logged in successfully",
-                "response": {
-                    "user_profile": {
-                        "id": existing_user.id,
-                        "name": existing_user.name or "",
-                        "email": existing_user.email,
-                        "is_admin": existing_user.is_admin,
-                        "is_active": existing_user.is_active,
-                        "created_at": existing_user.created_at,
-                        "updated_at": existing_user.updated_at,
-                    },
-                    "access_token": tokens.get('access_token'),
-                    "refresh_token": tokens.get('refresh_token')
-                }
-            })
-
-             # Deploy auth cookie
-            deploy_auth_cookie({
-                "response": response_data,
-                "auth_cookie": tokens.get('auth_cookie')
-            })
-
-            return response_data
+            # Store the new tokens - in the token store, the user row is not re-saved
+            await astore_tokens(existing_user.id, tokens)
+
+            return _auth_response("User logged in successfully", existing_user, tokens)
+
+    except PasswordHashingPoolSaturated:
+        return _password_hashing_unavailable(payload.email)
 
     except (ValueError, TypeError, AttributeError) as e:
         log.error("Error during login", error=str(e), email=payload.email)
         return error_handler_500(e)
+
+# sync or async views - see `ASYNC_VIEWS` in "settings => base.py"
+auth_router.post("/register", response=ResponseSpecs)(
+    register__async if settings.ASYNC_VIEWS else register
+)
+auth_router.post("/log-in", response=ResponseSpecs)(
+    login__async if settings.ASYNC_VIEWS else login
+)
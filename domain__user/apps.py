@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DomainUserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'domain__user'
+
+    def ready(self):
+        # register the user cache invalidation signal handlers
+        from . import signals
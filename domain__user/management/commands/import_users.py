@@ -0,0 +1,334 @@
+"""
+Bulk-import users from a CSV or NDJSON file - e.g. to onboard a tenant with many users at once.
+
+Usage:
+    python manage.py import_users users.csv --chunk-size 1000 --workers 8
+    python manage.py import_users users.ndjson --copy
+
+Each record needs an `email` and a(plain-text) `password` - `name` and `is_active` are optional. The
+input is streamed in chunks of `--chunk-size` records, so memory use stays flat for any input size:
+1. Records that are invalid, or whose email already exists(in the DB, or earlier in the input), are
+   skipped - without hashing
+2. Passwords are hashed on a pool of `--workers` processes - the next chunk is hashed while the
+   current one is inserted
+3. Each chunk is inserted with a single `bulk_create` - or with Postgres COPY(`--copy`, psycopg 3)
+
+Progress is checkpointed after every chunk(to `<input>.checkpoint` by default), and an interrupted
+import resumes from its last checkpoint when re-run - pass `--restart` to start over. Re-importing a
+chunk is harmless, since existing emails are skipped. Imported users are never admins.
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from base.db_routers import pin_to_primary
+from domain__user.models import User
+
+FORMATS = ("csv", "ndjson")
+TRUE_VALUES = ("1", "true", "yes", "y", "t")
+
+
+def _records(stream, input_format):
+    if input_format == "csv":
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        line = line.strip()
+
+        if line:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield None  # counted as invalid
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _to_bool(value, default=True):
+    if value is None or value == "":
+        return default
+
+    if isinstance(value, bool):
+        return value
+
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _clean(record):
+    """
+    Return a (name, email, password, is_active) tuple for a valid record - None otherwise.
+    """
+    if not isinstance(record, dict):
+        return None
+
+    email = str(record.get("email") or "").strip()
+    password = record.get("password")
+    name = str(record.get("name") or "").strip()[:100]
+
+    if not email or not password or any(character.isspace() for character in email):
+        return None
+
+    try:
+        validate_email(email)
+    except ValidationError:
+        return None
+
+    return name, email, str(password), _to_bool(record.get("is_active"))
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path, checkpoint):
+    # write-then-rename, so an interruption never leaves a half-written checkpoint behind
+    temporary_path = f"{path}.tmp"
+
+    with open(temporary_path, "w", encoding="utf-8") as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+
+    os.replace(temporary_path, path)
+
+
+def _insert__bulk_create(users):
+    """
+    Insert users with `bulk_create`. Returns the number of users actually inserted.
+    """
+    emails = [user[1] for user in users]
+
+    with transaction.atomic():
+        # `ignore_conflicts` reports nothing about the skipped rows - count the emails around it
+        existing = User.objects.filter(email__in=emails).count()
+        User.objects.bulk_create(
+            [
+                User(name=name, email=email, password=password, is_admin=False, is_active=is_active)
+                for name, email, password, is_active in users
+            ],
+            batch_size=len(users),
+            ignore_conflicts=True,  # e.g. emails registered since the existence check
+        )
+
+        return User.objects.filter(email__in=emails).count() - existing
+
+
+def _insert__copy(users):
+    """
+    Insert users with Postgres COPY. Returns the number of users actually inserted.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE TEMPORARY TABLE users_import "
+            "(name varchar(100), email varchar(254), password varchar(255), is_active boolean) "
+            "ON COMMIT DROP"
+        )
+
+        # psycopg 3 COPY - through the underlying driver cursor
+        with cursor.cursor.copy(
+            "COPY users_import (name, email, password, is_active) FROM STDIN"
+        ) as copy:
+            for user in users:
+                copy.write_row(user)
+
+        cursor.execute(
+            "INSERT INTO users (name, email, password, is_admin, is_active, created_at, updated_at) "
+            "SELECT name, email, password, false, is_active, now(), now() FROM users_import "
+            "ON CONFLICT (email) DO NOTHING"
+        )
+
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import users from a CSV or NDJSON file - hashing passwords on a process pool, and "
+        "inserting them in chunks, with resumable checkpoints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="Path to the CSV/NDJSON file, or '-' for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Input format(default: from the file extension, else csv).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of records hashed and inserted per chunk(default: 1000).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of password hashing processes(default: number of CPUs).",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Insert with Postgres COPY instead of bulk_create(requires psycopg 3).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Path of the checkpoint file(default: <input>.checkpoint).",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore any existing checkpoint, and import from the first record.",
+        )
+
+    def handle(self, *args, **options):
+        input_path = options["input"]
+        input_format = options["format"] or ("ndjson" if input_path.endswith(".ndjson") else "csv")
+        chunk_size = max(options["chunk_size"], 1)
+        workers = max(options["workers"], 1)
+        checkpoint_path = options["checkpoint"] or (
+            f"{input_path}.checkpoint" if input_path != "-" else "import_users.checkpoint"
+        )
+
+        if options["copy"] and connection.vendor != "postgresql":
+            raise CommandError("--copy requires a PostgreSQL database")
+
+        self.insert = _insert__copy if options["copy"] else _insert__bulk_create
+
+        checkpoint = None if options["restart"] else _read_checkpoint(checkpoint_path)
+
+        if checkpoint and checkpoint.get("input") != os.path.abspath(input_path):
+            raise CommandError(
+                f"checkpoint '{checkpoint_path}' belongs to another input - pass --restart, or "
+                "another --checkpoint path"
+            )
+
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = checkpoint or {
+            "input": os.path.abspath(input_path),
+            "records": 0,
+            "imported": 0,
+            "existing": 0,
+            "invalid": 0,
+        }
+
+        if checkpoint:
+            self.stdout.write(f"Resuming after record {checkpoint['records']}")
+
+        # check for existing emails on the primary - a lagging replica would miss recent imports
+        pin_to_primary()
+
+        stream = (
+            io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+            if input_path == "-"
+            else open(input_path, encoding="utf-8", newline="")
+        )
+
+        self.started_at = time.perf_counter()
+        self.imported_at_start = self.checkpoint["imported"]
+
+        try:
+            with stream, ProcessPoolExecutor(
+                max_workers=workers, initializer=django.setup
+            ) as executor:
+                records = islice(_records(stream, input_format), self.checkpoint["records"], None)
+                self._import(records, chunk_size, workers, executor)
+        except KeyboardInterrupt:
+            raise CommandError(
+                f"interrupted - re-run the command to resume after record "
+                f"{self.checkpoint['records']}"
+            )
+
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done - {self.checkpoint['imported']} imported, {self.checkpoint['existing']} "
+                f"already existed, {self.checkpoint['invalid']} invalid"
+            )
+        )
+
+    def _import(self, records, chunk_size, workers, executor):
+        pending = None  # the chunk being hashed, while the previous one is inserted
+
+        for chunk in _chunks(records, chunk_size):
+            users = [_clean(record) for record in chunk]
+            valid_users = [user for user in users if user]
+            existing_emails = set(
+                User.objects.filter(email__in=[user[1] for user in valid_users]).values_list(
+                    "email", flat=True
+                )
+            )
+
+            # the previous chunk is not inserted yet - skip its emails too, or they would be hashed
+            # twice, only for the second insert to be ignored
+            if pending:
+                existing_emails.update(user[1] for user in pending[0])
+            new_users = list(
+                {user[1]: user for user in valid_users if user[1] not in existing_emails}.values()
+            )
+
+            # submitted right away - hashed while the previous chunk is inserted
+            hashed_passwords = executor.map(
+                make_password,
+                [user[2] for user in new_users],
+                chunksize=max(len(new_users) // (workers * 4), 1),
+            )
+            counts = {
+                "records": len(chunk),
+                "invalid": len(chunk) - len(valid_users),
+                "existing": len(valid_users) - len(new_users),
+            }
+
+            if pending:
+                self._insert_chunk(*pending)
+
+            pending = (new_users, hashed_passwords, counts)
+
+        if pending:
+            self._insert_chunk(*pending)
+
+    def _insert_chunk(self, users, hashed_passwords, counts):
+        users = [
+            (name, email, hashed_password, is_active)
+            for (name, email, _, is_active), hashed_password in zip(users, hashed_passwords)
+        ]
+
+        imported = self.insert(users) if users else 0
+
+        checkpoint = self.checkpoint
+        checkpoint["records"] += counts["records"]
+        checkpoint["imported"] += imported
+        # plus the emails registered(or imported) since the existence check
+        checkpoint["existing"] += counts["existing"] + len(users) - imported
+        checkpoint["invalid"] += counts["invalid"]
+        _write_checkpoint(self.checkpoint_path, checkpoint)
+
+        elapsed = time.perf_counter() - self.started_at
+        rate = (checkpoint["imported"] - self.imported_at_start) / elapsed if elapsed else 0.0
+
+        self.stdout.write(
+            f"{checkpoint['records']} records - {checkpoint['imported']} imported, "
+            f"{checkpoint['existing']} existing, {checkpoint['invalid']} invalid "
+            f"({rate:.0f} users/sec)"
+        )
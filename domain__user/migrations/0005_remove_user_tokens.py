@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 11:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain__user', '0004_alter_user_refresh_token'),
+        # the token columns are copied over to `auth_tokens` first
+        ('domain__auth', '0002_backfill_auth_tokens'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='access_token',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='refresh_token',
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('domain__user', '0005_remove_user_tokens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['-created_at', '-id'], name='users__created_at_id__idx'),
+        ),
+    ]
@@ -31,18 +31,7 @@ class User(models.Model):
         null=True,  # Allow null values for existing records
         blank=True,
     )
-    access_token = models.CharField(
-        _('access token'),
-        max_length=255,
-        null=True,  # Allow null values for existing records
-        blank=True,
-    )
-    refresh_token = models.CharField(
-        _('refresh token'),
-        max_length=255,
-        null=True,  # Allow null values for existing records
-        blank=True,
-    )
+    # issued tokens are stored in their own table - see `domain__auth.models.AuthToken`
     is_admin = models.BooleanField(_('admin status'), default=False)
     is_active = models.BooleanField(_('active'), default=True)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
@@ -50,6 +39,10 @@ class User(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination of user listings - see `domain__admin.user_listing`
+            models.Index(fields=['-created_at', '-id'], name='users__created_at_id__idx'),
+        ]
         verbose_name = _('user')
         verbose_name_plural = _('users')
         db_table = 'users'
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User
+from .user_cache import invalidate_user
+
+
+@receiver(post_save, sender=User, dispatch_uid="domain__user.invalidate_user_cache__on_save")
+def invalidate_user_cache__on_save(sender, instance, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver(post_delete, sender=User, dispatch_uid="domain__user.invalidate_user_cache__on_delete")
+def invalidate_user_cache__on_delete(sender, instance, **kwargs):
+    invalidate_user(instance.id)
@@ -1,3 +1,212 @@
-from django.test import TestCase
+import contextvars
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from domain__auth.token_store import store_tokens
+from utils.generate_tokens import generate_tokens
+from utils.query_assertions import UnneededColumnsFetched, assert_columns_not_fetched
+from .management.commands import import_users
+from .models import User
+from .user_cache import get_user_by_email, get_user_by_id, invalidate_users
 
-# Create your tests here.
+
+def sign_in(client, user):
+    """
+    Issue(and store) tokens for a user, and set its auth cookie on the client. Returns the request
+    headers the auth pipeline expects.
+    """
+    tokens = generate_tokens({"user_id": user.id, "email": user.email, "token_type": "auth"})
+    store_tokens(user.id, tokens)
+    client.cookies["Fast_Django_Backend_Template"] = tokens["auth_cookie"]
+
+    return {"email": user.email, "authorization": f"Bearer {tokens['access_token']}"}
+
+
+# reads from the primary - replica routing is covered in "base => tests.py"
+@override_settings(DATABASE_REPLICAS=[])
+class UserProfileTests(TestCase):
+    def setUp(self):
+        caches[settings.USER_CACHE_ALIAS].clear()
+        self.user = User.objects.create(
+            name="Ann", email="ann@example.com", password=make_password(None)
+        )
+        self.headers = sign_in(self.client, self.user)
+        caches[settings.USER_CACHE_ALIAS].clear()  # every lookup below goes to the DB
+
+    def test_profile_never_fetches_the_password(self):
+        with assert_columns_not_fetched("users", ["password"]):
+            response = self.client.get(f"/api/v1/user/{self.user.id}", headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+
+        profile = response.json()["response"]["user_profile"]
+
+        self.assertEqual(profile["email"], self.user.email)
+        self.assertNotIn("password", profile)
+
+    def test_datetimes_are_rendered_to_the_millisecond(self):
+        response = self.client.get(f"/api/v1/user/{self.user.id}", headers=self.headers)
+        created_at = response.json()["response"]["user_profile"]["created_at"]
+
+        # the DjangoJSONEncoder format - e.g. "2026-10-18T12:00:00.123Z"
+        self.assertRegex(created_at, r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{3}Z$")
+
+    def test_cached_lookups_never_fetch_the_password(self):
+        with assert_columns_not_fetched("users", ["password"]):
+            self.assertEqual(get_user_by_email(self.user.email).id, self.user.id)
+            self.assertEqual(get_user_by_id(self.user.id).email, self.user.email)
+
+        cached_user = caches[settings.USER_CACHE_ALIAS].get(f"user:id:{self.user.id}")
+
+        self.assertEqual(cached_user.get_deferred_fields(), {"password"})
+
+    def test_password_fetches_are_caught(self):
+        with self.assertRaises(UnneededColumnsFetched):
+            with assert_columns_not_fetched("users", ["password"]):
+                User.objects.get(id=self.user.id)
+
+
+def _in_other_worker(fn, *args):
+    # another server worker - shares nothing with the test but the cache backend(and the DB)
+    worker = threading.Thread(target=fn, args=args)
+    worker.start()
+    worker.join()
+
+
+@override_settings(
+    DATABASE_REPLICAS=[],
+    CACHES={
+        **settings.CACHES,
+        settings.USER_CACHE_ALIAS: {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tempfile.mkdtemp(),
+        },
+    },
+)
+class SharedUserCacheTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(
+            name="Admin", email="admin@example.com", password="!", is_admin=True
+        )
+        self.headers = sign_in(self.client, self.admin)
+        caches[settings.USER_CACHE_ALIAS].clear()
+
+    def _revoke_admin(self):
+        # e.g. the bulk status update - a set-based update, then an explicit invalidation
+        User.objects.filter(id=self.admin.id).update(is_admin=False)
+        _in_other_worker(invalidate_users, [self.admin.id])
+
+    def test_invalidations_reach_other_workers(self):
+        self.assertTrue(get_user_by_id(self.admin.id).is_admin)
+
+        self._revoke_admin()
+
+        self.assertFalse(get_user_by_id(self.admin.id).is_admin)
+
+    def test_revoked_admins_lose_access_right_away(self):
+        self.assertEqual(
+            self.client.get("/api/v1/admin/users", headers=self.headers).status_code, 200
+        )
+
+        self._revoke_admin()
+
+        self.assertEqual(
+            self.client.get("/api/v1/admin/users", headers=self.headers).status_code, 403
+        )
+
+
+IMPORT_RECORDS = [
+    {"name": "Ada", "email": "ada@example.com", "password": "secret-1"},
+    {"name": "Bad", "email": "not-an-email", "password": "secret-2"},
+    {"name": "Grace", "email": "grace@example.com", "password": "secret-3", "is_active": "no"},
+    {"name": "No password", "email": "nopass@example.com"},
+    {"name": "Ada again", "email": "ada@example.com", "password": "secret-4"},
+    {"name": "Existing", "email": "existing@example.com", "password": "secret-5"},
+]
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class ImportUsersTests(TestCase):
+    def setUp(self):
+        User.objects.create(name="Existing", email="existing@example.com", password="!")
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.input_path = os.path.join(directory.name, "users.ndjson")
+        self.checkpoint_path = f"{self.input_path}.checkpoint"
+
+        with open(self.input_path, "w", encoding="utf-8") as input_file:
+            input_file.writelines(f"{json.dumps(record)}\n" for record in IMPORT_RECORDS)
+
+    def _import(self, *args):
+        stdout = io.StringIO()
+        # in a copied context - the command pins the(test) thread's reads to the primary
+        contextvars.copy_context().run(
+            call_command, "import_users", self.input_path, "--workers", "1", *args, stdout=stdout
+        )
+
+        return stdout.getvalue()
+
+    def test_skips_invalid_duplicate_and_existing_emails(self):
+        output = self._import("--chunk-size", "2")
+
+        self.assertIn("Done - 2 imported, 2 already existed, 2 invalid", output)
+        self.assertEqual(
+            set(User.objects.values_list("email", flat=True)),
+            {"ada@example.com", "grace@example.com", "existing@example.com"},
+        )
+
+        ada = User.objects.get(email="ada@example.com")
+        self.assertEqual(ada.name, "Ada")
+        self.assertTrue(check_password("secret-1", ada.password))
+        self.assertFalse(ada.is_admin)
+        self.assertFalse(User.objects.get(email="grace@example.com").is_active)
+        self.assertEqual(User.objects.get(email="existing@example.com").password, "!")
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_bulk_create_counts_only_inserted_users(self):
+        users = [
+            ("New", "new@example.com", make_password("secret"), True),
+            ("Existing", "existing@example.com", make_password("secret"), True),
+        ]
+
+        self.assertEqual(import_users._insert__bulk_create(users), 1)
+        self.assertEqual(User.objects.filter(email__in=["new@example.com"]).count(), 1)
+
+    def test_resumes_from_the_checkpoint(self):
+        insert = import_users._insert__bulk_create
+        inserted_chunks = []
+
+        def interrupted_insert(users):
+            if inserted_chunks:
+                raise KeyboardInterrupt
+
+            inserted_chunks.append(users)
+            return insert(users)
+
+        with mock.patch.object(import_users, "_insert__bulk_create", interrupted_insert):
+            with self.assertRaisesMessage(CommandError, "resume after record 2"):
+                self._import("--chunk-size", "1")
+
+        with open(self.checkpoint_path, encoding="utf-8") as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)["records"], 2)
+
+        with mock.patch.object(import_users, "_insert__bulk_create", wraps=insert) as resumed:
+            output = self._import("--chunk-size", "1")
+
+        self.assertIn("Resuming after record 2", output)
+        self.assertIn("Done - 2 imported, 2 already existed, 2 invalid", output)
+        # the first chunk(Ada) is not inserted again
+        self.assertNotIn(
+            "ada@example.com", [user[1] for call in resumed.call_args_list for user in call.args[0]]
+        )
+        self.assertEqual(User.objects.filter(email="ada@example.com").count(), 1)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
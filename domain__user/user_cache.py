@@ -0,0 +1,168 @@
+"""
+Read-through cache for `User` lookups - by id and by email.
+
+Users are cached with the Django cache framework, under the cache alias set in `USER_CACHE_ALIAS`
+(see CACHES in "settings => base.py"). Entries expire after the alias' TIMEOUT, and the backend
+evicts entries beyond its max size(MAX_ENTRIES for LocMem). Saving or deleting a user invalidates
+its entry right away - see `domain__user.signals`.
+
+Email lookups only cache an email -> id pointer, and the user itself is always read from its id
+entry, so invalidating the id entry is enough to invalidate both lookups.
+
+Cache misses are read through the primary/replica router(see `base.db_routers`). Invalidating a
+user also marks it as recently written for `DATABASE_READ_YOUR_WRITES_WINDOW` seconds - during which
+its misses are read from the primary, so a lagging replica cannot re-populate the cache with stale
+data.
+
+The recently-written marker holds a fresh token per invalidation. A miss only fills the cache when
+the user's marker is unchanged since the miss - so a read racing a write(read, then the write
+invalidates, then the read fills) never caches the stale user. The id entry is filled with `add`,
+never overwriting an entry another request filled meanwhile.
+
+Cached users only have their profile columns loaded(see `domain__user.user_queries`) - the password
+hash never reaches the cache. Only use these helpers on read paths - writes(e.g. `user.save()`)
+should work on a fresh DB row.
+"""
+
+import hashlib
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from base.db_routers import PRIMARY_DATABASE
+from .user_queries import users_for_profile
+
+
+def _user_cache():
+    return caches[settings.USER_CACHE_ALIAS]
+
+
+def _id_key(user_id):
+    return f"user:id:{user_id}"
+
+
+def _email_key(email):
+    # hashed, so that any email makes a valid key for every cache backend
+    return f"user:email:{hashlib.sha256(email.encode()).hexdigest()}"
+
+
+def _written_key(user_id):
+    return f"user:written:{user_id}"
+
+
+def _users(recently_written=False):
+    users = users_for_profile()
+
+    return users.using(PRIMARY_DATABASE) if recently_written else users
+
+
+def _fill(user_cache, user, written_marker=None):
+    # skipped when the user was written since the read - it may be stale
+    if user_cache.get(_written_key(user.id)) != written_marker:
+        return
+
+    user_cache.add(_id_key(user.id), user)
+    user_cache.set(_email_key(user.email), user.id)
+
+
+async def _afill(user_cache, user, written_marker=None):
+    if await user_cache.aget(_written_key(user.id)) != written_marker:
+        return
+
+    await user_cache.aadd(_id_key(user.id), user)
+    await user_cache.aset(_email_key(user.email), user.id)
+
+
+def get_user_by_id(user_id):
+    """
+    Get a user by id - from the cache, or from the DB(then cached). Returns None if not found.
+    """
+    user_cache = _user_cache()
+    entries = user_cache.get_many([_id_key(user_id), _written_key(user_id)])
+    user = entries.get(_id_key(user_id))
+
+    if user is None:
+        written_marker = entries.get(_written_key(user_id))
+        user = _users(written_marker is not None).filter(id=user_id).first()
+
+        if user:
+            _fill(user_cache, user, written_marker)
+
+    return user
+
+
+def get_user_by_email(email):
+    """
+    Get a user by email - from the cache, or from the DB(then cached). Returns None if not found.
+    """
+    user_id = _user_cache().get(_email_key(email))
+
+    if user_id is not None:
+        user = get_user_by_id(user_id)
+
+        if user and user.email == email:
+            return user
+
+    user = _users().filter(email=email).first()
+
+    if user:
+        _fill(_user_cache(), user)
+
+    return user
+
+
+async def aget_user_by_id(user_id):
+    """
+    Async version of `get_user_by_id`.
+    """
+    user_cache = _user_cache()
+    entries = await user_cache.aget_many([_id_key(user_id), _written_key(user_id)])
+    user = entries.get(_id_key(user_id))
+
+    if user is None:
+        written_marker = entries.get(_written_key(user_id))
+        user = await _users(written_marker is not None).filter(id=user_id).afirst()
+
+        if user:
+            await _afill(user_cache, user, written_marker)
+
+    return user
+
+
+async def aget_user_by_email(email):
+    """
+    Async version of `get_user_by_email`.
+    """
+    user_id = await _user_cache().aget(_email_key(email))
+
+    if user_id is not None:
+        user = await aget_user_by_id(user_id)
+
+        if user and user.email == email:
+            return user
+
+    user = await _users().filter(email=email).afirst()
+
+    if user:
+        await _afill(_user_cache(), user)
+
+    return user
+
+
+def invalidate_user(user_id):
+    """
+    Drop a user's cache entry - both the id and the email lookups.
+    """
+    invalidate_users([user_id])
+
+
+def invalidate_users(user_ids):
+    """
+    Drop the cache entries of many users at once - e.g. after a set-based `QuerySet.update()`, which
+    does not send the `post_save` signal.
+    """
+    user_cache = _user_cache()
+    user_cache.delete_many([_id_key(user_id) for user_id in user_ids])
+    user_cache.set_many(
+        {_written_key(user_id): uuid.uuid4().hex for user_id in user_ids},
+        timeout=int(settings.DATABASE_READ_YOUR_WRITES_WINDOW),
+    )
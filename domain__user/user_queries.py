@@ -0,0 +1,40 @@
+"""
+Per-use-case `User` querysets - each selects only the columns its use case needs.
+
+The password hash is only ever loaded by the log-in path. Everything else(the auth pipeline and user
+cache, profile views, admin actions, listings and exports) works on the profile columns only. Reading
+a column that was not selected triggers an extra query per instance - use
+`utils.query_assertions.assert_columns_not_fetched` to check that a hot path never does.
+"""
+
+from .models import User
+
+PROFILE_FIELDS = ("id", "name", "email", "is_admin", "is_active", "created_at", "updated_at")
+
+
+def users_for_profile():
+    """
+    Users with their profile columns only - e.g. `request.user`, profile views, admin actions.
+    """
+    return User.objects.only(*PROFILE_FIELDS)
+
+
+def users_for_login():
+    """
+    Users with their profile columns and password hash - for log-in only.
+    """
+    return User.objects.only(*PROFILE_FIELDS, "password")
+
+
+def user_exists(email):
+    """
+    Whether a user with this email exists - without loading the row.
+    """
+    return User.objects.filter(email=email).exists()
+
+
+async def auser_exists(email):
+    """
+    Async version of `user_exists`.
+    """
+    return await User.objects.filter(email=email).aexists()
@@ -4,10 +4,12 @@ from django.shortcuts import render
 from ninja import Router, Schema
 from typing import Optional
 from datetime import datetime
+from django.conf import settings
 from .models import User
+from .user_cache import aget_user_by_id, get_user_by_id
 from utils.coded_error_handlers import error_handler_404, error_handler_500
 from utils.logger import logger
-from django.http import JsonResponse
+from utils.json_response import ORJSONResponse
 from utils.cookie_deploy_handler import deploy_auth_cookie
 
 # from middlewares.global__auth_access_and_session_middleware import AuthBearer
@@ -40,52 +42,79 @@ class ResponseSpecs(Schema):
 
 @user_router.get("/", response=ResponseSpecs)
 def user_base(request):
-    return JsonResponse(
+    return ORJSONResponse(
         {"response_message": "User domain is live!!!", "response": {"message": "OK!!!"}}
     )
 
 
-@user_router.get("/{user_id}", response=ResponseSpecs)
+def _user_profile_response(request, user):
+    user_profile = {
+        "id": user.id,
+        "name": user.name or "",
+        "email": user.email,
+        "is_admin": user.is_admin,
+        "is_active": user.is_active,
+        "created_at": user.created_at,
+        "updated_at": user.updated_at,
+    }
+
+    response_data = ORJSONResponse(
+        {
+            "response_message": "User profile retrieved successfully",
+            "response": {
+                "user_profile": user_profile,
+                "access_token": getattr(request, "new_access_token", None),
+                "refresh_token": getattr(request, "new_refresh_token", None),
+            },
+        }
+    )
+
+    # Deploy auth cookie
+    # deploy_auth_cookie({
+    #     "response": response_data,
+    #     "auth_cookie": getattr(request, "auth_cookie", None)
+    # })
+
+    return response_data
+
+
 def get_user_profile(request, user_id: int):
     """
     Get the profile of any user
     """
     try:
-        user = User.objects.filter(id=user_id).first()
+        user = get_user_by_id(user_id)
 
         if not user:
             log.error("User not found", user_id=user_id)
             return error_handler_404(f"user with id: '{user_id}' not found or does not exist")
 
-        user_profile = {
-            "id": user.id,
-            "name": user.name or "",
-            "email": user.email,
-            "is_admin": user.is_admin,
-            "is_active": user.is_active,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at,
-        }
+        return _user_profile_response(request, user)
+
+    except (ValueError, TypeError, AttributeError) as e:
+        log.error("Error retrieving user profile", error=str(e), user_id=user_id)
+        return error_handler_500(e)
 
-        response_data = JsonResponse(
-            {
-                "response_message": "User profile retrieved successfully",
-                "response": {
-                    "user_profile": user_profile,
-                    "access_token": getattr(request, "new_access_token", None),
-                    "refresh_token": getattr(request, "new_refresh_token", None),
-                },
-            }
-        )
-
-        # Deploy auth cookie
-        # deploy_auth_cookie({
-        #     "response": response_data,
-        #     "auth_cookie": getattr(request, "auth_cookie", None)
-        # })
-
-        return response_data
+
+async def get_user_profile__async(request, user_id: int):
+    """
+    Get the profile of any user - async version of `get_user_profile`
+    """
+    try:
+        user = await aget_user_by_id(user_id)
+
+        if not user:
+            log.error("User not found", user_id=user_id)
+            return error_handler_404(f"user with id: '{user_id}' not found or does not exist")
+
+        return _user_profile_response(request, user)
 
     except (ValueError, TypeError, AttributeError) as e:
         log.error("Error retrieving user profile", error=str(e), user_id=user_id)
         return error_handler_500(e)
+
+
+# sync or async views - see `ASYNC_VIEWS` in "settings => base.py"
+user_router.get("/{user_id}", response=ResponseSpecs)(
+    get_user_profile__async if settings.ASYNC_VIEWS else get_user_profile
+)
@@ -0,0 +1,28 @@
+"""
+Gunicorn config - loaded automatically from the working directory.
+
+With the PROMETHEUS_MULTIPROC_DIR environment variable set, every worker writes its metrics to
+mmap'd files in that directory(see `utils.metrics`). The directory is created, and emptied of earlier
+runs' files, when the server starts - and an exited worker's live gauges(e.g. requests in flight)
+are dropped.
+"""
+
+import glob
+import os
+
+
+def on_starting(server):
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
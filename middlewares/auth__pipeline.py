@@ -0,0 +1,400 @@
+"""
+Shared Auth Pipeline Stages
+
+The session and access checks both need the same request data - the auth cookie, the `email` and
+`authorization` headers, and the `User` the request belongs to. This module parses that data once per
+request into an `AuthContext`(memoized on the request), and exposes each check as a stage function,
+so that:
+
+1. `Auth_PipelineMiddleware` can run both stages in a single pass(one parse, one user query)
+2. `Auth_SessionsMiddleware` and `Auth_AccessMiddleware` can still be used on their own - or chained,
+   in which case they share the same context and user object
+3. The views get that same user object on `request.user`
+
+Each stage returns an error response to short-circuit the request, or None to let it through. Both
+stages come in a sync(`run_*`) and a native async(`arun_*`) flavour - the only differences being how the
+user is loaded(through the async cache/ORM APIs), so async middlewares never hop to a worker thread, and
+that legacy(PBKDF2) auth cookies are verified in a worker thread, off the event loop.
+
+Excluded paths:
+- /api/v1/auth/log-in
+- /api/v1/auth/register
+- /, /api, /api/
+"""
+
+import jwt
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from utils.generate_tokens import (
+    auth_cookie_needs_renewal,
+    averify_auth_cookie,
+    decode_token,
+    generate_auth_cookie,
+    generate_tokens,
+    verify_auth_cookie,
+)
+from utils.coded_error_handlers import error_handler_400, error_handler_401, error_handler_404
+from utils.logger import logger
+from domain__user.user_cache import aget_user_by_email, get_user_by_email
+from domain__auth.token_store import aget_session_expiry, get_session_expiry
+
+
+log = logger()
+
+excluded_paths__starts_with = (
+    "/api/v1/auth/log-in",
+    "/api/v1/auth/register",
+)
+
+excluded_paths__exact_checks = frozenset(
+    (
+        "/",
+        "/api",
+        "/api/",
+        "/metrics",  # protected by METRICS_AUTH_TOKEN - see `base.views.metrics`
+    )
+)
+
+_UNSET = object()
+
+
+def is_excluded_path(path):
+    return path in excluded_paths__exact_checks or path.startswith(excluded_paths__starts_with)
+
+
+class AuthContext:
+    """
+    Per-request auth data, parsed once and shared by every auth stage.
+
+    The user is loaded lazily, and at most once, on first access of `user` - or ahead of time(from
+    async code) with `await context.aload_user()`. Either way it is read through the user cache(see
+    `domain__user.user_cache`). The same goes for the user's session expiry(`session_expires_at`, or
+    `await context.aload_session_expiry()`) - see `domain__auth.token_store`.
+    """
+
+    def __init__(self, request):
+        self.is_excluded = is_excluded_path(request.path)
+        self.auth_cookie = request.COOKIES.get("Fast_Django_Backend_Template")
+        self.email = request.headers.get("email")
+        self.authorization = request.headers.get("authorization")
+        self.session_checked = False
+        self.access_checked = False
+        self.should_rotate = False
+        self.rotation_threshold = 0
+        self._user = _UNSET
+        self._session_expires_at = _UNSET
+
+    @property
+    def user(self):
+        if self._user is _UNSET:
+            self._user = get_user_by_email(self.email)
+
+        return self._user
+
+    async def aload_user(self):
+        if self._user is _UNSET:
+            self._user = await aget_user_by_email(self.email)
+
+        return self._user
+
+    @property
+    def session_expires_at(self):
+        if self._session_expires_at is _UNSET:
+            self._session_expires_at = get_session_expiry(self.user.id)
+
+        return self._session_expires_at
+
+    async def aload_session_expiry(self):
+        if self._session_expires_at is _UNSET:
+            self._session_expires_at = await aget_session_expiry(self.user.id)
+
+        return self._session_expires_at
+
+
+def get_auth_context(request):
+    """
+    Return the request's `AuthContext` - creating it on first call.
+    """
+    context = getattr(request, "auth_context", None)
+
+    if context is None:
+        context = AuthContext(request)
+        request.auth_context = context
+
+    return context
+
+
+def check_request_credentials(context):
+    # ==================================================================================
+    # check for auth_cookie, and reject if the cookie is not available on the request
+    # ==================================================================================
+    if not context.auth_cookie:
+        log.error("auth_cookie not available")
+        return error_handler_401("Request rejected - user does not have access to this route")
+
+    # ==================================================================================
+    # check for the required request headers and perform further query
+    # ==================================================================================
+    if not context.email or not context.authorization:
+        log.error(
+            "Request header data missing",
+            email=context.email,
+            has_authorization=bool(context.authorization),
+        )
+        return error_handler_400(
+            "Email, and authorization header data must be provided on the request"
+        )
+
+    return None
+
+
+def check_user(context):
+    if not context.user:
+        log.error("User not found", email=context.email)
+        return error_handler_404(f"User with email: '{context.email}' not found or does not exist.")
+
+    return None
+
+
+def _sessions_stage__before_user(context):
+    error_response = check_request_credentials(context)
+
+    if error_response:
+        return error_response
+
+    email = context.email
+
+    # ==================================================================================
+    # OPTIONAL: further query on auth_cookie, to ensure it contains the correct user credential that was
+    # written into it before it was previously sent to the user. Verification is a cheap HMAC check
+    # (legacy PBKDF2 cookies are still accepted during the migration window), and verified cookies
+    # are cached - see `utils.generate_tokens.verify_auth_cookie`.
+    # ==================================================================================
+    if not verify_auth_cookie(context.auth_cookie, email):
+        return _invalid_auth_cookie(context)
+
+    return None
+
+
+async def _asessions_stage__before_user(context):
+    error_response = check_request_credentials(context)
+
+    if error_response:
+        return error_response
+
+    # legacy(PBKDF2) cookies are verified in a worker thread - off the event loop
+    if not await averify_auth_cookie(context.auth_cookie, context.email):
+        return _invalid_auth_cookie(context)
+
+    return None
+
+
+def _invalid_auth_cookie(context):
+    log.error(
+        "Invalid auth cookie", email=context.email, auth_cookie=context.auth_cookie[:10] + "..."
+    )
+
+    return error_handler_401("Request rejected - invalid auth_cookie detected")
+
+
+def _sessions_stage__after_user(context):
+    email = context.email
+
+    # =================================================================================
+    # Get the expiry of the user's latest refresh token from the token store, and verify that
+    # it's not expired. If expired, reject request and end the user session. This is helpful,
+    # in case the above cookie-check is disabled or in-active - e.g. for mobile environments.
+    #
+    # P.S: Both the cookie and refresh_token are set to expire within 24 hours.
+    # =================================================================================
+
+    # now proceed to check for the user
+    error_response = check_user(context)
+
+    if error_response:
+        return error_response
+
+    user = context.user
+    session_expires_at = context.session_expires_at
+
+    if session_expires_at is None:
+        log.error("No refresh token found", user_id=user.id)
+        return error_handler_401("Access denied - invalid token")
+
+    if session_expires_at <= time.time():
+        log.error("Token expired", user_id=user.id, token_type="refresh")
+
+        # ==================================================================================
+        # if you track user sessions, handle ENDING/TERMINATING the user session in DB here
+        # ==================================================================================
+
+        session_status = f"EXPIRED SESSION: session terminated for '{email}'"
+        log.info(session_status)
+
+        return error_handler_401("Access denied - session is expired, please re-authenticate")
+
+    session_status = "USER SESSION IS ACTIVE"
+    log.info("session_status", session_status=session_status, email=email)
+
+    # ==================================================================================
+    # if you track user sessions, handle RENEWING the user session in DB here
+    # ==================================================================================
+
+    context.session_checked = True
+
+    return None  # continue processing
+
+
+def run_sessions_stage(request):
+    """
+    Session stage - validates the auth cookie, and the user's refresh token(session state).
+    """
+    context = get_auth_context(request)
+
+    if context.is_excluded or context.session_checked:
+        return None  # allow through
+
+    return _sessions_stage__before_user(context) or _sessions_stage__after_user(context)
+
+
+async def arun_sessions_stage(request):
+    """
+    Async version of `run_sessions_stage`.
+    """
+    context = get_auth_context(request)
+
+    if context.is_excluded or context.session_checked:
+        return None  # allow through
+
+    error_response = await _asessions_stage__before_user(context)
+
+    if error_response:
+        return error_response
+
+    if await context.aload_user():
+        await context.aload_session_expiry()
+
+    return _sessions_stage__after_user(context)
+
+
+def _access_stage__before_user(context):
+    # ==================================================================================
+    # check for auth_cookie and request headers again here, just to be super-secure
+    # ==================================================================================
+    error_response = check_request_credentials(context)
+
+    if error_response:
+        return error_response
+
+    email = context.email
+
+    # ==================================================================================
+    # Since the session is still valid(i.e. the previous(session) stage is passed),
+    # proceed to check for access_token status - and renew all tokens/access for the user when the
+    # access_token is expired or about to expire(less than `JWT_ROTATION_THRESHOLD` minutes left).
+    #
+    # Requests with fresh tokens pass straight through - no token minting and no cookie writes. The
+    # auth_cookie is renewed alongside the tokens, or on its own when it is about to expire, or still
+    # in the legacy format.
+    # ===================================================================================
+    rotation_threshold = int(settings.JWT_ROTATION_THRESHOLD) * 60
+    context.rotation_threshold = rotation_threshold
+
+    try:
+        token = context.authorization.split(" ")[1]
+        jwt_payload = decode_token(token)
+        # log.info("access_token jwt_payload", jwt_payload__access=jwt_payload)
+
+        access_time_left = jwt_payload.get("exp", 0) - datetime.now(timezone.utc).timestamp()
+        should_rotate = access_time_left < rotation_threshold
+
+        if should_rotate:
+            session_status = (
+                f"ACTIVE ACCESS WITH ACTIVE SESSION: access and session renewed for '{email}'"
+            )
+        else:
+            session_status = f"ACTIVE ACCESS WITH ACTIVE SESSION: access still fresh for '{email}'"
+
+        log.info("session_status", session_status=session_status, email=email)
+
+    except jwt.ExpiredSignatureError:
+        log.error("Token expired", token=token[:10] + "...")
+
+        should_rotate = True
+        session_status = (
+            f"ACTIVE SESSION WITH EXPIRED ACCESS: access and session renewed for '{email}'"
+        )
+        log.info("session_status", session_status=session_status, email=email)
+
+        # ==================================================================================
+        # Goal is not to terminate the function. Simply proceed and pass the request to the
+        # view controller, since the session is still valid.
+        # ==================================================================================
+
+    except jwt.InvalidTokenError:
+        log.error("Invalid token", token=token[:10] + "...")
+        return error_handler_401("access denied - invalid token")
+
+    context.should_rotate = should_rotate
+
+    return None
+
+
+def _access_stage__after_user(request, context):
+    # now proceed to check for the user - already loaded if the session stage ran first
+    error_response = check_user(context)
+
+    if error_response:
+        return error_response
+
+    user = context.user
+
+    if context.should_rotate:
+        tokens = generate_tokens({"user_id": user.id, "email": user.email, "token_type": "auth"})
+        request.new_access_token = tokens.get('access_token')
+        request.new_refresh_token = tokens.get('refresh_token')
+        request.auth_cookie = tokens.get('auth_cookie')
+    elif auth_cookie_needs_renewal(context.auth_cookie, context.rotation_threshold):
+        request.auth_cookie = generate_auth_cookie(user.email)
+
+    request.user = user
+
+    context.access_checked = True
+
+    return None  # continue processing
+
+
+def run_access_stage(request):
+    """
+    Access stage - validates the access token, renews all tokens/access for the user when they are
+    close to expiry, and attaches the user to the request.
+
+    On renewal, `request.new_access_token`, `request.new_refresh_token` and `request.auth_cookie` are
+    set. Otherwise they are left unset.
+    """
+    context = get_auth_context(request)
+
+    if context.is_excluded or context.access_checked:
+        return None  # allow through
+
+    return _access_stage__before_user(context) or _access_stage__after_user(request, context)
+
+
+async def arun_access_stage(request):
+    """
+    Async version of `run_access_stage`.
+    """
+    context = get_auth_context(request)
+
+    if context.is_excluded or context.access_checked:
+        return None  # allow through
+
+    error_response = _access_stage__before_user(context)
+
+    if error_response:
+        return error_response
+
+    await context.aload_user()
+
+    return _access_stage__after_user(request, context)
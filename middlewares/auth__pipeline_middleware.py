@@ -0,0 +1,46 @@
+"""
+Combined Auth Middleware for Django
+
+This middleware runs the whole auth pipeline - the session stage, then the access stage - in a
+single pass. The request's cookie and headers are parsed once, the excluded paths are checked once,
+and the `User` is loaded with a single query, then shared by both stages and the views(`request.user`).
+
+It replaces the `Auth_SessionsMiddleware` + `Auth_AccessMiddleware` chain, which runs the same stages
+as two separate middlewares. See `middlewares.auth__pipeline` for the stages themselves, and
+`benchmarks/auth_pipeline.py` for a comparison of both set-ups.
+
+The middleware is both sync and async capable. Under ASGI(with async views), it runs natively on the
+event loop - the user is loaded with the async ORM, and no sync_to_async thread hop is made.
+
+Excluded paths:
+- /api/v1/auth/log-in
+- /api/v1/auth/register
+- /, /api, /api/
+"""
+
+from django.utils.deprecation import MiddlewareMixin
+from middlewares.auth__pipeline import (
+    arun_access_stage,
+    arun_sessions_stage,
+    run_access_stage,
+    run_sessions_stage,
+)
+from utils.cookie_deploy_handler import deploy_auth_cookie
+
+
+class Auth_PipelineMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        return run_sessions_stage(request) or run_access_stage(request)
+
+    def process_response(self, request, response):
+        if hasattr(request, "auth_cookie"):
+            # Deploy auth cookie
+            deploy_auth_cookie({"response": response, "auth_cookie": request.auth_cookie})
+
+        return response
+
+    async def __acall__(self, request):
+        response = await arun_sessions_stage(request) or await arun_access_stage(request)
+        response = response or await self.get_response(request)
+
+        return self.process_response(request, response)
@@ -0,0 +1,56 @@
+"""
+Read-Your-Writes Middleware for Django
+
+Works with the primary/replica router(`base.db_routers.PrimaryReplicaRouter`) - reads normally go to
+the replicas, which may lag slightly behind the primary.
+
+The middleware:
+1. Resets the router's read-your-writes state at the start of each request
+2. Pins all reads of a request to the primary, if the client wrote to the primary within the last
+   `DATABASE_READ_YOUR_WRITES_WINDOW` seconds(tracked with a short-lived cookie)
+3. Sets that cookie on responses to requests that wrote to the primary - e.g. log-in token updates,
+   or user de-activations - so the client's next reads see its own writes
+
+Usage:
+    Already added: 'middlewares.db_primary_pinning_middleware.DB_PrimaryPinningMiddleware'
+    See MIDDLEWARE settings in "settings => base.py"
+"""
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from base.db_routers import end_request_pinning, start_request_pinning, wrote_to_primary
+
+PRIMARY_PIN_COOKIE = "Fast_Django_Backend_Template__primary"
+
+
+class DB_PrimaryPinningMiddleware(MiddlewareMixin):
+    def _start(self, request):
+        return start_request_pinning(PRIMARY_PIN_COOKIE in request.COOKIES)
+
+    def _finish(self, request, response, tokens):
+        if wrote_to_primary():
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                "1",
+                max_age=int(settings.DATABASE_READ_YOUR_WRITES_WINDOW),
+                httponly=True,
+                secure=settings.DATABASE_PIN_COOKIE_SECURE,
+                samesite='Strict',
+            )
+
+        end_request_pinning(tokens)
+
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        tokens = self._start(request)
+
+        return self._finish(request, self.get_response(request), tokens)
+
+    async def __acall__(self, request):
+        tokens = self._start(request)
+
+        return self._finish(request, await self.get_response(request), tokens)
@@ -8,7 +8,17 @@ valuable insights into request processing times and potential performance bottle
 The middleware:
 1. Records the start time when a request begins processing
 2. Calculates the total duration when the request completes
-3. Logs both the start and end of each request with timing information
+3. Logs both the start and end of each request with timing information - along with the DB
+   connection pool state(available connections, waiting requests) when pooling is enabled
+
+Successful requests are logged at INFO(and usually sampled - see `LOG_SAMPLE_RATES` - with a single
+draw per request, so started/finished events are kept or dropped as a pair). Requests
+slower than `LOG_SLOW_REQUEST_SECONDS` are logged as warnings, and server errors(5xx) as errors - so
+they are never sampled out. With `SERVER_TIMING` enabled, the event carries the request's time
+breakdown by phase(DB, password hashing, JWT, JSON rendering) as its `timings` field.
+
+The middleware is both sync and async capable - under ASGI it runs natively on the event loop,
+without the sync_to_async thread hops `MiddlewareMixin` makes for sync hooks.
 
 Usage:
     Already added: 'middlewares.global__request_duration_logging_middleware.RequestDurationLoggingMiddleware'
@@ -16,8 +26,12 @@ Usage:
 """
 
 import time
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
+from utils.db_pool_stats import database_pool_snapshot
+from utils.log_sampling import end_request_sampling, start_request_sampling
 from utils.logger import logger
+from utils.request_timing import current_timings
 
 log = logger()
 
@@ -25,11 +39,40 @@ log = logger()
 class RequestDataLoggingMiddleware(MiddlewareMixin):
     def process_request(self, request):
         request.start_time = time.time()
+        request.log_sampling_token = start_request_sampling()
         # log.info(f"⏱️ Request started: {request.method} {request.path}")
-        log.info(f"Request started: {request.method} {request.path}")
+        log.info("Request started", method=request.method, path=request.path)
 
     def process_response(self, request, response):
         duration = time.time() - getattr(request, "start_time", time.time())
         # log.info(f"✅ Request finished: {request.method} {request.path} ({duration:.2f}s)")
-        log.info(f"Request finished: {request.method} {request.path} ({duration:.2f}s)")
+
+        if response.status_code >= 500:
+            log_event = log.error
+        elif duration >= float(settings.LOG_SLOW_REQUEST_SECONDS):
+            log_event = log.warning
+        else:
+            log_event = log.info
+
+        timings = current_timings()  # set by `RequestTimingMiddleware`, when enabled
+
+        log_event(
+            "Request finished",
+            method=request.method,
+            path=request.path,
+            status_code=response.status_code,
+            duration=round(duration, 3),
+            **({"timings": timings.summary()} if timings else {}),
+            **database_pool_snapshot(),
+        )
+
+        if hasattr(request, "log_sampling_token"):
+            end_request_sampling(request.log_sampling_token)
+
         return response
+
+    async def __acall__(self, request):
+        self.process_request(request)
+        response = await self.get_response(request)
+
+        return self.process_response(request, response)
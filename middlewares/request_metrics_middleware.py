@@ -0,0 +1,68 @@
+"""
+Request Metrics Middleware for Django
+
+Records Prometheus metrics for every request(see `utils.metrics`):
+1. A request counter and a latency histogram(`time.perf_counter()` - high resolution), labelled by
+   method, route template and status code
+2. The number of requests in flight
+3. Internal component stats(`app_component_stats`) - refreshed at most every METRICS_STATS_INTERVAL
+   seconds, per process
+
+Keep it first in the MIDDLEWARE list, so the latency covers the whole middleware chain. Disabled
+with `METRICS_ENABLED=False`.
+
+Usage:
+    Already added: 'middlewares.request_metrics_middleware.RequestMetricsMiddleware'
+    See MIDDLEWARE settings in "settings => base.py"
+"""
+
+import time
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+from utils.metrics import (
+    REQUESTS_IN_FLIGHT,
+    observe_request,
+    refresh_component_stats,
+    route_template,
+)
+
+
+class RequestMetricsMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+
+        super().__init__(get_response)
+
+        self.stats_interval = float(settings.METRICS_STATS_INTERVAL)
+
+    def _finish(self, request, response, started_at):
+        observe_request(
+            request.method,
+            route_template(request),
+            str(response.status_code),
+            time.perf_counter() - started_at,
+        )
+        refresh_component_stats(max_age=self.stats_interval)
+
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        started_at = time.perf_counter()
+
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            response = self.get_response(request)
+
+        return self._finish(request, response, started_at)
+
+    async def __acall__(self, request):
+        started_at = time.perf_counter()
+
+        with REQUESTS_IN_FLIGHT.track_inprogress():
+            response = await self.get_response(request)
+
+        return self._finish(request, response, started_at)
@@ -0,0 +1,59 @@
+"""
+Request Profiling Middleware for Django
+
+Profiles single requests with cProfile - on demand(an authorized `X-Profile-Request` header), or
+at random(`PROFILING_SAMPLE_RATE`) - and writes each profile to `PROFILING_DIR`, tagged with the
+request's route and id(see `utils.request_profiling`). Summarize the collected profiles with
+`python manage.py summarize_profiles`.
+
+Not used when neither trigger is configured(no `PROFILING_AUTH_TOKEN`, and a zero sample rate) -
+so unprofiled deployments pay nothing.
+
+Usage:
+    Already added: 'middlewares.request_profiling_middleware.RequestProfilingMiddleware'
+    See MIDDLEWARE settings in "settings => base.py"
+"""
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+from utils.request_profiling import discard_profile, finish_profile, start_profile
+
+
+class RequestProfilingMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        if not settings.PROFILING_AUTH_TOKEN and float(settings.PROFILING_SAMPLE_RATE) <= 0:
+            raise MiddlewareNotUsed
+
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        profile = start_profile(request)
+
+        if profile is None:
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            discard_profile(profile)
+            raise
+
+        return finish_profile(profile, request, response)
+
+    async def __acall__(self, request):
+        profile = start_profile(request)
+
+        if profile is None:
+            return await self.get_response(request)
+
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            discard_profile(profile)
+            raise
+
+        return finish_profile(profile, request, response)
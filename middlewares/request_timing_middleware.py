@@ -0,0 +1,69 @@
+"""
+Server-Timing Middleware for Django
+
+Breaks each request's time down by phase - DB queries, password hashing, JWT work and JSON
+rendering(see `utils.request_timing`) - and reports it:
+1. As a `Server-Timing` response header - e.g. `db;dur=1.204;desc="2x", jwt;dur=0.081;desc="1x",
+   total;dur=4.913` - shown per request by browser dev tools
+2. As the `timings` field of the "Request finished" log event(see `RequestDataLoggingMiddleware`)
+
+Queries are timed through a `connection.execute_wrapper` block around the request, entered in the
+thread the request's queries run in - the request thread, or for async requests, the thread
+`sync_to_async` runs the ORM in(one per request under ASGI).
+
+Keep it above `RequestDataLoggingMiddleware` in the MIDDLEWARE list. Toggled per environment with
+`SERVER_TIMING` - the header exposes internal timings, so keep it off where clients are untrusted.
+
+Usage:
+    Already added: 'middlewares.request_timing_middleware.RequestTimingMiddleware'
+    See MIDDLEWARE settings in "settings => base.py"
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+from utils.request_timing import (
+    current_timings,
+    end_request_timing,
+    query_timing,
+    start_query_timing,
+    start_request_timing,
+)
+
+
+class RequestTimingMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+
+        super().__init__(get_response)
+
+    def _finish(self, response, token):
+        response["Server-Timing"] = current_timings().server_timing()
+        end_request_timing(token)
+
+        return response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        token = start_request_timing()
+
+        with query_timing():
+            response = self.get_response(request)
+
+        return self._finish(response, token)
+
+    async def __acall__(self, request):
+        token = start_request_timing()
+        # entered(and closed) in the thread-sensitive thread - where the ORM runs its queries
+        query_timing_stack = await sync_to_async(start_query_timing)()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(query_timing_stack.close)()
+
+        return self._finish(response, token)
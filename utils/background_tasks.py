@@ -0,0 +1,50 @@
+"""
+Fire-and-forget background tasks - for work that should happen off the response path(e.g. a DB
+write the response does not depend on).
+
+Tasks run on a small, per-process thread pool(`BACKGROUND_TASKS_WORKERS` threads). Failures are
+logged, never raised, and each task's DB connections are closed once it is done.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connections
+from utils.logger import logger
+
+log = logger()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(settings.BACKGROUND_TASKS_WORKERS),
+                thread_name_prefix="background-task",
+            )
+
+        return _executor
+
+
+def _run_task(fn, args, kwargs):
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        log.error("Background task failed", task=getattr(fn, "__name__", str(fn)), error=str(e))
+    finally:
+        connections.close_all()
+
+
+def run_in_background(fn, *args, **kwargs):
+    """
+    Schedule `fn(*args, **kwargs)` to run on the background thread pool, and return right away.
+
+    Returns:
+        concurrent.futures.Future: The task's future(its result is always None)
+    """
+    return _get_executor().submit(_run_task, fn, args, kwargs)
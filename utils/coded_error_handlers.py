@@ -1,11 +1,12 @@
 from typing import Any
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse
+from .json_response import ORJSONResponse
 from .logger import logger
 
 log = logger()
 
 
-def error_handler_500(error: Any) -> JsonResponse:
+def error_handler_500(error: Any) -> ORJSONResponse:
     """
     Handle 500 Internal Server Error responses.
 
@@ -14,11 +15,11 @@ def error_handler_500(error: Any) -> JsonResponse:
         response: Django HttpResponse object
 
     Returns:
-        JsonResponse with error details
+        ORJSONResponse with error details
     """
     if isinstance(error, Exception):
         log.error("Error", error=str(error))
-        return JsonResponse(
+        return ORJSONResponse(
             {
                 'response_message': 'Request was unsuccessful: internal server error',
                 'error': str(error),
@@ -27,7 +28,27 @@ def error_handler_500(error: Any) -> JsonResponse:
         )
 
 
-def error_handler_403(error_message: Any) -> JsonResponse:
+def error_handler_503(error_message: Any, retry_after: int = 1) -> ORJSONResponse:
+    """
+    Handle 503 Service Unavailable responses.
+
+    Args:
+        error_message: The error message to return
+        retry_after: Seconds the client should wait before retrying(sent as `Retry-After`)
+
+    Returns:
+        ORJSONResponse with error details
+    """
+    log.error("Service Unavailable Error", error=str(error_message))
+    response = ORJSONResponse(
+        {'response_message': str(error_message), 'error': 'SERVICE UNAVAILABLE'}, status=503
+    )
+    response['Retry-After'] = str(retry_after)
+
+    return response
+
+
+def error_handler_403(error_message: Any) -> ORJSONResponse:
     """
     Handle 403 Forbidden responses.
 
@@ -36,13 +57,15 @@ def error_handler_403(error_message: Any) -> JsonResponse:
         response: Django HttpResponse object
 
     Returns:
-        JsonResponse with error details
+        ORJSONResponse with error details
     """
     log.error("Forbidden Error", error=str(error_message))
-    return JsonResponse({'response_message': str(error_message), 'error': 'FORBIDDEN'}, status=403)
+    return ORJSONResponse(
+        {'response_message': str(error_message), 'error': 'FORBIDDEN'}, status=403
+    )
 
 
-def error_handler_401(error_message: Any) -> JsonResponse:
+def error_handler_401(error_message: Any) -> ORJSONResponse:
     """
     Handle 401 Unauthorized responses.
 
@@ -51,15 +74,15 @@ def error_handler_401(error_message: Any) -> JsonResponse:
         response: Django HttpResponse object
 
     Returns:
-        JsonResponse with error details
+        ORJSONResponse with error details
     """
     log.error("Unauthorized Error", error=str(error_message))
-    return JsonResponse(
+    return ORJSONResponse(
         {'response_message': str(error_message), 'error': 'UNAUTHORIZED'}, status=401
     )
 
 
-def error_handler_404(error_message: Any) -> JsonResponse:
+def error_handler_404(error_message: Any) -> ORJSONResponse:
     """
     Handle 404 Not Found responses.
 
@@ -68,13 +91,15 @@ def error_handler_404(error_message: Any) -> JsonResponse:
         response: Django HttpResponse object
 
     Returns:
-        JsonResponse with error details
+        ORJSONResponse with error details
     """
     log.error("Not Found Error", error=str(error_message))
-    return JsonResponse({'response_message': str(error_message), 'error': 'NOT FOUND'}, status=404)
+    return ORJSONResponse(
+        {'response_message': str(error_message), 'error': 'NOT FOUND'}, status=404
+    )
 
 
-def error_handler_400(error_message: Any) -> JsonResponse:
+def error_handler_400(error_message: Any) -> ORJSONResponse:
     """
     Handle 400 Bad Request responses.
 
@@ -83,9 +108,9 @@ def error_handler_400(error_message: Any) -> JsonResponse:
         response: Django HttpResponse object
 
     Returns:
-        JsonResponse with error details
+        ORJSONResponse with error details
     """
     log.error("Bad Request Error", error=str(error_message))
-    return JsonResponse(
+    return ORJSONResponse(
         {'response_message': str(error_message), 'error': 'BAD REQUEST'}, status=400
     )
@@ -0,0 +1,57 @@
+"""
+Database connection pool statistics.
+
+For databases configured with a psycopg 3 connection pool(see `database_connection_settings` in
+"settings => base.py"), the pool's own counters are reported - pool size, available connections,
+requests waiting for a connection, cumulative wait time, and so on. Databases on persistent
+connections report their `CONN_MAX_AGE` instead.
+
+`database_pool_stats()` is exported with the metrics(see `utils.metrics`), and
+`database_pool_snapshot()` is attached to request log lines.
+"""
+
+from django.db import connections
+
+
+def _pool_is_open(connection):
+    # `connection.pool` opens the pool on first access - only report pools that are already open
+    return connection.alias in getattr(type(connection), "_connection_pools", {})
+
+
+def database_pool_stats():
+    """
+    Connection stats for every configured database alias.
+
+    Returns:
+        dict: alias -> stats(psycopg_pool's `get_stats()` for pooled databases)
+    """
+    stats = {}
+
+    for connection in connections.all():
+        if connection.settings_dict.get("OPTIONS", {}).get("pool"):
+            pool_stats = connection.pool.get_stats() if _pool_is_open(connection) else {}
+            stats[connection.alias] = {"mode": "pool", **pool_stats}
+        else:
+            stats[connection.alias] = {
+                "mode": "persistent",
+                "conn_max_age": connection.settings_dict.get("CONN_MAX_AGE"),
+            }
+
+    return stats
+
+
+def database_pool_snapshot():
+    """
+    A compact, per-request view of the open pools - connections available, and requests waiting for
+    a connection. Meant to be attached to request log lines, to correlate connection waits with
+    request latency. Empty when no pool is open.
+    """
+    snapshot = {}
+
+    for connection in connections.all():
+        if connection.settings_dict.get("OPTIONS", {}).get("pool") and _pool_is_open(connection):
+            pool_stats = connection.pool.get_stats()
+            snapshot[f"db_pool__{connection.alias}__available"] = pool_stats.get("pool_available")
+            snapshot[f"db_pool__{connection.alias}__waiting"] = pool_stats.get("requests_waiting")
+
+    return snapshot
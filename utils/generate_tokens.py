@@ -1,14 +1,223 @@
+import hmac
+import hashlib
 import jwt
+from asgiref.sync import sync_to_async
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError
 from datetime import datetime, timedelta, timezone
 from django.conf import settings
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import check_password
 from utils.coded_error_handlers import error_handler_401
 from utils.logger import logger
+from utils.request_timing import timed, timed_phase
+from utils.ttl_lru_cache import TTL_LRUCache
 
 log = logger()
 
+AUTH_COOKIE_PREFIX = "Fast_Django_Backend_Template"
+AUTH_COOKIE_SEPARATOR = "_____"
+AUTH_COOKIE_VERSION = "v2"
 
+# bounded LRU of already-verified (email, auth_cookie) pairs - see `verify_auth_cookie`
+auth_cookie_verification_cache = TTL_LRUCache(
+    max_size=int(settings.AUTH_COOKIE_VERIFICATION_CACHE_SIZE)
+)
+
+# bounded LRU of decoded JWT claims, keyed by token digest - see `decode_token`
+decoded_token_cache = TTL_LRUCache(max_size=int(settings.JWT_DECODE_CACHE_SIZE))
+
+
+@timed("jwt")
+def decode_token(token):
+    """
+    Decode and verify a(HS256) JWT, caching the verified claims until the token's `exp`.
+
+    Cache entries are keyed by the token's SHA-256 digest, and never outlive the token's expiry - once
+    it has passed, the token is decoded again, and `jwt.ExpiredSignatureError` is raised as usual.
+    Invalid tokens are never cached. Cache hits/misses/evictions are exposed via
+    `token_cache_stats()`.
+
+    Args:
+        token (str): The encoded JWT
+
+    Returns:
+        dict: The token's claims
+
+    Raises:
+        jwt.ExpiredSignatureError: If the token is expired
+        jwt.InvalidTokenError: If the token is invalid
+    """
+    if not isinstance(token, str):
+        raise InvalidTokenError("Token must be a string")
+
+    cache_key = hashlib.sha256(token.encode()).digest()
+    claims = decoded_token_cache.get(cache_key)
+
+    if claims is None:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+
+        if isinstance(claims.get("exp"), (int, float)):
+            decoded_token_cache.set(cache_key, claims, expires_at=claims["exp"])
+
+    return dict(claims)
+
+
+def token_cache_stats():
+    """
+    Size, hits, misses and evictions of the decoded JWT and verified auth cookie caches.
+    """
+    return {
+        "jwt_decode": decoded_token_cache.stats(),
+        "auth_cookie_verification": auth_cookie_verification_cache.stats(),
+    }
+
+
+def _auth_cookie_signature(email, expires_at):
+    message = f"{email}:{expires_at}".encode()
+
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_auth_cookie(email, expires_at):
+    """
+    Build a (v2) auth cookie - a keyed HMAC-SHA256 over the user's email and the cookie expiry.
+
+    Format: `Fast_Django_Backend_Template_____v2_____<expires_at>_____<hmac>`
+
+    Unlike the legacy format(a PBKDF2 hash of the email plus the raw secret), this is cheap to
+    both sign and verify, and it never exposes the secret key to the client.
+
+    Args:
+        email (str): The user's email address
+        expires_at (int): Cookie expiry as a unix timestamp(seconds)
+
+    Returns:
+        str: The signed auth cookie
+    """
+    return AUTH_COOKIE_SEPARATOR.join(
+        [
+            AUTH_COOKIE_PREFIX,
+            AUTH_COOKIE_VERSION,
+            str(expires_at),
+            _auth_cookie_signature(email, expires_at),
+        ]
+    )
+
+
+def generate_auth_cookie(email):
+    """
+    Build a fresh auth cookie for the email - valid for the session lifetime(`JWT_SESSION_EXPIRATION_TIME`).
+    """
+    session_expiry = int(settings.JWT_SESSION_EXPIRATION_TIME)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=session_expiry)
+
+    return sign_auth_cookie(email, int(expires_at.timestamp()))
+
+
+def auth_cookie_needs_renewal(auth_cookie, threshold):
+    """
+    Check whether an(already verified) auth cookie should be re-issued - i.e. it is still in the
+    legacy format, or has less than `threshold` seconds left before it expires.
+    """
+    cookie_parts = auth_cookie.split(AUTH_COOKIE_SEPARATOR)
+
+    if len(cookie_parts) != 4 or cookie_parts[1] != AUTH_COOKIE_VERSION:
+        return True
+
+    try:
+        expires_at = int(cookie_parts[2])
+    except ValueError:
+        return True
+
+    return expires_at - datetime.now(timezone.utc).timestamp() < threshold
+
+
+def _check_auth_cookie(auth_cookie, email):
+    """
+    Everything `verify_auth_cookie` does, but the legacy(PBKDF2) hash check.
+
+    Returns:
+        tuple: (is_valid, expires_at, legacy_hash) - for legacy cookies, `is_valid` still depends on
+        `check_password(email, legacy_hash)`
+    """
+    if auth_cookie_verification_cache.get((email, auth_cookie)):
+        return True, None, None
+
+    cookie_parts = auth_cookie.split(AUTH_COOKIE_SEPARATOR)
+    now = int(datetime.now(timezone.utc).timestamp())
+
+    if len(cookie_parts) == 4 and cookie_parts[1] == AUTH_COOKIE_VERSION:
+        try:
+            expires_at = int(cookie_parts[2])
+        except ValueError:
+            return False, None, None
+
+        if expires_at <= now:
+            return False, None, None
+
+        is_valid = hmac.compare_digest(cookie_parts[3], _auth_cookie_signature(email, expires_at))
+
+        return is_valid, expires_at, None
+
+    if len(cookie_parts) == 3 and settings.AUTH_COOKIE_ACCEPT_LEGACY_FORMAT:
+        if not hmac.compare_digest(cookie_parts[2], settings.SECRET_KEY):
+            return False, None, None
+
+        # legacy cookies carry no expiry - bound the cached verification by the cookie max-age
+        expires_at = now + int(settings.JWT_SESSION_EXPIRATION_TIME) * 60
+
+        return True, expires_at, cookie_parts[1]
+
+    return False, None, None
+
+
+def _remember_auth_cookie(auth_cookie, email, is_valid, expires_at):
+    if is_valid and expires_at is not None:
+        auth_cookie_verification_cache.set((email, auth_cookie), True, expires_at=expires_at)
+
+    return is_valid
+
+
+def verify_auth_cookie(auth_cookie, email):
+    """
+    Verify that an auth cookie was issued by this server for the given email.
+
+    Both the v2(HMAC) format and - while `AUTH_COOKIE_ACCEPT_LEGACY_FORMAT` is enabled - the
+    legacy(PBKDF2) format are accepted. Successful verifications are kept in a bounded LRU, so
+    repeat requests carrying the same cookie skip the crypto entirely.
+
+    Args:
+        auth_cookie (str): The raw auth cookie value from the request
+        email (str): The email address provided on the request headers
+
+    Returns:
+        bool: True if the cookie is valid for the email, False otherwise
+    """
+    is_valid, expires_at, legacy_hash = _check_auth_cookie(auth_cookie, email)
+
+    if is_valid and legacy_hash is not None:
+        with timed_phase("crypto"):
+            is_valid = check_password(email, legacy_hash)
+
+    return _remember_auth_cookie(auth_cookie, email, is_valid, expires_at)
+
+
+async def averify_auth_cookie(auth_cookie, email):
+    """
+    Async version of `verify_auth_cookie` - the legacy(PBKDF2) check runs in a worker thread, so it
+    never blocks the event loop.
+    """
+    is_valid, expires_at, legacy_hash = _check_auth_cookie(auth_cookie, email)
+
+    if is_valid and legacy_hash is not None:
+        with timed_phase("crypto"):
+            is_valid = await sync_to_async(check_password, thread_sensitive=False)(
+                email, legacy_hash
+            )
+
+    return _remember_auth_cookie(auth_cookie, email, is_valid, expires_at)
+
+
+@timed("jwt")
 def generate_tokens(data):
     """
     Generate JWT tokens for authentication or one-time password purposes.
@@ -25,7 +234,7 @@ def generate_tokens(data):
 
     Returns:
         dict or str: For auth tokens, returns a dictionary containing:
-            - auth_cookie: A secure cookie string
+            - auth_cookie: A signed(HMAC) cookie string - see `sign_auth_cookie`
             - access_token: Short-lived JWT token (default 60 mins)
             - refresh_token: Long-lived JWT token (default 24 hrs)
         For one-time password, returns a JWT token string (default 5 mins lifetime)
@@ -75,11 +284,8 @@ def generate_tokens(data):
                 refresh_token_payload_data, settings.SECRET_KEY, algorithm="HS256"
             )
 
-            auth_cookie_part_A = make_password(data.get('email'))
-            auth_cookie_part_B = settings.SECRET_KEY
-
-            auth_cookie = (
-                f"Fast_Django_Backend_Template_____{auth_cookie_part_A}_____{auth_cookie_part_B}"
+            auth_cookie = sign_auth_cookie(
+                data.get('email'), int(session_expiration_time.timestamp())
             )
 
             tokens = {
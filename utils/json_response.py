@@ -0,0 +1,57 @@
+"""
+orjson-backed JSON rendering - for plain Django views(`ORJSONResponse`) and for django-ninja
+(`ORJSONRenderer`, see `NinjaAPI(renderer=...)` in "base => urls.py").
+
+orjson serializes dicts/lists, UUIDs and dataclasses natively, several times faster than the stdlib
+encoder with `DjangoJSONEncoder`. Datetimes, dates and times are passed through to `DjangoJSONEncoder`
+- so they keep the API's wire format: RFC 3339 strings truncated to milliseconds, with "Z" for UTC
+(orjson would render microseconds). So is anything else `DjangoJSONEncoder` supports(Decimal,
+timedelta, lazy translation strings).
+"""
+
+import orjson
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from ninja.renderers import BaseRenderer
+from .request_timing import timed_phase
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_django_json_encoder = DjangoJSONEncoder()
+
+
+def _default(value):
+    # raises TypeError for anything it does not support
+    return _django_json_encoder.default(value)
+
+
+def dumps(data):
+    """
+    Serialize `data` to JSON bytes.
+    """
+    with timed_phase("serialization"):
+        return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(HttpResponse):
+    """
+    Drop-in replacement for `django.http.JsonResponse`, rendered with orjson.
+
+    Like `JsonResponse`, only dicts are accepted unless `safe=False`.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                "In order to allow non-dict objects to be serialized set the safe parameter to False."
+            )
+
+        kwargs.setdefault("content_type", "application/json")
+        super().__init__(content=dumps(data), **kwargs)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+
+    def render(self, request, data, *, response_status):
+        return dumps(data)
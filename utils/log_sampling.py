@@ -0,0 +1,220 @@
+"""
+Per-event sampling and per-key rate limiting of log events - a structlog processor, see
+`utils.logger`.
+
+Both are configured by event name(the first argument of `log.info(...)`), in settings:
+1. `LOG_SAMPLE_RATES` - "event=rate" pairs, e.g. "Request started=0.01" keeps 1% of those events.
+   Kept events carry their `sample_rate`, so counts can be scaled back up. Events logged while
+   serving a request share one random draw(see `start_request_sampling`) - so a request's "Request
+   started" and "Request finished" events are kept, or dropped, together
+2. `LOG_RATE_LIMITS` - "event=field:limit/seconds" entries, e.g. "session_status=email:1/60" keeps
+   at most one `session_status` event per email per minute
+
+Warnings and errors are never suppressed - slow and failed requests are logged at those levels(see
+`RequestDataLoggingMiddleware`). Suppressed events are counted per event name, and reported with a
+"Log events suppressed" event at most every `LOG_SUPPRESSED_REPORT_INTERVAL` seconds - on the next
+logged event, or by a background reporter thread when nothing else is logged(e.g. after a burst).
+Totals are available via `log_sampling_stats()`.
+"""
+
+import random
+import threading
+import time
+from contextvars import ContextVar
+import structlog
+from django.conf import settings
+
+ALWAYS_LOGGED_LEVELS = frozenset(("warning", "error", "critical"))
+
+SUPPRESSED_REPORT_EVENT = "Log events suppressed"
+
+MAX_RATE_LIMIT_KEYS = 10000  # per process - beyond it, expired windows are dropped
+
+# the current request's sampling draw - None outside requests(every event draws on its own)
+_request_sample_draw = ContextVar("log_request_sample_draw", default=None)
+
+
+def start_request_sampling():
+    """
+    Draw once for the request being served - its sampled events are then kept or dropped together.
+    Returns the token to pass to `end_request_sampling`.
+    """
+    return _request_sample_draw.set(random.random())
+
+
+def end_request_sampling(token):
+    _request_sample_draw.reset(token)
+
+
+def parse_sample_rates(value):
+    """
+    Parse "event=rate,..." into {event: rate}.
+    """
+    sample_rates = {}
+
+    for entry in filter(None, (entry.strip() for entry in value.split(","))):
+        event, _, rate = entry.rpartition("=")
+        sample_rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+
+    return sample_rates
+
+
+def parse_rate_limits(value):
+    """
+    Parse "event=field:limit/seconds,..." into {event: (field, limit, seconds)}.
+    """
+    rate_limits = {}
+
+    for entry in filter(None, (entry.strip() for entry in value.split(","))):
+        event, _, rule = entry.rpartition("=")
+        field, _, limit = rule.partition(":")
+        limit, _, seconds = limit.partition("/")
+        rate_limits[event.strip()] = (field.strip(), int(limit), float(seconds))
+
+    return rate_limits
+
+
+class _LogSampler:
+    def __init__(self, sample_rates, rate_limits, report_interval):
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        self.report_interval = report_interval
+        self._lock = threading.Lock()
+        self._windows = {}  # (event, key) -> [window start, events logged in the window]
+        self._suppressed = {}  # event -> suppressed since the last report
+        self._last_report = time.monotonic()
+        self._reporter = None
+        self.total_suppressed = {}
+
+    def _is_rate_limited(self, event, event_dict, now):
+        field, limit, seconds = self.rate_limits[event]
+        window_key = (event, event_dict.get(field))
+
+        with self._lock:
+            window = self._windows.get(window_key)
+
+            if window is None or now - window[0] >= seconds:
+                if window is None and len(self._windows) >= MAX_RATE_LIMIT_KEYS:
+                    self._drop_expired_windows(now)
+
+                self._windows[window_key] = [now, 1]
+                return False
+
+            window[1] += 1
+
+            return window[1] > limit
+
+    def _drop_expired_windows(self, now):
+        self._windows = {
+            window_key: window
+            for window_key, window in self._windows.items()
+            if now - window[0] < self.rate_limits[window_key[0]][2]
+        }
+
+        if len(self._windows) >= MAX_RATE_LIMIT_KEYS:
+            self._windows.clear()  # all windows still open - start over, rather than grow
+
+    def _suppress(self, event):
+        with self._lock:
+            self._suppressed[event] = self._suppressed.get(event, 0) + 1
+            self.total_suppressed[event] = self.total_suppressed.get(event, 0) + 1
+            self._ensure_reporter()
+
+    def _ensure_reporter(self):
+        # started lazily - i.e. once per(forked) server worker process, on its first suppression
+        if self._reporter is None or not self._reporter.is_alive():
+            self._reporter = threading.Thread(
+                target=self._run_reporter, name="log-suppressed-reporter", daemon=True
+            )
+            self._reporter.start()
+
+    def _run_reporter(self):
+        while True:
+            time.sleep(self.report_interval)
+            self.report(time.monotonic())
+
+    def _take_report(self, now):
+        with self._lock:
+            if not self._suppressed or now - self._last_report < self.report_interval:
+                return None
+
+            suppressed, self._suppressed = self._suppressed, {}
+            interval, self._last_report = now - self._last_report, now
+
+        return suppressed, interval
+
+    def report(self, now):
+        """
+        Log the suppressed events counts - if any, and the report interval has passed.
+        """
+        report = self._take_report(now)
+
+        if report:
+            suppressed, interval = report
+            structlog.get_logger().info(
+                SUPPRESSED_REPORT_EVENT, suppressed=suppressed, interval=round(interval, 3)
+            )
+
+    def __call__(self, logger, method_name, event_dict):
+        event = event_dict.get("event")
+
+        if event_dict.get("level") in ALWAYS_LOGGED_LEVELS or event == SUPPRESSED_REPORT_EVENT:
+            return event_dict
+
+        now = time.monotonic()
+        sample_rate = self.sample_rates.get(event)
+
+        if sample_rate is not None:
+            draw = _request_sample_draw.get()
+
+            if (random.random() if draw is None else draw) >= sample_rate:
+                self._suppress(event)
+                raise structlog.DropEvent
+
+            event_dict["sample_rate"] = sample_rate
+
+        if event in self.rate_limits and self._is_rate_limited(event, event_dict, now):
+            self._suppress(event)
+            raise structlog.DropEvent
+
+        self.report(now)
+
+        return event_dict
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sample_rates": self.sample_rates,
+                "rate_limits": {
+                    event: f"{field}:{limit}/{seconds:g}"
+                    for event, (field, limit, seconds) in self.rate_limits.items()
+                },
+                "rate_limited_keys": len(self._windows),
+                "suppressed": dict(self.total_suppressed),
+            }
+
+
+_log_sampler = None
+
+
+def log_sampler():
+    """
+    The process' sampling processor - created from settings on first use.
+    """
+    global _log_sampler
+
+    if _log_sampler is None:
+        _log_sampler = _LogSampler(
+            parse_sample_rates(settings.LOG_SAMPLE_RATES),
+            parse_rate_limits(settings.LOG_RATE_LIMITS),
+            float(settings.LOG_SUPPRESSED_REPORT_INTERVAL),
+        )
+
+    return _log_sampler
+
+
+def log_sampling_stats():
+    """
+    Sampling/rate limiting configuration, and the number of suppressed events per event name.
+    """
+    return log_sampler().stats()
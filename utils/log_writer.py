@@ -0,0 +1,176 @@
+"""
+Queue-backed background writer for log lines - see `utils.logger`.
+
+Request threads only render their event and append the line to a bounded queue(`LOG_QUEUE_SIZE`
+lines) - a writer thread drains the queue, and writes the lines to stdout in batches. When the queue
+is full, `LOG_QUEUE_OVERFLOW` decides what happens:
+1. "drop"(default) - the new line is dropped, and counted. The writer reports the number of dropped
+   lines with a "Log lines dropped" line, as soon as it catches up
+2. "block" - the logging thread waits for room on the queue, i.e. no line is ever lost
+
+Appending is lock-free(a `deque`) - locks are only taken on overflow. Pending lines are written on
+interpreter exit. Queue depth and dropped lines are available via `log_writer_stats()`.
+"""
+
+import atexit
+import os
+import sys
+import threading
+from collections import deque
+import orjson
+from django.conf import settings
+
+MAX_WRITE_BATCH = 1000  # max number of lines per write to stdout
+
+OVERFLOW_DROP = "drop"
+OVERFLOW_BLOCK = "block"
+
+
+def write_lines(lines):
+    """
+    Write rendered(bytes) log lines to stdout - right away.
+    """
+    output = b"".join(line + b"\n" for line in lines)
+    stream = sys.stdout
+    buffer = getattr(stream, "buffer", None)
+
+    # P.S: `sys.stdout` is looked up on every write - it may be replaced, e.g. by test runners
+    if buffer is not None:
+        stream.flush()
+        buffer.write(output)
+        buffer.flush()
+    else:
+        stream.write(output.decode("utf-8"))
+        stream.flush()
+
+
+class _BackgroundLogWriter:
+    def __init__(self):
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # also run in forked(server worker) processes - whose copy of the writer thread is not running
+        self._lines = deque()
+        self._wakeup = threading.Event()
+        self._room = threading.Condition()  # overflow="block" - waits for the writer to catch up
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # one write at a time - e.g. the writer vs. exit flush
+        self._writer = None
+        self._max_size = None
+        self.written = 0
+        self.dropped = 0
+        self._unreported_drops = 0
+
+    @property
+    def overflow(self):
+        return settings.LOG_QUEUE_OVERFLOW
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._max_size = max(int(settings.LOG_QUEUE_SIZE), 1)
+                self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._writer.start()
+
+    def write(self, line):
+        if self._writer is None:
+            self._ensure_writer()
+
+        if len(self._lines) >= self._max_size and not self._wait_for_room():
+            return
+
+        self._lines.append(line)
+
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def _wait_for_room(self):
+        if self.overflow != OVERFLOW_BLOCK:
+            with self._lock:
+                self.dropped += 1
+                self._unreported_drops += 1
+
+            return False
+
+        with self._room:
+            while len(self._lines) >= self._max_size:
+                self._wakeup.set()
+                self._room.wait(timeout=1)
+
+        return True
+
+    def _take_batch(self):
+        lines = []
+
+        while len(lines) < MAX_WRITE_BATCH:
+            try:
+                lines.append(self._lines.popleft())
+            except IndexError:
+                break
+
+        return lines
+
+    def _drop_report(self):
+        with self._lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+
+        if not dropped:
+            return []
+
+        return [
+            orjson.dumps({"event": "Log lines dropped", "dropped": dropped, "level": "warning"})
+        ]
+
+    def _write(self, lines):
+        try:
+            with self._write_lock:
+                write_lines(lines + self._drop_report())
+        except (OSError, ValueError):
+            pass  # e.g. a closed stdout - logging must never take the writer thread down
+
+        with self._lock:
+            self.written += len(lines)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+            while lines := self._take_batch():
+                self._write(lines)
+
+                with self._room:
+                    self._room.notify_all()
+
+    def flush(self):
+        """
+        Write all queued lines - from the calling thread.
+        """
+        while lines := self._take_batch():
+            self._write(lines)
+
+        if self._unreported_drops:
+            self._write([])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "background": settings.LOG_BACKGROUND_WRITER,
+                "overflow": self.overflow,
+                "queue_size": int(settings.LOG_QUEUE_SIZE),
+                "queued": len(self._lines),
+                "written": self.written,
+                "dropped": self.dropped,
+            }
+
+
+background_log_writer = _BackgroundLogWriter()
+atexit.register(background_log_writer.flush)
+
+
+def log_writer_stats():
+    """
+    Current state of the background log writer - queued, written and dropped lines.
+    """
+    return background_log_writer.stats()
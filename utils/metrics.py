@@ -0,0 +1,178 @@
+"""
+Request metrics - Prometheus counters, gauges and latency histograms(see `RequestMetricsMiddleware`),
+served in the Prometheus text format by the `/metrics` endpoint.
+
+Requests are labelled by method, route template(e.g. "/api/v1/user/{user_id}" - never the raw path,
+to keep the number of series bounded) and status code. Paths that match no route are labelled
+"unmatched".
+
+With the `PROMETHEUS_MULTIPROC_DIR` environment variable set, every server worker process writes
+its metrics to mmap'd files in that directory, and a scrape aggregates the files of all workers -
+so any worker can serve `/metrics` for the whole server. The directory is created on import(so
+management commands run fine too), and must be emptied before the server starts(see
+"gunicorn.conf.py"). Without it, each process reports its own metrics - e.g. under `runserver`.
+
+Internal component stats(log writer, connection pools, caches, ... - see `STATS_SOURCES`) are
+exported as the `app_component_stats` gauge - one series per component, stat and(in multiprocess
+mode) worker process. Each worker refreshes its own at most every METRICS_STATS_INTERVAL seconds, as
+it serves requests - and the scraping worker right before a scrape.
+"""
+
+import os
+import re
+import time
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+
+# multiprocess mode writes each metric's file as soon as it is defined - below, on import
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+# sub-millisecond to multi-second - fine enough for per-route p50/p99 estimates
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.0075,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+REQUESTS = Counter(
+    "http_requests",
+    "Requests served - by method, route template and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency(seconds) - by method, route template and status code.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests being served right now.",
+    multiprocess_mode="livesum",  # summed over the live worker processes
+)
+
+COMPONENT_STATS = Gauge(
+    "app_component_stats",
+    "Internal component stats - by component and stat name.",
+    ["component", "stat"],
+    multiprocess_mode="liveall",  # per live worker process(`pid` label)
+)
+
+# component -> dotted path to its stats function(returning a dict - nested dicts are flattened,
+# non-numeric values skipped)
+STATS_SOURCES = {
+    "log_writer": "utils.log_writer.log_writer_stats",
+    "log_sampling": "utils.log_sampling.log_sampling_stats",
+    "token_caches": "utils.generate_tokens.token_cache_stats",
+    "password_hashing": "utils.password_hashing_executor.password_hashing_stats",
+    "database": "utils.db_pool_stats.database_pool_stats",
+    "token_write_behind": "domain__auth.token_write_behind.token_write_behind_stats",
+}
+
+_stats_refreshed_at = None
+
+_PATH_CONVERTER = re.compile(r"<(?:\w+:)?(\w+)>")
+
+
+def route_template(request):
+    """
+    The route template a request matched - e.g. "/api/v1/user/{user_id}".
+    """
+    resolver_match = getattr(request, "resolver_match", None)
+
+    if resolver_match is None:
+        # e.g. requests rejected by a middleware before URL resolution
+        try:
+            resolver_match = resolve(request.path_info)
+        except Resolver404:
+            return UNMATCHED_ROUTE
+
+    return "/" + _PATH_CONVERTER.sub(r"{\1}", resolver_match.route)
+
+
+def observe_request(method, route, status, duration):
+    """
+    Record a served request, and its latency(seconds).
+    """
+    REQUESTS.labels(method, route, status).inc()
+    REQUEST_LATENCY.labels(method, route, status).observe(duration)
+
+
+def _numeric_stats(stats, prefix=""):
+    for name, value in stats.items():
+        if isinstance(value, dict):
+            yield from _numeric_stats(value, f"{prefix}{name}_")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{name}", value
+
+
+def refresh_component_stats(max_age=0.0):
+    """
+    Update `app_component_stats` from `STATS_SOURCES` - unless refreshed less than `max_age` seconds
+    ago.
+    """
+    global _stats_refreshed_at
+
+    now = time.monotonic()
+
+    if _stats_refreshed_at is not None and now - _stats_refreshed_at < max_age:
+        return
+
+    _stats_refreshed_at = now
+
+    for component, source in STATS_SOURCES.items():
+        try:
+            stats = import_string(source)()
+        except Exception:
+            # a broken stats source must never fail the request(or scrape) refreshing it
+            continue
+
+        for stat, value in _numeric_stats(stats):
+            COMPONENT_STATS.labels(component, stat).set(value)
+
+
+def render_metrics():
+    """
+    All metrics in the Prometheus text format - aggregated over every worker process in
+    multiprocess mode.
+
+    Returns:
+        tuple: (content, content type)
+    """
+    refresh_component_stats()
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,203 @@
+"""
+Bounded process-pool executor for password hashing.
+
+`make_password`/`check_password` are deliberately slow(PBKDF2 by default), and hold the worker's
+GIL while they run - so a burst of log-ins/registrations starves every other request on the same
+worker. This module runs them on a dedicated pool of `PASSWORD_HASHING_POOL_SIZE` processes instead.
+
+At most `PASSWORD_HASHING_QUEUE_LIMIT` jobs may wait for a free process. Once that limit is reached,
+new jobs are rejected right away with `PasswordHashingPoolSaturated` - which the views turn into a
+503 with a `Retry-After` header(see `error_handler_503`) - rather than slowing everyone down.
+
+Pool processes are started by a fork server(`forkserver` start method) - never forked from the
+server worker itself, whose other threads(e.g. a thread holding a lock, or the log writer) would
+otherwise be copied mid-operation and could deadlock the child.
+
+Queue depth, rejections and wait times are available via `password_hashing_stats()` - and exported
+with the metrics(see `utils.metrics`).
+
+Set `PASSWORD_HASHING_POOL_SIZE` to 0 to hash inline(no pool) - e.g. for local development.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.hashers import verify_password as _verify_password
+from .request_timing import timed_phase
+
+
+class PasswordHashingPoolSaturated(Exception):
+    """
+    Raised when the password hashing pool and its queue are both full.
+    """
+
+
+def _init_worker():
+    # pool processes are started fresh by the fork server - set up Django in them
+    django.setup()
+
+
+def _make_password(password):
+    return time.time(), make_password(password)
+
+
+def _check_password(password, encoded):
+    return time.time(), _verify_password(password, encoded)
+
+
+class _PasswordHashingExecutor:
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def pool_size(self):
+        return int(settings.PASSWORD_HASHING_POOL_SIZE)
+
+    @property
+    def queue_limit(self):
+        return int(settings.PASSWORD_HASHING_QUEUE_LIMIT)
+
+    def _get_executor(self):
+        # created lazily - i.e. once per(forked) server worker process
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=_init_worker,
+            )
+
+        return self._executor
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.pool_size + self.queue_limit:
+                self.rejected += 1
+                raise PasswordHashingPoolSaturated(
+                    "password hashing pool is saturated - please retry shortly"
+                )
+
+            executor = self._get_executor()
+            self.in_flight += 1
+
+        submitted_at = time.time()
+
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(lambda done: self._on_done(done, submitted_at))
+
+        return future
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _on_done(self, future, submitted_at):
+        with self._lock:
+            self.in_flight -= 1
+
+            if future.cancelled() or future.exception() is not None:
+                return
+
+            started_at = future.result()[0]
+            wait = max(started_at - submitted_at, 0.0)
+            self.completed += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def run(self, fn, *args):
+        with timed_phase("crypto"):
+            if self.pool_size <= 0:
+                return fn(*args)[1]
+
+            return self.submit(fn, *args).result()[1]
+
+    async def arun(self, fn, *args):
+        with timed_phase("crypto"):
+            if self.pool_size <= 0:
+                result = await sync_to_async(fn, thread_sensitive=False)(*args)
+                return result[1]
+
+            result = await asyncio.wrap_future(self.submit(fn, *args))
+
+        return result[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "queue_limit": self.queue_limit,
+                "in_flight": self.in_flight,
+                "queue_depth": max(self.in_flight - self.pool_size, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": (
+                    round(self.total_wait / self.completed * 1000, 3) if self.completed else 0.0
+                ),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+password_hashing_executor = _PasswordHashingExecutor()
+
+
+def hash_password(password):
+    """
+    `make_password` on the password hashing pool.
+
+    Raises:
+        PasswordHashingPoolSaturated: If the pool and its queue are full
+    """
+    return password_hashing_executor.run(_make_password, password)
+
+
+def verify_password(password, encoded):
+    """
+    `check_password` on the password hashing pool.
+
+    Returns:
+        tuple: (is_correct, must_update) - `must_update` is True when the stored hash was made with a
+        different hasher, or different parameters, than the current default(see `PASSWORD_HASHERS`)
+
+    Raises:
+        PasswordHashingPoolSaturated: If the pool and its queue are full
+    """
+    return password_hashing_executor.run(_check_password, password, encoded)
+
+
+async def ahash_password(password):
+    """
+    Async version of `hash_password` - awaits the pool without blocking the event loop.
+    """
+    return await password_hashing_executor.arun(_make_password, password)
+
+
+async def averify_password(password, encoded):
+    """
+    Async version of `verify_password` - awaits the pool without blocking the event loop.
+    """
+    return await password_hashing_executor.arun(_check_password, password, encoded)
+
+
+def password_hashing_stats():
+    """
+    Current state of the password hashing pool - queue depth, in-flight jobs, rejections and wait
+    times(time spent queued before a pool process picked the job up).
+    """
+    return password_hashing_executor.stats()
@@ -0,0 +1,61 @@
+"""
+Query assertions - for tests and benchmarks.
+
+Usage:
+    with assert_columns_not_fetched("users", ["password"]):
+        client.get(f"/api/v1/user/{user_id}", **headers)
+"""
+
+import re
+from contextlib import contextmanager
+from django.db import connections
+
+
+class UnneededColumnsFetched(AssertionError):
+    """
+    Raised when a query selects a column it was asserted not to.
+    """
+
+
+@contextmanager
+def assert_columns_not_fetched(table, columns, using=None):
+    """
+    Fail if any SELECT run inside the block reads one of `columns` from `table` - on the `using`
+    database alias, or on every alias when None(e.g. with read replicas).
+    """
+    column_patterns = {
+        column: re.compile(rf'"{re.escape(table)}"\."{re.escape(column)}"') for column in columns
+    }
+    offending_queries = []
+
+    def check_query(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith("SELECT"):
+            selected = sql.upper().split(" FROM ", 1)[0]
+            fetched = [
+                column
+                for column, pattern in column_patterns.items()
+                if pattern.search(sql[: len(selected)])
+            ]
+
+            if fetched:
+                offending_queries.append((fetched, sql))
+
+        return execute(sql, params, many, context)
+
+    aliases = [using] if using else list(connections)
+    wrappers = [connections[alias].execute_wrapper(check_query) for alias in aliases]
+
+    for wrapper in wrappers:
+        wrapper.__enter__()
+
+    try:
+        yield
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+
+    if offending_queries:
+        details = "\n".join(f"  {fetched}: {sql}" for fetched, sql in offending_queries)
+        raise UnneededColumnsFetched(
+            f"{len(offending_queries)} quer(ies) fetched unneeded columns of '{table}':\n{details}"
+        )
@@ -0,0 +1,170 @@
+"""
+On-demand request profiling - cProfile dumps of single requests, see `RequestProfilingMiddleware`.
+
+A request is profiled when:
+1. It carries a `X-Profile-Request: <PROFILING_AUTH_TOKEN>` header - e.g. to profile one specific
+   slow call in production, without redeploying
+2. Or it is picked at random - `PROFILING_SAMPLE_RATE` of all requests
+
+Each profile is written to `PROFILING_DIR` as a pstats file named
+`<timestamp>__<method>__<route>__<request id>.prof` - the request id is the request's
+`X-Request-ID` header, or a random one, and is returned in the `X-Profile-Id` response header. Only
+the request id may contain "__" - it is the last field.
+Summarize the collected profiles with `python manage.py summarize_profiles`(`base` app).
+
+One request is profiled at a time per process(profilers cannot overlap) - other triggered requests
+run unprofiled meanwhile. Under ASGI, the profile covers the event loop thread - so it also includes
+other requests served meanwhile, and misses work done in `sync_to_async` threads.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from django.conf import settings
+from .logger import logger
+from .metrics import route_template
+
+log = logger()
+
+PROFILE_TRIGGER_HEADER = "X-Profile-Request"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_FILE_SUFFIX = ".prof"
+
+_UNSAFE_CHARACTERS = re.compile(r"[^\w.{}-]+")
+_FIELD_SEPARATORS = re.compile(r"_{2,}")
+
+_profiling_lock = threading.Lock()
+
+
+def should_profile(request):
+    """
+    Whether a request triggers profiling - by authorized header, or by sampling.
+    """
+    trigger = request.headers.get(PROFILE_TRIGGER_HEADER)
+
+    if trigger and settings.PROFILING_AUTH_TOKEN:
+        return hmac.compare_digest(trigger, settings.PROFILING_AUTH_TOKEN)
+
+    sample_rate = float(settings.PROFILING_SAMPLE_RATE)
+
+    return sample_rate > 0 and random.random() < sample_rate
+
+
+def _safe(value, max_length=100):
+    return _UNSAFE_CHARACTERS.sub("_", value).strip("._")[:max_length] or "_"
+
+
+def _safe_field(value):
+    return _FIELD_SEPARATORS.sub("_", _safe(value))
+
+
+def profile_file_name(request, request_id):
+    route = route_template(request).strip("/").replace("/", ".")
+
+    return "__".join(
+        (
+            time.strftime("%Y%m%dT%H%M%S", time.gmtime()),
+            _safe_field(request.method),
+            _safe_field(route),
+            _safe(request_id),
+        )
+    )
+
+
+def parse_profile_file_name(file_name):
+    """
+    Split a profile file name into (timestamp, method, route, request id) - None if it is not one.
+    """
+    if not file_name.endswith(PROFILE_FILE_SUFFIX):
+        return None
+
+    # the request id is the last field - the only one that may contain "__"
+    parts = file_name[: -len(PROFILE_FILE_SUFFIX)].split("__", 3)
+
+    return tuple(parts) if len(parts) == 4 else None
+
+
+def _has_room(profiling_dir):
+    try:
+        return len(os.listdir(profiling_dir)) < int(settings.PROFILING_MAX_FILES)
+    except FileNotFoundError:
+        os.makedirs(profiling_dir, exist_ok=True)
+        return True
+
+
+class RequestProfile:
+    """
+    Profiles one request - `start()`, then `finish(request, response)` once it is served.
+    """
+
+    def __init__(self, request):
+        self.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def finish(self, request, response):
+        self.profiler.disable()
+
+        file_name = f"{profile_file_name(request, self.request_id)}{PROFILE_FILE_SUFFIX}"
+        profiling_dir = settings.PROFILING_DIR
+
+        try:
+            if not _has_room(profiling_dir):
+                log.warning("Request profile dropped - PROFILING_MAX_FILES reached", file=file_name)
+                return response
+
+            self.profiler.dump_stats(os.path.join(profiling_dir, file_name))
+        except OSError as e:
+            log.error("Request profile could not be written", file=file_name, error=str(e))
+            return response
+
+        log.info("Request profiled", file=file_name)
+        response[PROFILE_ID_HEADER] = file_name
+
+        return response
+
+
+def start_profile(request):
+    """
+    Start profiling a request, if it triggers profiling and no other request is being profiled.
+
+    Returns:
+        RequestProfile: The started profile - None if the request is not profiled
+    """
+    if not should_profile(request) or not _profiling_lock.acquire(blocking=False):
+        return None
+
+    profile = RequestProfile(request)
+
+    try:
+        profile.start()
+    except ValueError:  # e.g. another profiler is already active
+        _profiling_lock.release()
+        return None
+
+    return profile
+
+
+def finish_profile(profile, request, response):
+    """
+    Stop a profile started by `start_profile`, and write it to `PROFILING_DIR`.
+    """
+    try:
+        return profile.finish(request, response)
+    finally:
+        _profiling_lock.release()
+
+
+def discard_profile(profile):
+    """
+    Stop a profile started by `start_profile`, without writing it - e.g. when the request failed.
+    """
+    profile.profiler.disable()
+    _profiling_lock.release()
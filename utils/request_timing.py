@@ -0,0 +1,145 @@
+"""
+Per-request time breakdown by phase - for the `Server-Timing` header and request logs(see
+`RequestTimingMiddleware`).
+
+Phases:
+1. "db" - every query, on any database alias(a `connection.execute_wrapper` block entered for the
+   request - see `start_query_timing`)
+2. "crypto" - password hashing/verification(`utils.password_hashing_executor`) - including the wait
+   for a free hashing process
+3. "jwt" - JWT encoding/decoding(`utils.generate_tokens`)
+4. "serialization" - JSON rendering(`utils.json_response`)
+
+Timings are collected in a context variable, so they follow the request into `sync_to_async`
+threads - and cost next to nothing outside of a timed request.
+"""
+
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.db import connections
+
+_phase_timings = ContextVar("phase_timings", default=None)
+
+
+class PhaseTimings:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases = {}  # phase -> [seconds, count]
+
+    def add(self, phase, duration):
+        totals = self.phases.setdefault(phase, [0.0, 0])
+        totals[0] += duration
+        totals[1] += 1
+
+    def server_timing(self):
+        """
+        The `Server-Timing` header value - durations in milliseconds.
+        """
+        entries = [
+            f'{phase};dur={seconds * 1000:.3f};desc="{count}x"'
+            for phase, (seconds, count) in self.phases.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.3f}")
+
+        return ", ".join(entries)
+
+    def summary(self):
+        """
+        Milliseconds and call counts per phase - e.g. for log fields.
+        """
+        summary = {
+            phase: {"ms": round(seconds * 1000, 3), "count": count}
+            for phase, (seconds, count) in self.phases.items()
+        }
+        summary["total_ms"] = round((time.perf_counter() - self.started_at) * 1000, 3)
+
+        return summary
+
+
+def start_request_timing():
+    """
+    Start collecting phase timings for the current request. Returns a token for
+    `end_request_timing`.
+    """
+    return _phase_timings.set(PhaseTimings())
+
+
+def end_request_timing(token):
+    _phase_timings.reset(token)
+
+
+def current_timings():
+    """
+    The current request's `PhaseTimings` - None outside of a timed request.
+    """
+    return _phase_timings.get()
+
+
+@contextmanager
+def timed_phase(phase):
+    """
+    Add the time spent in the block to `phase` - when inside a timed request.
+    """
+    timings = _phase_timings.get()
+
+    if timings is None:
+        yield
+        return
+
+    started_at = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started_at)
+
+
+def timed(phase):
+    """
+    Decorator version of `timed_phase`.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed_phase(phase):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _time_query(execute, sql, params, many, context):
+    with timed_phase("db"):
+        return execute(sql, params, many, context)
+
+
+def start_query_timing():
+    """
+    Time the queries run from the current thread(connections are per thread), on every database
+    alias - until the returned `ExitStack` is closed.
+
+    Connections already timed from this thread(e.g. by another request sharing the thread) are left
+    as they are - so no query is timed twice.
+    """
+    stack = ExitStack()
+
+    for alias in connections:
+        connection = connections[alias]
+
+        if _time_query not in connection.execute_wrappers:
+            stack.enter_context(connection.execute_wrapper(_time_query))
+
+    return stack
+
+
+@contextmanager
+def query_timing():
+    """
+    Context manager version of `start_query_timing`.
+    """
+    with start_query_timing():
+        yield
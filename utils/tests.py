@@ -0,0 +1,318 @@
+"""
+Tests for the logging/observability utilities - log sampling and rate limiting, and the background
+log writer, the per-request phase timings(`Server-Timing`), and request profiling(with its
+`summarize_profiles` command).
+"""
+
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
+import orjson
+import structlog
+from asgiref.sync import sync_to_async
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from domain__user.models import User
+from middlewares.request_data_logging_middleware import RequestDataLoggingMiddleware
+from middlewares.request_profiling_middleware import RequestProfilingMiddleware
+from middlewares.request_timing_middleware import RequestTimingMiddleware
+from utils import log_sampling, log_writer, request_profiling
+from utils.log_sampling import (
+    SUPPRESSED_REPORT_EVENT,
+    _LogSampler,
+    end_request_sampling,
+    parse_rate_limits,
+    parse_sample_rates,
+    start_request_sampling,
+)
+from utils.log_writer import _BackgroundLogWriter
+from utils.request_profiling import PROFILE_ID_HEADER, PROFILE_TRIGGER_HEADER
+from utils.request_timing import timed_phase
+
+SERVER_TIMING_ENTRY = re.compile(r'^(\w+);dur=(\d+\.\d{3})(?:;desc="(\d+)x")?$')
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    return condition()
+
+
+def _sample(sampler, event, level="info", **fields):
+    """
+    Run an event through the sampler - returns whether it was kept.
+    """
+    try:
+        sampler(None, level, {"event": event, "level": level, **fields})
+    except structlog.DropEvent:
+        return False
+
+    return True
+
+
+class LogSamplerTests(SimpleTestCase):
+    def _sampler(self, report_interval=60):
+        return _LogSampler(
+            parse_sample_rates("Request started=0.5,Request finished=0.5"),
+            parse_rate_limits("session_status=email:1/60"),
+            report_interval,
+        )
+
+    def test_request_events_are_kept_or_dropped_together(self):
+        sampler = self._sampler()
+        kept = set()
+
+        for _ in range(200):
+            token = start_request_sampling()
+
+            try:
+                pair = (_sample(sampler, "Request started"), _sample(sampler, "Request finished"))
+            finally:
+                end_request_sampling(token)
+
+            self.assertEqual(pair[0], pair[1])
+            kept.add(pair[0])
+
+        # with a 0.5 rate, both outcomes occur
+        self.assertEqual(kept, {True, False})
+
+    def test_events_outside_requests_are_sampled_on_their_own(self):
+        sampler = self._sampler()
+
+        with mock.patch.object(log_sampling.random, "random", side_effect=[0.4, 0.6]):
+            self.assertTrue(_sample(sampler, "Request started"))
+            self.assertFalse(_sample(sampler, "Request finished"))
+
+    def test_rate_limits_apply_per_key(self):
+        sampler = self._sampler()
+
+        self.assertTrue(_sample(sampler, "session_status", email="a@example.com"))
+        self.assertFalse(_sample(sampler, "session_status", email="a@example.com"))
+        self.assertTrue(_sample(sampler, "session_status", email="b@example.com"))
+        self.assertEqual(sampler.stats()["suppressed"], {"session_status": 1})
+
+    def test_warnings_and_errors_are_never_suppressed(self):
+        sampler = self._sampler()
+        _sample(sampler, "session_status", email="a@example.com")
+
+        # a draw that drops INFO events
+        with mock.patch.object(log_sampling.random, "random", return_value=0.99):
+            for level in ("warning", "error", "critical"):
+                self.assertTrue(_sample(sampler, "Request finished", level=level))
+                self.assertTrue(
+                    _sample(sampler, "session_status", level=level, email="a@example.com")
+                )
+
+        self.assertEqual(sampler.stats()["suppressed"], {})
+
+    def test_suppressed_counts_are_reported_after_a_burst(self):
+        sampler = self._sampler(report_interval=0.05)
+        reporter = mock.Mock()
+
+        with mock.patch.object(log_sampling.structlog, "get_logger", return_value=reporter):
+            for _ in range(5):
+                _sample(sampler, "session_status", email="a@example.com")
+
+            # no further events - the background reporter logs the drops
+            _wait_until(lambda: reporter.info.called)
+
+        reporter.info.assert_called_once_with(
+            SUPPRESSED_REPORT_EVENT, suppressed={"session_status": 4}, interval=mock.ANY
+        )
+
+
+class RequestDataLoggingMiddlewareSamplingTests(SimpleTestCase):
+    def test_one_draw_per_request(self):
+        draws = []
+
+        def view(request):
+            draws.append(log_sampling._request_sample_draw.get())
+            return HttpResponse()
+
+        middleware = RequestDataLoggingMiddleware(view)
+        middleware(RequestFactory().get("/"))
+        middleware(RequestFactory().get("/"))
+
+        self.assertNotIn(None, draws)
+        self.assertEqual(len(draws), 2)
+        # reset once the request is logged
+        self.assertIsNone(log_sampling._request_sample_draw.get())
+
+
+@override_settings(LOG_QUEUE_SIZE="2")
+class BackgroundLogWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.written = []
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+        def write_lines(lines):
+            # holds the writer thread on its first batch - until released
+            self.writing.set()
+            self.release.wait(timeout=5)
+            self.written.extend(lines)
+
+        patcher = mock.patch.object(log_writer, "write_lines", write_lines)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.writer = _BackgroundLogWriter()
+
+    def _fill_queue(self):
+        # the first line is taken by the(held) writer thread - the next two fill the queue
+        self.writer.write(b"1")
+        self.assertTrue(self.writing.wait(timeout=5))
+        self.writer.write(b"2")
+        self.writer.write(b"3")
+
+    @override_settings(LOG_QUEUE_OVERFLOW="drop")
+    def test_drop_overflow_counts_and_reports_dropped_lines(self):
+        self._fill_queue()
+        self.writer.write(b"4")
+        self.writer.write(b"5")
+
+        self.assertEqual(self.writer.stats()["dropped"], 2)
+        self.assertEqual(self.writer.stats()["queued"], 2)
+
+        self.release.set()
+        self.assertTrue(_wait_until(lambda: self.writer.stats()["written"] == 3))
+
+        self.assertEqual(self.written[:3], [b"1", b"2", b"3"])
+        self.assertEqual(
+            orjson.loads(self.written[-1]),
+            {"event": "Log lines dropped", "dropped": 2, "level": "warning"},
+        )
+
+    @override_settings(LOG_QUEUE_OVERFLOW="block")
+    def test_block_overflow_waits_for_room(self):
+        self._fill_queue()
+        blocked = threading.Thread(target=self.writer.write, args=(b"4",))
+        blocked.start()
+
+        blocked.join(timeout=0.2)
+        self.assertTrue(blocked.is_alive())
+
+        self.release.set()
+        blocked.join(timeout=5)
+        self.assertFalse(blocked.is_alive())
+        self.assertTrue(_wait_until(lambda: self.writer.stats()["written"] == 4))
+
+        self.assertEqual(self.written, [b"1", b"2", b"3", b"4"])
+        self.assertEqual(self.writer.stats()["dropped"], 0)
+
+
+def _server_timing(response):
+    """
+    Parse a `Server-Timing` header into {phase: (milliseconds, count)}.
+    """
+    phases = {}
+
+    for entry in response["Server-Timing"].split(", "):
+        phase, duration, count = SERVER_TIMING_ENTRY.match(entry).groups()
+        phases[phase] = (float(duration), int(count) if count else None)
+
+    return phases
+
+
+@override_settings(SERVER_TIMING=True, DATABASE_REPLICAS=[])
+class RequestTimingMiddlewareTests(TestCase):
+    @staticmethod
+    def _view(request):
+        User.objects.count()
+        User.objects.filter(email="ann@example.com").exists()
+
+        with timed_phase("jwt"):
+            time.sleep(0.002)
+
+        return HttpResponse()
+
+    def test_server_timing_header_has_db_and_total_phases(self):
+        response = RequestTimingMiddleware(self._view)(RequestFactory().get("/"))
+
+        phases = _server_timing(response)
+        self.assertEqual(list(phases), ["db", "jwt", "total"])
+        self.assertEqual(phases["db"][1], 2)
+        self.assertEqual(phases["jwt"][1], 1)
+        self.assertGreaterEqual(phases["jwt"][0], 2.0)
+        self.assertGreaterEqual(phases["total"][0], phases["db"][0] + phases["jwt"][0])
+
+    async def test_times_async_requests_queries(self):
+        async def view(request):
+            return await sync_to_async(self._view)(request)
+
+        response = await RequestTimingMiddleware(view)(RequestFactory().get("/"))
+
+        self.assertEqual(_server_timing(response)["db"][1], 2)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_disabled_by_setting(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestTimingMiddleware(self._view)
+
+
+def _profiled_view(request):
+    sum(range(10000))
+    return HttpResponse()
+
+
+@override_settings(PROFILING_AUTH_TOKEN="profile-token", PROFILING_SAMPLE_RATE="0.5")
+class RequestProfilingTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profiling_dir = directory.name
+
+        settings_override = override_settings(PROFILING_DIR=self.profiling_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.middleware = RequestProfilingMiddleware(_profiled_view)
+
+    def _get(self, request_id, draw=0.9, **headers):
+        request = RequestFactory().get("/metrics", headers={"X-Request-ID": request_id, **headers})
+
+        with mock.patch.object(request_profiling.random, "random", return_value=draw):
+            return self.middleware(request)
+
+    def _summarize(self, *args):
+        stdout = io.StringIO()
+        call_command("summarize_profiles", "--dir", self.profiling_dir, *args, stdout=stdout)
+
+        return stdout.getvalue()
+
+    def test_profiles_sampled_and_triggered_requests(self):
+        sampled = self._get("sampled", draw=0.1)
+        triggered = self._get("triggered", **{PROFILE_TRIGGER_HEADER: "profile-token"})
+        skipped = self._get("skipped")
+        forged = self._get("forged", **{PROFILE_TRIGGER_HEADER: "wrong-token"})
+
+        self.assertNotIn(PROFILE_ID_HEADER, skipped)
+        self.assertNotIn(PROFILE_ID_HEADER, forged)
+        self.assertEqual(
+            sorted(os.listdir(self.profiling_dir)),
+            sorted([sampled[PROFILE_ID_HEADER], triggered[PROFILE_ID_HEADER]]),
+        )
+        self.assertRegex(sampled[PROFILE_ID_HEADER], r"^\d{8}T\d{6}__GET__metrics__sampled\.prof$")
+
+    def test_summarizes_profiles_per_route(self):
+        self._get("first", draw=0.1)
+        self._get("second", draw=0.1)
+
+        output = self._summarize()
+
+        self.assertIn("GET /metrics - 2 profile(s)", output)
+        self.assertRegex(output, r"mean \d+\.\d{3}ms, max \d+\.\d{3}ms")
+        self.assertIn("(_profiled_view)", output)
+
+        self.assertIn("GET /metrics - 1 profile(s)", self._summarize("--request-id", "second"))
+        self.assertEqual(self._summarize("--route", "user"), "No profiles found\n")
@@ -0,0 +1,89 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class TTL_LRUCache:
+    """
+    A small, thread-safe, in-process LRU cache whose entries also carry an absolute expiry.
+
+    Entries are evicted in least-recently-used order once `max_size` is reached, and an entry is
+    never returned after its `expires_at` timestamp(unix seconds) has passed. Hit and miss counters
+    are kept so the cache can be sized from real traffic.
+
+    Usage:
+        cache = TTL_LRUCache(max_size=1024)
+        cache.set("key", "value", expires_at=time.time() + 60)
+        cache.get("key")  # "value" until expiry, None afterwards
+    """
+
+    def __init__(self, max_size=1024):
+        self.max_size = max(int(max_size), 0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                self.expirations += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value, expires_at=None):
+        if self.max_size == 0:
+            return
+
+        if expires_at is not None and expires_at <= time.time():
+            return
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def __len__(self):
+        return len(self._entries)